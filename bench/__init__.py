@@ -0,0 +1,7 @@
+# re-export
+from .harness import Benchmark, StepDriver, run_benchmark
+from .matches import Match, match_matrix, play_sc2, play_synthetic, run_matches
+from .replay import Replay, ReplayClient, run_replay
+from .startup import run_startup
+from .stub_client import StubClient
+from .synthetic import SyntheticGame
@@ -0,0 +1,169 @@
+import asyncio
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from s2clientprotocol import sc2api_pb2 as sc_pb
+from sc2.game_data import GameData
+from sc2.game_info import GameInfo
+from sc2.game_state import GameState
+from sc2.main import SlidingTimeWindow
+from sc2.unit import UnitGameData
+
+from bot import MyBot
+
+from .stub_client import StubClient
+from .synthetic import OWN, SyntheticGame
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    return float(np.percentile(np.asarray(samples), q))
+
+
+class StepDriver:
+    """Drives `MyBot.on_step` in-process, the same way `sc2.main` does, and times every step.
+
+    Subclasses provide the client and the game: `setup` prepares the bot up to `on_start`
+    and `steps` prepares the bot for each step and yields its iteration. Game state
+    construction is not timed, only `issue_events` and `on_step` are. With `step_time_limit`
+    set the bot gets the same sliding-window `time_budget_available` as in `run_locally.py`.
+    """
+
+    def __init__(self, step_time_limit: Optional[Dict] = None, trace_memory: bool = False,
+                 record_path: str = None):
+        self.step_time_limit = step_time_limit
+        self.trace_memory = trace_memory
+        self.client = None
+        start = time.perf_counter()
+        self.bot = MyBot(record_path)
+        self.construct_time = time.perf_counter() - start
+        self.prepare_time = 0.0
+        self.step_times: List[float] = []
+        self.heap_growth = 0
+        self.step_peaks: List[int] = []
+        self.actions: List[int] = []
+        self.collections = 0
+
+    def setup(self):
+        raise NotImplementedError
+
+    def steps(self) -> Iterator[int]:
+        raise NotImplementedError
+
+    def start(self, game_data: GameData, game_info: GameInfo, player_id: int, state: GameState, proto_game_info):
+        UnitGameData._game_data = game_data
+        UnitGameData._bot_object = self.bot
+        start = time.perf_counter()
+        self.bot._prepare_start(self.client, player_id, game_info, game_data)
+        self.bot._prepare_step(state, proto_game_info)
+        self.bot._prepare_first_step()
+        self.bot.on_start()
+        self.prepare_time = time.perf_counter() - start
+
+    async def run(self):
+        self.setup()
+        await self.bot.on_start_async()
+        window = None
+        time_limit = None
+        if self.step_time_limit is not None:
+            window = SlidingTimeWindow(int(self.step_time_limit.get("window_size", 1)))
+            time_limit = float(self.step_time_limit["time_limit"])
+        if self.trace_memory:
+            tracemalloc.start()
+        gc.collect()
+        collections = sum(s["collections"] for s in gc.get_stats())
+        heap = sys.getallocatedblocks()
+        for iteration in self.steps():
+            if window is not None:
+                self.bot.time_budget_available = time_limit - window.available
+            sent = self.client.actions_sent
+            if self.trace_memory:
+                traced = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+            start = time.perf_counter()
+            await self.bot.issue_events()
+            await self.bot.on_step(iteration)
+            elapsed = time.perf_counter() - start
+            if self.trace_memory:
+                self.step_peaks.append(tracemalloc.get_traced_memory()[1] - traced)
+            self.step_times.append(elapsed)
+            self.actions.append(self.client.actions_sent - sent)
+            if window is not None:
+                window.push(elapsed)
+        self.collections = sum(s["collections"] for s in gc.get_stats()) - collections
+        self.heap_growth = sys.getallocatedblocks() - heap
+        if self.trace_memory:
+            tracemalloc.stop()
+        if self.bot.recorder is not None:
+            self.bot.recorder.close()
+
+    def report(self) -> Dict:
+        ms = [t * 1000 for t in self.step_times]
+        profile = self.bot.profiler.report()
+        return {
+            "iterations": len(ms),
+            "p50_ms": percentile(ms, 50),
+            "p99_ms": percentile(ms, 99),
+            "max_ms": max(ms) if ms else 0.0,
+            "mean_ms": sum(ms) / len(ms) if ms else 0.0,
+            # live blocks gained over the whole run, steady growth means something keeps every frame alive
+            "heap_growth_blocks": self.heap_growth,
+            # each generation 0 collection is roughly 700 container allocations
+            "gc_collections": self.collections,
+            # bytes allocated on top of the live heap within a step, only with trace_memory
+            "step_peak_bytes_p50": percentile(self.step_peaks, 50),
+            "step_peak_bytes_max": max(self.step_peaks) if self.step_peaks else 0,
+            "actions_per_step": sum(self.actions) / len(self.actions) if self.actions else 0.0,
+            "client_calls": dict(self.client.calls),
+            "commands": {**self.bot.command_filter.stats(), **self.bot.command_grouper.stats()},
+            "raw_commands_sent": self.client.commands_sent,
+            "tag_stores": {"own": self.bot.unit_state.stats(), "enemy": self.bot.enemy_tracker.store.stats()},
+            "property_cache": self.bot.property_cache.stats(),
+            "analysis": self.bot.analysis_worker.stats(),
+            "saturation": self.bot.saturation.stats(),
+            "sections": {name: {k: v for k, v in section.items() if k != "buckets"}
+                         for name, section in profile["sections"].items()},
+            "over_budget_frames": len(profile["over_budget_frames"]),
+            # bot construction and everything sc2.main runs before the first on_step
+            "startup": {
+                "construct_ms": self.construct_time * 1000,
+                "prepare_ms": self.prepare_time * 1000,
+                "first_step_ms": ms[0] if ms else 0.0,
+            },
+        }
+
+
+class Benchmark(StepDriver):
+    """Runs the bot against a `SyntheticGame`."""
+
+    def __init__(self, iterations: int = 2000, supply: Tuple[int, int] = (100, 200), seed: int = 0,
+                 step_time_limit: Optional[Dict] = None, trace_memory: bool = False, record_path: str = None):
+        super().__init__(step_time_limit, trace_memory, record_path)
+        self.iterations = iterations
+        self.seed = seed
+        self.game = SyntheticGame(iterations, supply, seed)
+        self.client = StubClient(self.game)
+
+    def setup(self):
+        random.seed(self.seed)
+        self.proto_game_info = sc_pb.Response(game_info=self.game.game_info())
+        self.start(GameData(self.game.game_data()), GameInfo(self.proto_game_info.game_info), OWN,
+                   GameState(self.game.observation()), self.proto_game_info)
+
+    def steps(self) -> Iterator[int]:
+        for iteration in range(self.iterations):
+            if iteration != 0:
+                self.bot._prepare_step(GameState(self.game.observation()), self.proto_game_info)
+            yield iteration
+
+
+def run_benchmark(**kwargs) -> Dict:
+    benchmark = Benchmark(**kwargs)
+    asyncio.get_event_loop().run_until_complete(benchmark.run())
+    return benchmark.report()
@@ -0,0 +1,156 @@
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import time
+import traceback
+import warnings
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import sc2
+from sc2 import Difficulty, Race, maps, run_game
+from sc2.data import Result
+from sc2.player import Bot, Computer
+
+from bot import MyBot
+from bot.profiler import STEP_TIME_LIMIT, Histogram
+
+from .harness import Benchmark
+
+# sc2.main ends the game as a tie once game_loop * 0.725 / 16 passes game_time_limit
+GAME_TIME_FACTOR = 0.725 / 16
+
+
+class Match(NamedTuple):
+    map_name: str
+    race: str
+    difficulty: str
+    repeat: int
+
+    @property
+    def name(self) -> str:
+        return f"{self.map_name} {self.race} {self.difficulty} #{self.repeat}"
+
+
+def match_matrix(map_names: Iterable[str], races: Iterable[str], difficulties: Iterable[str],
+                 repeats: int = 1) -> List[Match]:
+    return [Match(m, r, d, i) for i, m, r, d in itertools.product(range(repeats), map_names, races, difficulties)]
+
+
+def _outcome(match: Match, result: Optional[Result], bot, game_time: float, timed_out: bool, wall: float) -> Dict:
+    profile = bot.profiler
+    step = Histogram()
+    for h in profile.sections.get("step", {}).values():
+        step.merge(h)
+    return {
+        "match": match._asdict(),
+        "result": result.name if result is not None else "Crash",
+        "game_time": game_time,
+        "time_limit_reached": timed_out,
+        "wall_seconds": wall,
+        "over_budget_frames": len(profile.over_budget),
+        "step": step,
+    }
+
+
+def play_sc2(match: Match, game_time_limit: int, replay_dir: Optional[str] = None) -> Dict:
+    """One game against the built-in AI, in its own SC2 instance."""
+    with open("botinfo.json") as f:
+        race = Race[json.load(f)["race"]]
+    bot = MyBot()
+    replay = None
+    if replay_dir is not None:
+        replay = f"{replay_dir}/{match.name.replace(' ', '_').replace('#', '')}.SC2Replay"
+    start = time.perf_counter()
+    result = run_game(maps.get(match.map_name), [
+        Bot(race, bot),
+        Computer(Race[match.race], Difficulty[match.difficulty]),
+    ], realtime=False, step_time_limit=STEP_TIME_LIMIT, game_time_limit=game_time_limit, save_replay_as=replay)
+    game_loop = bot.state.game_loop if bot.state is not None else 0
+    timed_out = result == Result.Tie and game_loop * GAME_TIME_FACTOR > game_time_limit
+    return _outcome(match, result, bot, game_loop / 22.4, timed_out, time.perf_counter() - start)
+
+
+def play_synthetic(match: Match, iterations: int) -> Dict:
+    """Stand-in for play_sc2 without the game: a SyntheticGame seeded from the match.
+
+    The synthetic enemy is always Terran and nobody wins, so every game is a tie; the
+    latency and budget numbers are real.
+    """
+    seed = zlib.crc32(match.name.encode())
+    benchmark = Benchmark(iterations=iterations, seed=seed, step_time_limit=STEP_TIME_LIMIT)
+    benchmark.game.map_name = match.map_name
+    start = time.perf_counter()
+    asyncio.get_event_loop().run_until_complete(benchmark.run())
+    return _outcome(match, Result.Tie, benchmark.bot, benchmark.game.game_loop / 22.4, False,
+                    time.perf_counter() - start)
+
+
+def _run(play: Callable, match: Match, kwargs: Dict) -> Dict:
+    sc2.main.logger.setLevel(logging.WARNING)
+    warnings.simplefilter("ignore", DeprecationWarning)
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    try:
+        return play(match, **kwargs)
+    except Exception:
+        return {"match": match._asdict(), "result": "Crash", "error": traceback.format_exc(), "game_time": 0,
+                "time_limit_reached": False, "wall_seconds": 0, "over_budget_frames": 0, "step": Histogram()}
+
+
+def summarize(outcomes: List[Dict]) -> Dict:
+    results = Counter(o["result"] for o in outcomes)
+    step = Histogram()
+    for o in outcomes:
+        step.merge(o["step"])
+    decided = results[Result.Victory.name] + results[Result.Defeat.name]
+    return {
+        "games": len(outcomes),
+        "results": dict(results),
+        "win_rate": results[Result.Victory.name] / decided if decided else None,
+        "mean_game_time": sum(o["game_time"] for o in outcomes) / len(outcomes) if outcomes else 0,
+        "time_limit_reached": sum(o["time_limit_reached"] for o in outcomes),
+        "over_budget_frames": sum(o["over_budget_frames"] for o in outcomes),
+        "games_over_budget": sum(o["over_budget_frames"] > 0 for o in outcomes),
+        "step": step.summary(),
+    }
+
+
+def run_matches(matches: List[Match], play: Callable, workers: int = 1, progress: Callable[[Dict], None] = None,
+                **kwargs) -> Dict:
+    """Plays `matches` across a process pool and aggregates the outcomes.
+
+    Each worker process plays one game and exits, so `workers` is also the number of SC2
+    instances running at once and nothing leaks from one game into the next. A game that
+    raises is reported as a crash instead of stopping the batch.
+    """
+    outcomes = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             max_tasks_per_child=1) as pool:
+        futures = [pool.submit(_run, play, m, kwargs) for m in matches]
+        for future in as_completed(futures):
+            outcome = future.result()
+            outcomes.append(outcome)
+            if progress is not None:
+                progress(outcome)
+    outcomes.sort(key=lambda o: tuple(o["match"].values()))
+
+    def grouped(*fields: str) -> Dict:
+        groups: Dict[str, List[Dict]] = {}
+        for o in outcomes:
+            groups.setdefault(" ".join(str(o["match"][f]) for f in fields), []).append(o)
+        return {k: summarize(v) for k, v in sorted(groups.items())}
+
+    return {
+        "wall_seconds": time.perf_counter() - start,
+        "total": summarize(outcomes),
+        "by_race": grouped("race"),
+        "by_difficulty": grouped("difficulty"),
+        "by_map": grouped("map_name"),
+        "by_matchup": grouped("map_name", "race", "difficulty"),
+        "games": [{**{k: v for k, v in o.items() if k != "step"}, "step": o["step"].summary()} for o in outcomes],
+    }
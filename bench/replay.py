@@ -0,0 +1,144 @@
+import asyncio
+import random
+from collections import Counter, defaultdict, deque
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from s2clientprotocol import common_pb2 as common_pb
+from s2clientprotocol import sc2api_pb2 as sc_pb
+from sc2.action import combine_actions
+from sc2.constants import AbilityId
+from sc2.data import ActionResult
+from sc2.game_data import GameData
+from sc2.game_info import GameInfo
+from sc2.game_state import GameState
+
+from bot.recorder import abilities_key, action_lines, format_action, pathing_key, placement_key, read_recording
+
+from .harness import StepDriver
+
+
+class ReplayClient:
+    """Answers client queries from one recorded frame at a time.
+
+    Responses are matched on the method and its arguments, so a bot whose queries changed
+    still runs; queries the recording has no answer for count as `misses` and get the
+    answer the game gives for an impossible request.
+    """
+
+    def __init__(self, game_step: int = 8):
+        self.game_step = game_step
+        self.responses: Dict[Tuple, Deque] = defaultdict(deque)
+        self.calls = Counter()
+        self.misses = Counter()
+        self.actions_sent = 0
+        self.commands_sent = 0
+        self.iteration = 0
+        self.action_stream: List[str] = []
+
+    def load(self, frame: Dict):
+        self.iteration = frame["iteration"]
+        self.responses = defaultdict(deque)
+        for method, key, result in frame["calls"]:
+            self.responses[(method, key)].append(result)
+
+    def _answer(self, method: str, key, default):
+        self.calls[method] += 1
+        answers = self.responses.get((method, key))
+        if not answers:
+            self.misses[method] += 1
+            return default
+        return answers.popleft()
+
+    async def actions(self, actions, return_successes=False):
+        self.calls["actions"] += 1
+        if not actions:
+            return None
+        if not isinstance(actions, list):
+            actions = [actions]
+        self.actions_sent += len(actions)
+        self.commands_sent += sum(1 for _ in combine_actions(actions))
+        self.action_stream.extend(action_lines(self.iteration, [format_action(a) for a in actions]))
+        return [ActionResult.Success] * len(actions) if return_successes else []
+
+    async def query_available_abilities(self, units, ignore_resource_requirements: bool = False):
+        key = abilities_key(units, ignore_resource_requirements)
+        default = [] if key[2] else [[] for _ in key[0]]
+        result = self._answer("query_available_abilities", key, default)
+        if key[2]:
+            return [AbilityId(a) for a in result]
+        return [[AbilityId(a) for a in r] for r in result]
+
+    async def query_building_placement(self, ability, positions, ignore_resources: bool = True):
+        result = self._answer("query_building_placement", placement_key(ability, positions),
+                              [ActionResult.CantBuildLocationInvalid.value] * len(positions))
+        return [ActionResult(r) for r in result]
+
+    async def query_pathing(self, start, end):
+        return self._answer("query_pathing", pathing_key(start, end), None)
+
+    async def query_pathings(self, zipped_list):
+        zipped_list = list(zipped_list)
+        return self._answer("query_pathings", tuple(pathing_key(s, e) for s, e in zipped_list),
+                            [0] * len(zipped_list))
+
+    async def chat_send(self, message: str, team_only: bool):
+        self.calls["chat_send"] += 1
+
+
+class Replay(StepDriver):
+    """Runs the bot against a recording made with `MyBot(record_path=...)`.
+
+    The random seed of the recorded game is restored, so the same bot code replays the
+    same action stream every time. By default every step runs with an unlimited budget;
+    `use_recorded_budget` hands the bot the budget it had in the game instead.
+    """
+
+    def __init__(self, path: Union[str, Path], use_recorded_budget: bool = False, trace_memory: bool = False):
+        super().__init__(None, trace_memory)
+        self.path = path
+        self.use_recorded_budget = use_recorded_budget
+        self.client = ReplayClient()
+        self.header, self.frames = read_recording(path)
+        self.first: Dict = None
+        self.proto_game_info: sc_pb.Response = None
+
+    def _load(self, frame: Dict) -> GameState:
+        self.client.load(frame)
+        if frame["pathing"] is not None:
+            self.proto_game_info.game_info.start_raw.pathing_grid.CopyFrom(
+                common_pb.ImageData.FromString(frame["pathing"]))
+        return GameState(sc_pb.ResponseObservation.FromString(frame["observation"]))
+
+    def setup(self):
+        self.first = next(self.frames)
+        game_info = sc_pb.ResponseGameInfo.FromString(self.header["game_info"])
+        self.proto_game_info = sc_pb.Response(game_info=game_info)
+        state = self._load(self.first)
+        self.start(GameData(sc_pb.ResponseData.FromString(self.header["game_data"])), GameInfo(game_info),
+                   self.header["player_id"], state, self.proto_game_info)
+        random.seed(self.header["seed"])
+
+    def steps(self) -> Iterator[int]:
+        frame = self.first
+        while frame is not None:
+            if frame is not self.first:
+                self.bot._prepare_step(self._load(frame), self.proto_game_info)
+            if self.use_recorded_budget:
+                self.bot.time_budget_available = frame["budget"]
+            yield frame["iteration"]
+            frame = next(self.frames, None)
+
+    def report(self) -> Dict:
+        report = super().report()
+        report["query_misses"] = dict(self.client.misses)
+        return report
+
+
+def run_replay(path: Union[str, Path], actions_out: Optional[Union[str, Path]] = None, **kwargs) -> Dict:
+    replay = Replay(path, **kwargs)
+    asyncio.get_event_loop().run_until_complete(replay.run())
+    if actions_out is not None:
+        with open(actions_out, "w") as f:
+            f.writelines(line + "\n" for line in replay.client.action_stream)
+    return replay.report()
@@ -0,0 +1,57 @@
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).parent.parent
+
+# runs in a fresh interpreter, so every import is really loaded
+PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+import sc2
+sc2_loaded = time.perf_counter()
+from bot import MyBot
+bot_loaded = time.perf_counter()
+
+import logging, tempfile, warnings
+from pathlib import Path
+sc2.main.logger.setLevel(logging.WARNING)
+warnings.simplefilter("ignore", DeprecationWarning)
+if sys.argv[1] == "cold":
+    import bot.map_cache
+    bot.map_cache.CACHE_DIR = Path(tempfile.mkdtemp())
+from bench.harness import run_benchmark
+startup = run_benchmark(iterations=1)["startup"]
+print(json.dumps({
+    "import_sc2_ms": (sc2_loaded - start) * 1000,
+    "import_bot_ms": (bot_loaded - sc2_loaded) * 1000,
+    **startup,
+}))
+"""
+
+
+def probe(map_cache: str) -> Dict[str, float]:
+    out = subprocess.run([sys.executable, "-c", PROBE, map_cache], cwd=ROOT, check=True,
+                         capture_output=True, text=True).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    # the synthetic game is built between the steps below, it is not part of the bot's startup
+    result["time_to_first_step_ms"] = sum(result[k] for k in (
+        "import_sc2_ms", "import_bot_ms", "construct_ms", "prepare_ms", "first_step_ms"))
+    return result
+
+
+def run_startup(repeats: int = 5) -> Dict:
+    """Median startup times over `repeats` fresh interpreters, with and without a cached map analysis.
+
+    `import_sc2_ms` is python-sc2 itself; `import_bot_ms` is `from bot import MyBot` on top of
+    it. `prepare_ms` covers everything sc2.main runs before the first `on_step`.
+    """
+    probe("warm")  # makes sure the map cache exists
+    report = {"repeats": repeats}
+    for map_cache in ("warm", "cold"):
+        runs: List[Dict[str, float]] = [probe(map_cache) for _ in range(repeats)]
+        report[f"{map_cache}_map_cache"] = {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+    return report
@@ -0,0 +1,102 @@
+from collections import Counter
+from typing import Dict, List, Optional, Union
+
+from s2clientprotocol import sc2api_pb2 as sc_pb
+from sc2.action import combine_actions
+from sc2.constants import AbilityId, UnitTypeId
+from sc2.data import ActionResult
+from sc2.game_data import AbilityData
+from sc2.position import Point2, Point3
+from sc2.unit import Unit
+from sc2.units import Units
+
+from .synthetic import SyntheticGame
+
+# what the game would report as available, ignoring resources and tech requirements
+ABILITIES: Dict[UnitTypeId, List[AbilityId]] = {
+    UnitTypeId.HATCHERY: [AbilityId.TRAINQUEEN_QUEEN, AbilityId.UPGRADETOLAIR_LAIR, AbilityId.RALLY_HATCHERY_UNITS],
+    UnitTypeId.LAIR: [AbilityId.TRAINQUEEN_QUEEN, AbilityId.UPGRADETOHIVE_HIVE, AbilityId.RALLY_HATCHERY_UNITS],
+    UnitTypeId.QUEEN: [AbilityId.EFFECT_INJECTLARVA, AbilityId.BUILD_CREEPTUMOR_QUEEN],
+    UnitTypeId.CREEPTUMORBURROWED: [AbilityId.BUILD_CREEPTUMOR_TUMOR],
+    UnitTypeId.OVERSEER: [AbilityId.SPAWNCHANGELING_SPAWNCHANGELING],
+    UnitTypeId.SWARMHOSTMP: [AbilityId.EFFECT_SPAWNLOCUSTS],
+    UnitTypeId.INFESTOR: [AbilityId.FUNGALGROWTH_FUNGALGROWTH, AbilityId.INFESTEDTERRANS_INFESTEDTERRANS],
+    UnitTypeId.SPAWNINGPOOL: [AbilityId.RESEARCH_ZERGLINGMETABOLICBOOST],
+    UnitTypeId.EVOLUTIONCHAMBER: [AbilityId.RESEARCH_ZERGGROUNDARMORLEVEL1],
+    UnitTypeId.ROACHWARREN: [AbilityId.RESEARCH_GLIALREGENERATION],
+    UnitTypeId.HYDRALISKDEN: [AbilityId.RESEARCH_MUSCULARAUGMENTS],
+    UnitTypeId.SPINECRAWLER: [AbilityId.SPINECRAWLERUPROOT_SPINECRAWLERUPROOT],
+    UnitTypeId.SPORECRAWLER: [AbilityId.SPORECRAWLERUPROOT_SPORECRAWLERUPROOT],
+}
+# abilities that need energy, like the real game hides them
+ENERGY = {
+    AbilityId.EFFECT_INJECTLARVA: 25,
+    AbilityId.BUILD_CREEPTUMOR_QUEEN: 25,
+    AbilityId.SPAWNCHANGELING_SPAWNCHANGELING: 50,
+    AbilityId.FUNGALGROWTH_FUNGALGROWTH: 75,
+    AbilityId.INFESTEDTERRANS_INFESTEDTERRANS: 25,
+}
+
+
+class StubClient:
+    """Answers the client calls `MyBot` makes during a step from a `SyntheticGame`.
+
+    Every call is counted in `calls`; actions are counted per frame so the harness
+    can report actions per step without a running game.
+    """
+
+    def __init__(self, game: SyntheticGame, game_step: int = 8):
+        self.game = game
+        self.game_step = game_step
+        self.calls = Counter()
+        self.actions_sent = 0
+        self.commands_sent = 0
+        self.chat: List[str] = []
+
+    async def _execute(self, **kwargs):
+        # only the raw game data request the recorder makes
+        assert set(kwargs) == {"data"}, kwargs
+        self.calls["_execute"] += 1
+        return sc_pb.Response(data=self.game.game_data())
+
+    async def actions(self, actions, return_successes=False):
+        self.calls["actions"] += 1
+        if not actions:
+            return None
+        if not isinstance(actions, list):
+            actions = [actions]
+        self.actions_sent += len(actions)
+        self.commands_sent += sum(1 for _ in combine_actions(actions))
+        return [ActionResult.Success] * len(actions) if return_successes else []
+
+    async def query_available_abilities(self, units: Union[List[Unit], Units],
+                                        ignore_resource_requirements: bool = False) -> List[List[AbilityId]]:
+        self.calls["query_available_abilities"] += 1
+        single = not isinstance(units, list)
+        if single:
+            units = [units]
+        result = []
+        for u in units:
+            result.append([a for a in ABILITIES.get(u.type_id, []) if u.energy >= ENERGY.get(a, 0)])
+        return result[0] if single else result
+
+    async def query_building_placement(self, ability: AbilityData, positions: List[Union[Unit, Point2, Point3]],
+                                       ignore_resources: bool = True) -> List[ActionResult]:
+        assert isinstance(ability, AbilityData)
+        self.calls["query_building_placement"] += 1
+        return [ActionResult.Success if self.game.can_place(p.position if isinstance(p, Unit) else p)
+                else ActionResult.CantBuildLocationInvalid for p in positions]
+
+    async def query_pathing(self, start: Union[Unit, Point2, Point3], end: Union[Point2, Point3]) -> Optional[float]:
+        self.calls["query_pathing"] += 1
+        if isinstance(start, Unit):
+            start = start.position
+        return start.to2.distance_to(end.to2)
+
+    async def query_pathings(self, zipped_list) -> List[float]:
+        self.calls["query_pathings"] += 1
+        return [(s.position if isinstance(s, Unit) else s).to2.distance_to(e.to2) for s, e in zipped_list]
+
+    async def chat_send(self, message: str, team_only: bool):
+        self.calls["chat_send"] += 1
+        self.chat.append(message)
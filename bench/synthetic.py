@@ -0,0 +1,526 @@
+import math
+import random
+from typing import Dict, List, Tuple
+
+import numpy as np
+from s2clientprotocol import common_pb2 as common_pb
+from s2clientprotocol import data_pb2 as data_pb
+from s2clientprotocol import raw_pb2 as raw_pb
+from s2clientprotocol import sc2api_pb2 as sc_pb
+from sc2 import Race
+from sc2.constants import AbilityId, BuffId, UnitTypeId, UpgradeId
+from sc2.position import Point2
+
+MAP_SIZE = 176
+PLAYABLE = (16, 16, 160, 160)
+OWN_BASES = [(40.5, 40.5), (44.5, 76.5), (76.5, 44.5), (36.5, 116.5), (116.5, 36.5), (76.5, 76.5)]
+ENEMY_BASES = [(MAP_SIZE - x, MAP_SIZE - y) for x, y in OWN_BASES]
+WATCHTOWER = (88.0, 88.0)
+
+OWN = 1
+ENEMY = 2
+NEUTRAL = 16
+ALLIANCE = {OWN: 1, ENEMY: 4, NEUTRAL: 3}
+VISIBLE = 1
+SNAPSHOT = 2
+
+GROUND = data_pb.Weapon.Ground
+AIR = data_pb.Weapon.Air
+ANY = data_pb.Weapon.Any
+STRUCTURE = data_pb.Structure
+ZERG = Race.Zerg.value
+TERRAN = Race.Terran.value
+
+# type -> (race, minerals, gas, food, radius, health, flying, attributes, weapons, speed, creation ability, tech alias)
+TYPES = {
+    UnitTypeId.HATCHERY: (ZERG, 350, 0, 0, 2.75, 1500, False, [STRUCTURE], [], 0, AbilityId.ZERGBUILD_HATCHERY, []),
+    UnitTypeId.LAIR: (ZERG, 500, 100, 0, 2.75, 2000, False, [STRUCTURE], [], 0, AbilityId.UPGRADETOLAIR_LAIR,
+                      [UnitTypeId.HATCHERY]),
+    UnitTypeId.HIVE: (ZERG, 700, 250, 0, 2.75, 2500, False, [STRUCTURE], [], 0, AbilityId.UPGRADETOHIVE_HIVE,
+                      [UnitTypeId.HATCHERY, UnitTypeId.LAIR]),
+    UnitTypeId.EXTRACTOR: (ZERG, 75, 0, 0, 1.5, 500, False, [STRUCTURE], [], 0, AbilityId.ZERGBUILD_EXTRACTOR, []),
+    UnitTypeId.SPAWNINGPOOL: (ZERG, 250, 0, 0, 1.5, 1000, False, [STRUCTURE], [], 0,
+                              AbilityId.ZERGBUILD_SPAWNINGPOOL, []),
+    UnitTypeId.EVOLUTIONCHAMBER: (ZERG, 125, 0, 0, 1.5, 750, False, [STRUCTURE], [], 0,
+                                  AbilityId.ZERGBUILD_EVOLUTIONCHAMBER, []),
+    UnitTypeId.ROACHWARREN: (ZERG, 200, 0, 0, 1.5, 850, False, [STRUCTURE], [], 0, AbilityId.ZERGBUILD_ROACHWARREN, []),
+    UnitTypeId.BANELINGNEST: (ZERG, 150, 50, 0, 1.5, 850, False, [STRUCTURE], [], 0,
+                              AbilityId.ZERGBUILD_BANELINGNEST, []),
+    UnitTypeId.HYDRALISKDEN: (ZERG, 150, 100, 0, 1.5, 850, False, [STRUCTURE], [], 0,
+                              AbilityId.ZERGBUILD_HYDRALISKDEN, []),
+    UnitTypeId.INFESTATIONPIT: (ZERG, 150, 100, 0, 1.5, 850, False, [STRUCTURE], [], 0,
+                                AbilityId.ZERGBUILD_INFESTATIONPIT, []),
+    UnitTypeId.SPINECRAWLER: (ZERG, 150, 0, 0, 1, 300, False, [STRUCTURE], [(GROUND, 7, 25)], 0,
+                              AbilityId.ZERGBUILD_SPINECRAWLER, []),
+    UnitTypeId.SPORECRAWLER: (ZERG, 125, 0, 0, 1, 400, False, [STRUCTURE], [(AIR, 7, 15)], 0,
+                              AbilityId.ZERGBUILD_SPORECRAWLER, []),
+    UnitTypeId.CREEPTUMORBURROWED: (ZERG, 0, 0, 0, 0.5, 50, False, [STRUCTURE], [], 0, None, []),
+    UnitTypeId.CREEPTUMORQUEEN: (ZERG, 0, 0, 0, 0.5, 50, False, [STRUCTURE], [], 0, AbilityId.BUILD_CREEPTUMOR_QUEEN,
+                                 []),
+    UnitTypeId.LARVA: (ZERG, 0, 0, 0, 0.25, 25, False, [], [], 0, None, []),
+    UnitTypeId.DRONE: (ZERG, 50, 0, 1, 0.375, 40, False, [], [(GROUND, 0.1, 5)], 3.94, AbilityId.LARVATRAIN_DRONE, []),
+    UnitTypeId.OVERLORD: (ZERG, 100, 0, 0, 1, 200, True, [], [], 0.902, AbilityId.LARVATRAIN_OVERLORD, []),
+    UnitTypeId.OVERSEER: (ZERG, 150, 50, 0, 1, 200, True, [], [], 2.62, AbilityId.MORPH_OVERSEER,
+                          [UnitTypeId.OVERLORD]),
+    UnitTypeId.QUEEN: (ZERG, 150, 0, 2, 0.875, 175, False, [], [(GROUND, 5, 8), (AIR, 7, 9)], 1.31,
+                       AbilityId.TRAINQUEEN_QUEEN, []),
+    UnitTypeId.ZERGLING: (ZERG, 25, 0, 0.5, 0.375, 35, False, [], [(GROUND, 0.1, 5)], 4.13,
+                          AbilityId.LARVATRAIN_ZERGLING, []),
+    UnitTypeId.BANELING: (ZERG, 50, 25, 0.5, 0.375, 30, False, [], [(GROUND, 0.25, 16)], 3.5,
+                          AbilityId.MORPHZERGLINGTOBANELING_BANELING, [UnitTypeId.ZERGLING]),
+    UnitTypeId.ROACH: (ZERG, 75, 25, 2, 0.625, 145, False, [], [(GROUND, 4, 16)], 3.15, AbilityId.LARVATRAIN_ROACH, []),
+    UnitTypeId.HYDRALISK: (ZERG, 100, 50, 2, 0.625, 90, False, [], [(ANY, 5, 12)], 3.15,
+                           AbilityId.LARVATRAIN_HYDRALISK, []),
+    UnitTypeId.INFESTOR: (ZERG, 100, 150, 2, 0.75, 90, False, [], [], 3.15, AbilityId.LARVATRAIN_INFESTOR, []),
+    UnitTypeId.SWARMHOSTMP: (ZERG, 100, 75, 3, 0.875, 160, False, [], [], 3.15, AbilityId.TRAIN_SWARMHOST, []),
+    UnitTypeId.COMMANDCENTER: (TERRAN, 400, 0, 0, 2.75, 1500, False, [STRUCTURE], [], 0, None, []),
+    UnitTypeId.SUPPLYDEPOT: (TERRAN, 100, 0, 0, 1, 400, False, [STRUCTURE], [], 0, None, []),
+    UnitTypeId.BARRACKS: (TERRAN, 150, 0, 0, 1.8, 1000, False, [STRUCTURE], [], 0, None, []),
+    UnitTypeId.BUNKER: (TERRAN, 100, 0, 0, 1.5, 400, False, [STRUCTURE], [], 0, None, []),
+    UnitTypeId.SCV: (TERRAN, 50, 0, 1, 0.375, 45, False, [], [(GROUND, 0.1, 5)], 3.94, None, []),
+    UnitTypeId.MARINE: (TERRAN, 50, 0, 1, 0.375, 45, False, [], [(ANY, 5, 6)], 3.15, None, []),
+    UnitTypeId.MARAUDER: (TERRAN, 100, 25, 2, 0.5625, 125, False, [], [(GROUND, 6, 10)], 3.15, None, []),
+    UnitTypeId.SIEGETANK: (TERRAN, 150, 125, 3, 0.875, 175, False, [], [(GROUND, 7, 15)], 3.15, None, []),
+    UnitTypeId.MEDIVAC: (TERRAN, 100, 100, 2, 0.75, 150, True, [], [], 3.5, None, []),
+    UnitTypeId.VIKINGFIGHTER: (TERRAN, 150, 75, 2, 0.75, 135, True, [], [(AIR, 9, 10)], 3.85, None, []),
+    UnitTypeId.MINERALFIELD: (0, 0, 0, 0, 1.125, 0, False, [STRUCTURE], [], 0, None, []),
+    UnitTypeId.VESPENEGEYSER: (0, 0, 0, 0, 1.5, 0, False, [STRUCTURE], [], 0, None, []),
+    UnitTypeId.XELNAGATOWER: (0, 0, 0, 0, 1, 0, False, [STRUCTURE], [], 0, None, []),
+}
+
+UPGRADES = {
+    UpgradeId.ZERGLINGMOVEMENTSPEED: (100, 100, AbilityId.RESEARCH_ZERGLINGMETABOLICBOOST),
+    UpgradeId.OVERLORDSPEED: (100, 100, AbilityId.RESEARCH_PNEUMATIZEDCARAPACE),
+}
+
+SIGHT = 9
+CREEP_RADIUS = 11
+
+
+def game_data_proto() -> sc_pb.ResponseData:
+    abilities = [data_pb.AbilityData(ability_id=a.value, button_name=a.name, available=True)
+                 for a in AbilityId if a.value != 0]
+    units = []
+    for t in UnitTypeId:
+        if t.value == 0:
+            continue
+        u = data_pb.UnitTypeData(unit_id=t.value, name=t.name, available=True)
+        if t in TYPES:
+            race, minerals, gas, food, _, _, _, attributes, weapons, speed, ability, alias = TYPES[t]
+            u.race = race
+            u.mineral_cost = minerals
+            u.vespene_cost = gas
+            u.food_required = food
+            u.movement_speed = speed
+            u.attributes.extend(attributes)
+            u.tech_alias.extend([a.value for a in alias])
+            u.has_minerals = t == UnitTypeId.MINERALFIELD
+            u.has_vespene = t == UnitTypeId.VESPENEGEYSER
+            u.sight_range = SIGHT
+            for kind, reach, damage in weapons:
+                u.weapons.add(type=kind, range=reach, damage=damage, attacks=1, speed=1)
+            if ability is not None:
+                u.ability_id = ability.value
+        units.append(u)
+    upgrades = [data_pb.UpgradeData(upgrade_id=g.value, name=g.name) for g in UpgradeId if g.value != 0]
+    for g in upgrades:
+        key = UpgradeId(g.upgrade_id)
+        if key in UPGRADES:
+            g.mineral_cost, g.vespene_cost, ability = UPGRADES[key]
+            g.ability_id = ability.value
+    return sc_pb.ResponseData(abilities=abilities, units=units, upgrades=upgrades)
+
+
+def image(array: np.ndarray, bits: int = 8) -> common_pb.ImageData:
+    h, w = array.shape
+    data = np.packbits(array.astype(np.uint8).ravel()) if bits == 1 else array.astype(np.uint8).ravel()
+    return common_pb.ImageData(bits_per_pixel=bits, size=common_pb.Size2DI(x=w, y=h), data=data.tobytes())
+
+
+def resource_positions(base: Tuple[float, float]) -> Tuple[List[Point2], List[Point2]]:
+    center = Point2((MAP_SIZE / 2, MAP_SIZE / 2))
+    b = Point2(base)
+    away = math.atan2(b.y - center.y, b.x - center.x)
+    minerals = [Point2((b.x + 7.5 * math.cos(away + a), b.y + 7.5 * math.sin(away + a)))
+                for a in np.linspace(-1.0, 1.0, 8)]
+    geysers = [Point2((b.x + 7.5 * math.cos(away + a), b.y + 7.5 * math.sin(away + a))) for a in (-1.7, 1.7)]
+    return [p.rounded.offset((0.5, 0.5)) for p in minerals], [p.rounded.offset((0.5, 0.5)) for p in geysers]
+
+
+def disc_mask(array: np.ndarray, x: float, y: float, radius: float, value: int):
+    h, w = array.shape
+    x0, x1 = max(int(x - radius), 0), min(int(x + radius) + 1, w)
+    y0, y1 = max(int(y - radius), 0), min(int(y + radius) + 1, h)
+    if x0 >= x1 or y0 >= y1:
+        return
+    ys, xs = np.ogrid[y0:y1, x0:x1]
+    inside = (xs + 0.5 - x) ** 2 + (ys + 0.5 - y) ** 2 <= radius * radius
+    array[y0:y1, x0:x1][inside] = value
+
+
+class SimUnit:
+    __slots__ = ("tag", "type_id", "owner", "x", "y", "home", "offset", "health", "health_max", "energy",
+                 "build_progress", "orders", "carrying", "cooldown", "assigned", "ideal")
+
+    def __init__(self, tag: int, type_id: UnitTypeId, owner: int, home: Tuple[float, float],
+                 offset: Tuple[float, float] = (0, 0)):
+        self.tag = tag
+        self.type_id = type_id
+        self.owner = owner
+        self.home = home
+        self.offset = offset
+        self.x = home[0] + offset[0]
+        self.y = home[1] + offset[1]
+        self.health_max = TYPES[type_id][5]
+        self.health = self.health_max
+        self.energy = 50
+        self.build_progress = 1.0
+        # (ability, target point or tag)
+        self.orders: List[Tuple[AbilityId, object]] = []
+        self.carrying = False
+        self.cooldown = 0.0
+        self.assigned = 0
+        self.ideal = 0
+
+
+class SyntheticGame:
+    """A deterministic stand-in for a Zerg vs Terran game on a flat 176x176 map.
+
+    Own and enemy rosters follow a supply ramp from `supply[0]` to `supply[1]`
+    over the first 80% of `iterations`; the two armies walk towards each other
+    and back so every frame mixes macro, idle army and combat situations.
+    """
+
+    def __init__(self, iterations: int = 2000, supply: Tuple[int, int] = (100, 200), seed: int = 0,
+                 map_name: str = "SyntheticLE"):
+        self.iterations = iterations
+        self.supply = supply
+        self.map_name = map_name
+        self.random = random.Random(seed)
+        self.next_tag = 0x10000000
+        self.units: Dict[int, SimUnit] = {}
+        self.dead: List[int] = []
+        self.iteration = 0
+        self.game_loop = 0
+        self.pathing = np.zeros((MAP_SIZE, MAP_SIZE), dtype=np.uint8)
+        x0, y0, x1, y1 = PLAYABLE
+        self.pathing[y0:y1, x0:x1] = 1
+        self.resources: Dict[int, SimUnit] = {}
+        for base in OWN_BASES + ENEMY_BASES:
+            minerals, geysers = resource_positions(base)
+            for p in minerals:
+                self._spawn_resource(UnitTypeId.MINERALFIELD, p)
+            for p in geysers:
+                self._spawn_resource(UnitTypeId.VESPENEGEYSER, p)
+        self._spawn(UnitTypeId.XELNAGATOWER, NEUTRAL, WATCHTOWER)
+        self.placement = self.pathing.copy()
+        self.occupied = np.zeros((MAP_SIZE, MAP_SIZE), dtype=bool)
+
+    def _new_tag(self) -> int:
+        self.next_tag += 1
+        return self.next_tag
+
+    def _spawn_resource(self, type_id: UnitTypeId, p: Point2):
+        u = self._spawn(type_id, NEUTRAL, (p.x, p.y))
+        self.resources[u.tag] = u
+        self.pathing[int(p.y) - 1:int(p.y) + 1, int(p.x) - 1:int(p.x) + 1] = 0
+
+    def _spawn(self, type_id: UnitTypeId, owner: int, home: Tuple[float, float], spread: float = 0) -> SimUnit:
+        offset = (0, 0)
+        if spread > 0:
+            a = self.random.uniform(0, 2 * math.pi)
+            r = spread * math.sqrt(self.random.random())
+            offset = (r * math.cos(a), r * math.sin(a))
+        u = SimUnit(self._new_tag(), type_id, owner, home, offset)
+        self.units[u.tag] = u
+        return u
+
+    # static data
+
+    def game_data(self) -> sc_pb.ResponseData:
+        return game_data_proto()
+
+    def game_info(self) -> sc_pb.ResponseGameInfo:
+        x0, y0, x1, y1 = PLAYABLE
+        start_raw = raw_pb.StartRaw(
+            map_size=common_pb.Size2DI(x=MAP_SIZE, y=MAP_SIZE),
+            pathing_grid=image(self.pathing, 1),
+            placement_grid=image(self.placement, 1),
+            terrain_height=image(np.full((MAP_SIZE, MAP_SIZE), 128, dtype=np.uint8)),
+            playable_area=common_pb.RectangleI(p0=common_pb.PointI(x=x0, y=y0), p1=common_pb.PointI(x=x1, y=y1)),
+            start_locations=[common_pb.Point2D(x=ENEMY_BASES[0][0], y=ENEMY_BASES[0][1])],
+        )
+        return sc_pb.ResponseGameInfo(
+            map_name=self.map_name,
+            start_raw=start_raw,
+            player_info=[
+                sc_pb.PlayerInfo(player_id=OWN, type=sc_pb.Participant, race_requested=ZERG, race_actual=ZERG),
+                sc_pb.PlayerInfo(player_id=ENEMY, type=sc_pb.Computer, race_requested=TERRAN, race_actual=TERRAN,
+                                 difficulty=sc_pb.VeryHard),
+            ],
+        )
+
+    # roster
+
+    def current_supply(self) -> float:
+        lo, hi = self.supply
+        ramp = min(1.0, self.iteration / max(1.0, self.iterations * 0.8))
+        return lo + (hi - lo) * ramp
+
+    def own_composition(self, s: float) -> Dict[UnitTypeId, int]:
+        bases = min(len(OWN_BASES), 1 + int(s // 35))
+        drones = int(min(76, s * 0.45))
+        queens = bases + 1
+        army = max(0.0, s - drones - queens * 2)
+        return {
+            # the main first, BotAI takes its start location from the first townhall
+            UnitTypeId.LAIR: 1,
+            UnitTypeId.HATCHERY: bases - 1,
+            UnitTypeId.EXTRACTOR: max(0, bases * 2 - 2),
+            UnitTypeId.SPAWNINGPOOL: 1,
+            UnitTypeId.EVOLUTIONCHAMBER: 1 + int(s > 100),
+            UnitTypeId.ROACHWARREN: int(s > 40),
+            UnitTypeId.HYDRALISKDEN: int(s > 80),
+            UnitTypeId.INFESTATIONPIT: int(s > 60),
+            UnitTypeId.SPINECRAWLER: 2,
+            UnitTypeId.SPORECRAWLER: bases,
+            UnitTypeId.CREEPTUMORBURROWED: int(s // 10),
+            UnitTypeId.LARVA: bases * 3,
+            UnitTypeId.DRONE: drones,
+            UnitTypeId.OVERLORD: int(math.ceil(s / 8)) + 1,
+            UnitTypeId.OVERSEER: 1 + int(s > 120),
+            UnitTypeId.QUEEN: queens,
+            UnitTypeId.ZERGLING: int(army * 0.2 / 0.5),
+            UnitTypeId.BANELING: int(army * 0.05 / 0.5),
+            UnitTypeId.ROACH: int(army * 0.2 / 2),
+            UnitTypeId.HYDRALISK: int(army * 0.4 / 2),
+            UnitTypeId.INFESTOR: int(army * 0.05 / 2),
+            UnitTypeId.SWARMHOSTMP: int(army * 0.1 / 3),
+        }
+
+    def enemy_composition(self, s: float) -> Dict[UnitTypeId, int]:
+        bases = min(len(ENEMY_BASES), 1 + int(s // 40))
+        scvs = int(min(70, s * 0.4))
+        army = max(0.0, s - scvs)
+        return {
+            UnitTypeId.COMMANDCENTER: bases,
+            UnitTypeId.SUPPLYDEPOT: int(s // 8),
+            UnitTypeId.BARRACKS: 2 + bases,
+            UnitTypeId.BUNKER: 1,
+            UnitTypeId.SCV: scvs,
+            UnitTypeId.MARINE: int(army * 0.4),
+            UnitTypeId.MARAUDER: int(army * 0.2 / 2),
+            UnitTypeId.SIEGETANK: int(army * 0.2 / 3),
+            UnitTypeId.MEDIVAC: int(army * 0.1 / 2),
+            UnitTypeId.VIKINGFIGHTER: int(army * 0.1 / 2),
+        }
+
+    def own_home(self, type_id: UnitTypeId, index: int) -> Tuple[Tuple[float, float], float]:
+        if type_id == UnitTypeId.LAIR:
+            return OWN_BASES[0], 0
+        if type_id == UnitTypeId.HATCHERY:
+            return OWN_BASES[1 + index % (len(OWN_BASES) - 1)], 0
+        if type_id == UnitTypeId.EXTRACTOR:
+            base = OWN_BASES[(index // 2) % len(OWN_BASES)]
+            g = resource_positions(base)[1][index % 2]
+            return (g.x, g.y), 0
+        if type_id in {UnitTypeId.DRONE, UnitTypeId.LARVA, UnitTypeId.QUEEN}:
+            return OWN_BASES[index % len(OWN_BASES[:max(1, self.own_bases())])], 5
+        if type_id == UnitTypeId.SPORECRAWLER:
+            return OWN_BASES[index % len(OWN_BASES)], 5
+        if type_id == UnitTypeId.CREEPTUMORBURROWED:
+            b = Point2(OWN_BASES[1]).towards(Point2((MAP_SIZE / 2, MAP_SIZE / 2)), 8 + 4 * index)
+            return (b.x, b.y), 2
+        if TYPES[type_id][7] == [STRUCTURE]:
+            b = Point2(OWN_BASES[0]).towards(Point2((MAP_SIZE / 2, MAP_SIZE / 2)), 9)
+            return (b.x, b.y), 6
+        if type_id in {UnitTypeId.OVERLORD, UnitTypeId.OVERSEER}:
+            return OWN_BASES[index % len(OWN_BASES)], 20
+        return self.own_army_anchor(), 2 + math.sqrt(index)
+
+    def enemy_home(self, type_id: UnitTypeId, index: int) -> Tuple[Tuple[float, float], float]:
+        if type_id == UnitTypeId.COMMANDCENTER:
+            return ENEMY_BASES[index % len(ENEMY_BASES)], 0
+        if type_id == UnitTypeId.SCV:
+            return ENEMY_BASES[index % max(1, self.enemy_bases())], 5
+        if TYPES[type_id][7] == [STRUCTURE]:
+            b = Point2(ENEMY_BASES[0]).towards(Point2((MAP_SIZE / 2, MAP_SIZE / 2)), 10)
+            return (b.x, b.y), 8
+        return self.enemy_army_anchor(), 2 + math.sqrt(index)
+
+    def own_bases(self) -> int:
+        return sum(1 for u in self.units.values()
+                   if u.owner == OWN and u.type_id in {UnitTypeId.HATCHERY, UnitTypeId.LAIR})
+
+    def enemy_bases(self) -> int:
+        return sum(1 for u in self.units.values() if u.owner == ENEMY and u.type_id == UnitTypeId.COMMANDCENTER)
+
+    def fight_phase(self) -> float:
+        # 0 = both armies at home, 1 = enemy army at our natural
+        return 0.5 - 0.5 * math.cos(2 * math.pi * self.iteration / 400)
+
+    def own_army_anchor(self) -> Tuple[float, float]:
+        p = Point2(OWN_BASES[1]).towards(Point2((MAP_SIZE / 2, MAP_SIZE / 2)), 6)
+        return p.x, p.y
+
+    def enemy_army_anchor(self) -> Tuple[float, float]:
+        a = Point2(ENEMY_BASES[1]).towards(Point2((MAP_SIZE / 2, MAP_SIZE / 2)), 6)
+        b = Point2(self.own_army_anchor())
+        p = a.towards(b, a.distance_to(b) * 0.9 * self.fight_phase())
+        return p.x, p.y
+
+    def _sync_roster(self, owner: int, composition: Dict[UnitTypeId, int]):
+        for type_id, n in composition.items():
+            have = [u for u in self.units.values() if u.owner == owner and u.type_id == type_id]
+            for u in have[n:]:
+                self._kill(u)
+            for i in range(len(have), n):
+                home, spread = self.own_home(type_id, i) if owner == OWN else self.enemy_home(type_id, i)
+                self._spawn(type_id, owner, home, spread)
+
+    def _kill(self, u: SimUnit):
+        del self.units[u.tag]
+        self.dead.append(u.tag)
+
+    def _advance(self):
+        self._sync_roster(OWN, self.own_composition(self.current_supply()))
+        self._sync_roster(ENEMY, self.enemy_composition(self.current_supply() * 0.9))
+        own_anchor = self.own_army_anchor()
+        enemy_anchor = self.enemy_army_anchor()
+        minerals = [r for r in self.resources.values() if r.type_id == UnitTypeId.MINERALFIELD]
+        contact = Point2(own_anchor).distance_to(Point2(enemy_anchor)) < 15
+        for u in list(self.units.values()):
+            if u.owner == NEUTRAL or TYPES[u.type_id][7] == [STRUCTURE]:
+                continue
+            jitter = (self.random.uniform(-0.5, 0.5), self.random.uniform(-0.5, 0.5))
+            home = u.home
+            if u.type_id not in {UnitTypeId.DRONE, UnitTypeId.SCV, UnitTypeId.LARVA, UnitTypeId.QUEEN,
+                                 UnitTypeId.OVERLORD, UnitTypeId.OVERSEER}:
+                home = own_anchor if u.owner == OWN else enemy_anchor
+            u.x = min(max(home[0] + u.offset[0] + jitter[0], PLAYABLE[0]), PLAYABLE[2] - 1)
+            u.y = min(max(home[1] + u.offset[1] + jitter[1], PLAYABLE[1]), PLAYABLE[3] - 1)
+            u.energy = min(200, u.energy + 0.7875)
+            u.cooldown = self.random.uniform(0, 0.6) if contact else 0
+            if u.type_id == UnitTypeId.DRONE:
+                u.carrying = self.random.random() < 0.5
+                if self.random.random() < 0.05:
+                    u.orders = []
+                elif not u.orders:
+                    m = min(minerals, key=lambda r: (r.x - u.x) ** 2 + (r.y - u.y) ** 2)
+                    u.orders = [(AbilityId.HARVEST_GATHER, m.tag)]
+            elif u.owner == OWN and u.type_id != UnitTypeId.LARVA:
+                if self.random.random() < 0.1:
+                    u.orders = [] if u.orders else [(AbilityId.ATTACK, Point2(enemy_anchor))]
+            if contact and u.owner != NEUTRAL and self.random.random() < 0.2:
+                u.health -= self.random.uniform(1, 20)
+                if u.health <= 0:
+                    self._kill(u)
+            elif u.health < u.health_max:
+                u.health = min(u.health_max, u.health + 1)
+        self.occupied = np.zeros((MAP_SIZE, MAP_SIZE), dtype=bool)
+        for u in self.units.values():
+            if TYPES[u.type_id][7] == [STRUCTURE]:
+                disc_mask(self.occupied, u.x, u.y, 3, True)
+            if u.type_id in {UnitTypeId.HATCHERY, UnitTypeId.LAIR}:
+                u.ideal = 16
+                u.assigned = sum(1 for d in self.units.values()
+                                 if d.type_id == UnitTypeId.DRONE and d.home == u.home)
+            elif u.type_id == UnitTypeId.EXTRACTOR:
+                u.ideal = 3
+                u.assigned = 3 if self.random.random() < 0.8 else 2
+
+    # per frame observation
+
+    def grids(self) -> Tuple[np.ndarray, np.ndarray]:
+        visibility = np.ones((MAP_SIZE, MAP_SIZE), dtype=np.uint8)
+        creep = np.zeros((MAP_SIZE, MAP_SIZE), dtype=np.uint8)
+        for u in self.units.values():
+            if u.owner != OWN:
+                continue
+            disc_mask(visibility, u.x, u.y, SIGHT, 2)
+            if u.type_id in {UnitTypeId.HATCHERY, UnitTypeId.LAIR, UnitTypeId.CREEPTUMORBURROWED}:
+                disc_mask(creep, u.x, u.y, CREEP_RADIUS, 1)
+        return visibility, creep
+
+    def unit_proto(self, u: SimUnit, display_type: int = VISIBLE) -> raw_pb.Unit:
+        t = TYPES[u.type_id]
+        p = raw_pb.Unit(
+            display_type=display_type,
+            alliance=ALLIANCE[u.owner],
+            tag=u.tag,
+            unit_type=u.type_id.value,
+            owner=u.owner,
+            pos=common_pb.Point(x=u.x, y=u.y, z=10),
+            radius=t[4],
+            build_progress=u.build_progress,
+            health=max(u.health, 0),
+            health_max=u.health_max,
+            energy=u.energy,
+            is_flying=t[6],
+            weapon_cooldown=u.cooldown,
+            assigned_harvesters=u.assigned,
+            ideal_harvesters=u.ideal,
+        )
+        if u.owner == NEUTRAL:
+            p.mineral_contents = 1500 if u.type_id == UnitTypeId.MINERALFIELD else 0
+            p.vespene_contents = 2000 if u.type_id == UnitTypeId.VESPENEGEYSER else 0
+        if u.carrying:
+            p.buff_ids.append(BuffId.CARRYMINERALFIELDMINERALS.value)
+        for ability, target in u.orders:
+            o = p.orders.add(ability_id=ability.value)
+            if isinstance(target, Point2):
+                o.target_world_space_pos.x = target.x
+                o.target_world_space_pos.y = target.y
+            elif target is not None:
+                o.target_unit_tag = target
+        return p
+
+    def observation(self) -> sc_pb.ResponseObservation:
+        self._advance()
+        visibility, creep = self.grids()
+        units = []
+        own_food = 0.0
+        for u in self.units.values():
+            if u.owner == ENEMY:
+                visible = visibility[int(u.y), int(u.x)] == 2
+                if TYPES[u.type_id][7] == [STRUCTURE]:
+                    units.append(self.unit_proto(u, VISIBLE if visible else SNAPSHOT))
+                elif visible:
+                    units.append(self.unit_proto(u))
+            else:
+                units.append(self.unit_proto(u))
+                if u.owner == OWN:
+                    own_food += TYPES[u.type_id][3]
+        overlords = sum(1 for u in self.units.values() if u.type_id == UnitTypeId.OVERLORD)
+        common = sc_pb.PlayerCommon(
+            player_id=OWN,
+            minerals=200 + (self.iteration * 37) % 900,
+            vespene=100 + (self.iteration * 23) % 500,
+            food_cap=min(200, overlords * 8 + 6),
+            food_used=int(own_food),
+            food_army=int(own_food * 0.5),
+            food_workers=int(own_food * 0.4),
+            idle_worker_count=0,
+            army_count=0,
+            larva_count=3,
+        )
+        raw = raw_pb.ObservationRaw(
+            player=raw_pb.PlayerRaw(upgrade_ids=[UpgradeId.ZERGLINGMOVEMENTSPEED.value]),
+            units=units,
+            map_state=raw_pb.MapState(visibility=image(np.flipud(visibility)), creep=image(np.flipud(creep), 1)),
+            event=raw_pb.Event(dead_units=self.dead),
+        )
+        self.dead = []
+        obs = sc_pb.ResponseObservation(
+            observation=sc_pb.Observation(game_loop=self.game_loop, player_common=common, raw_data=raw))
+        self.iteration += 1
+        self.game_loop += 8
+        return obs
+
+    # queries
+
+    def can_place(self, p: Point2) -> bool:
+        x, y = int(p.x), int(p.y)
+        if not (0 <= x < MAP_SIZE and 0 <= y < MAP_SIZE):
+            return False
+        return bool(self.placement[y, x]) and not self.occupied[y, x]
@@ -0,0 +1,38 @@
+import argparse
+import json
+import logging
+import warnings
+
+import sc2
+
+from bench import run_benchmark, run_startup
+from bot.profiler import STEP_TIME_LIMIT
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run MyBot.on_step headless against synthetic game states")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--supply", type=int, nargs=2, default=(100, 200), metavar=("START", "END"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", action="store_true",
+                        help="give the bot the same step_time_limit budget as run_locally.py")
+    parser.add_argument("--trace-memory", action="store_true", help="also report tracemalloc peak (slower)")
+    parser.add_argument("--record", metavar="PATH", help="record the synthetic game for replay.py")
+    parser.add_argument("--startup", type=int, nargs="?", const=5, metavar="REPEATS",
+                        help="measure import time and time to the first on_step in fresh interpreters instead")
+    args = parser.parse_args()
+
+    if args.startup:
+        print(json.dumps(run_startup(args.startup), indent=2))
+        return
+
+    sc2.main.logger.setLevel(logging.WARNING)
+    warnings.simplefilter("ignore", DeprecationWarning)
+    step_time_limit = STEP_TIME_LIMIT if args.time_limit else None
+    report = run_benchmark(iterations=args.iterations, supply=tuple(args.supply), seed=args.seed,
+                           step_time_limit=step_time_limit, trace_memory=args.trace_memory, record_path=args.record)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,2 +1,6 @@
-# re-export
-from .main import MyBot
+# re-export, loaded on first use so `import bot` stays cheap
+def __getattr__(name):
+    if name == "MyBot":
+        from .main import MyBot
+        return MyBot
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,60 @@
+from typing import Dict, Iterable, List, Tuple, Union
+
+from sc2.client import Client
+from sc2.constants import AbilityId
+from sc2.unit import Unit
+from sc2.units import Units
+
+
+class AbilityCache:
+    """Frame-scoped cache of available abilities, keyed by unit tag.
+
+    `prefetch` sends one batched query for every unit that will be checked this frame;
+    `get` answers from the cache and only queries the game for units it has not seen.
+    """
+
+    def __init__(self):
+        self.game_loop = -1
+        self.cache: Dict[Tuple[int, bool], List[AbilityId]] = {}
+        self.queries = 0
+        self.hits = 0
+
+    def _reset_if_new_frame(self, game_loop: int):
+        if game_loop != self.game_loop:
+            self.game_loop = game_loop
+            self.cache = {}
+            self.queries = 0
+            self.hits = 0
+
+    async def _query(self, client: Client, units: List[Unit], ignore_resource_requirements: bool):
+        missing = []
+        seen = set()
+        for u in units:
+            if (u.tag, ignore_resource_requirements) not in self.cache and u.tag not in seen:
+                missing.append(u)
+                seen.add(u.tag)
+        if not missing:
+            return
+        self.queries += 1
+        result = await client.query_available_abilities(missing, ignore_resource_requirements)
+        for u, abilities in zip(missing, result):
+            self.cache[(u.tag, ignore_resource_requirements)] = abilities
+
+    async def prefetch(self, client: Client, game_loop: int, units: Iterable[Unit],
+                       ignore_resource_requirements: bool = False):
+        self._reset_if_new_frame(game_loop)
+        await self._query(client, list(units), ignore_resource_requirements)
+
+    async def get(self, client: Client, game_loop: int, units: Union[Unit, List[Unit], Units],
+                  ignore_resource_requirements: bool = False) -> Union[List[AbilityId], List[List[AbilityId]]]:
+        self._reset_if_new_frame(game_loop)
+        single = isinstance(units, Unit)
+        if single:
+            units = [units]
+        before = self.queries
+        await self._query(client, units, ignore_resource_requirements)
+        if self.queries == before:
+            self.hits += 1
+        # copies, callers are free to mutate the result (see upgrade_building)
+        result = [list(self.cache[(u.tag, ignore_resource_requirements)]) for u in units]
+        return result[0] if single else result
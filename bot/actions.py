@@ -0,0 +1,133 @@
+from collections import Counter
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from sc2.constants import AbilityId
+from sc2.unit import Unit
+from sc2.unit_command import UnitCommand
+
+TargetKey = Union[None, int, Tuple[float, float]]
+
+STOPS = {AbilityId.STOP, AbilityId.STOP_STOP}
+
+
+def target_key(target) -> TargetKey:
+    # a unit tag, a rounded position or None; order targets are tags or proto points
+    if target is None:
+        return None
+    if isinstance(target, Unit):
+        return target.tag
+    if isinstance(target, int):
+        return target or None
+    return round(target.x, 2), round(target.y, 2)
+
+
+class CommandFilter:
+    """Drops commands that would not change what a unit is doing.
+
+    Queued commands and commands without a target always go through. A command is dropped
+    when the unit's current order already has its ability and target, or when it repeats
+    the last command sent to the unit and the unit is still on that target (the order may
+    report a more specific ability than the one that was sent). A stop for an idle unit is
+    dropped too.
+    """
+
+    def __init__(self):
+        self.last: Dict[int, Tuple[AbilityId, TargetKey]] = {}
+        self.sent = 0
+        self.suppressed = Counter()
+
+    def forget(self, tag: int):
+        self.last.pop(tag, None)
+
+    def _redundant(self, a: UnitCommand) -> Optional[str]:
+        if a.queue:
+            return None
+        orders = a.unit.orders
+        if a.ability in STOPS:
+            return "idle_stop" if not orders else None
+        if a.target is None or not orders:
+            return None
+        order = orders[0]
+        target = target_key(a.target)
+        if target_key(order.target) != target:
+            return None
+        if a.ability.value in (order.ability.id.value, order.ability._proto.ability_id):
+            return "same_order"
+        if self.last.get(a.unit.tag) == (a.ability, target):
+            return "repeated"
+        return None
+
+    def filter(self, actions: List[UnitCommand]) -> List[UnitCommand]:
+        result = []
+        for a in actions:
+            reason = self._redundant(a)
+            if reason is not None:
+                self.suppressed[reason] += 1
+                continue
+            result.append(a)
+            if not a.queue:
+                self.last[a.unit.tag] = (a.ability, target_key(a.target))
+        self.sent += len(result)
+        return result
+
+    def stats(self) -> Dict:
+        suppressed = sum(self.suppressed.values())
+        total = self.sent + suppressed
+        return {
+            "sent": self.sent,
+            "suppressed": suppressed,
+            "suppressed_by_reason": dict(self.suppressed),
+            "suppressed_ratio": suppressed / total if total else 0.0,
+        }
+
+
+class CommandGrouper:
+    """Orders a frame's commands so that identical (ability, target, queue) commands are adjacent.
+
+    `Client.actions` merges adjacent identical commands into one raw command carrying every
+    unit tag, so 150 zerglings attacking the same target become one command. A command
+    only joins an earlier group if none of the unit's own commands come in between, so
+    every unit still gets its commands in the order they were issued.
+    """
+
+    def __init__(self):
+        self.commands = 0
+        self.raw_commands = 0
+        self.ratios: List[float] = []
+
+    def group(self, actions: List[UnitCommand]) -> List[UnitCommand]:
+        groups: List[List[UnitCommand]] = []
+        keys: List[Tuple] = []
+        latest: Dict[Tuple, int] = {}
+        last_group: Dict[int, int] = {}
+        for a in actions:
+            key = a.combining_tuple
+            tag = a.unit.tag
+            i = latest.get(key)
+            if i is None or i < last_group.get(tag, -1):
+                i = len(groups)
+                groups.append([])
+                keys.append(key)
+                latest[key] = i
+            groups[i].append(a)
+            last_group[tag] = i
+        # groups with the same key that end up next to each other are merged by the client as well
+        raw = sum(1 for i, key in enumerate(keys) if i == 0 or keys[i - 1] != key)
+        if actions:
+            self.commands += len(actions)
+            self.raw_commands += raw
+            self.ratios.append(len(actions) / raw)
+        return [a for g in groups for a in g]
+
+    def stats(self) -> Dict:
+        ratios = np.asarray(self.ratios) if self.ratios else np.zeros(1)
+        return {
+            "commands": self.commands,
+            "raw_commands": self.raw_commands,
+            "compression_ratio": self.commands / self.raw_commands if self.raw_commands else 1.0,
+            "frame_ratio_p50": float(np.percentile(ratios, 50)),
+            "frame_ratio_max": float(ratios.max()),
+            "frame_ratio_last": float(ratios[-1]),
+        }
@@ -0,0 +1,231 @@
+import threading
+from collections import Counter, deque
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional
+
+import numpy as np
+import sc2
+from sc2.constants import UnitTypeId
+from sc2.position import Point2
+
+from .creep import CreepMap
+from .influence import HOME_RADIUS
+
+logger = sc2.main.logger
+
+# each step uses the analysis of the frame this many iterations earlier
+MAX_AGE = 2
+# an expansion with a townhall this close is taken
+TAKEN_RADIUS = 10
+
+
+class Snapshot(NamedTuple):
+    """What the analysis needs of a frame, as plain data the game state can't change under it."""
+    iteration: int
+    game_loop: int
+    start: Point2
+    enemy_start: Point2
+    # visible enemy units that need supply
+    enemy_types: np.ndarray
+    enemy_positions: np.ndarray
+    enemy_supply: np.ndarray
+    townhalls: np.ndarray
+    ready_townhalls: np.ndarray
+    enemy_townhalls: np.ndarray
+    expansions: List[Point2]
+    creep: CreepMap
+    # tag -> position of every burrowed creep tumor
+    tumors: Dict[int, Point2]
+    # position of every creep tumor, burrowed or not
+    all_tumors: np.ndarray
+
+
+class Analysis(NamedTuple):
+    iteration: int
+    game_loop: int
+    # visible enemy units by type
+    composition: Dict[UnitTypeId, int]
+    # supply of visible enemies within HOME_RADIUS of a townhall
+    home_threat: float
+    # expansions, in the given order, with no townhall of either side on them
+    free_expansions: List[Point2]
+    # tumor tag -> spot for its next tumor
+    tumor_spots: Dict[int, Optional[Point2]]
+    queen_tumor_spot: Optional[Point2]
+
+
+def points(positions) -> np.ndarray:
+    return np.array([(p.x, p.y) for p in positions], dtype=np.float64).reshape(-1, 2)
+
+
+def within(a: np.ndarray, b: np.ndarray, radius: float) -> np.ndarray:
+    # for every row of `a`, whether a row of `b` is closer than `radius`
+    if not len(a) or not len(b):
+        return np.zeros(len(a), dtype=bool)
+    d2 = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2)
+    return (d2 < radius * radius).any(axis=1)
+
+
+def furthest(positions: np.ndarray, p: Point2) -> Optional[np.ndarray]:
+    if not len(positions):
+        return None
+    return positions[((positions - np.array(p)) ** 2).sum(axis=1).argmax()]
+
+
+def analyze(s: Snapshot) -> Analysis:
+    composition = Counter(UnitTypeId(t) for t in s.enemy_types.tolist())
+    home = within(s.enemy_positions, s.townhalls, HOME_RADIUS)
+
+    expansions = points(s.expansions)
+    taken = within(expansions, np.concatenate([s.townhalls, s.enemy_townhalls]), TAKEN_RADIUS)
+    free = [p for p, t in zip(s.expansions, taken) if not t]
+
+    tumor_spots = {tag: s.creep.tumor_spot(p, s.enemy_start) for tag, p in s.tumors.items()}
+    # the queen spreads from the furthest ready townhall, or from the furthest tumor if that is further out
+    queen_tumor_spot = None
+    origin = furthest(s.ready_townhalls, s.start)
+    if origin is not None:
+        tumor = furthest(s.all_tumors, s.start)
+        start = np.array(s.start)
+        if tumor is not None and ((tumor - start) ** 2).sum() > ((origin - start) ** 2).sum():
+            origin = tumor
+        queen_tumor_spot = s.creep.tumor_spot(Point2((float(origin[0]), float(origin[1]))), s.enemy_start)
+
+    return Analysis(
+        iteration=s.iteration,
+        game_loop=s.game_loop,
+        composition=dict(composition),
+        home_threat=float(s.enemy_supply[home].sum()),
+        free_expansions=free,
+        tumor_spots=tumor_spots,
+        queen_tumor_spot=queen_tumor_spot,
+    )
+
+
+class AnalysisWorker:
+    """Runs `analyze` on a background thread, `max_age` frames behind the step.
+
+    `result(iteration)` returns the analysis of the newest snapshot submitted at least
+    `max_age` iterations earlier, or of the first snapshot early in the game, and waits
+    for it if the worker is not done yet. Which snapshot that is only depends on the
+    iterations, so a game replays the same with or without the thread and on any number
+    of cores. Snapshots no later `result` can ask for are skipped. Without `threaded`,
+    or once `analyze` raised on the thread, every analysis runs inline in `result`.
+    """
+
+    def __init__(self, analyze: Callable[[Snapshot], Analysis] = analyze, max_age: int = MAX_AGE,
+                 threaded: bool = True):
+        self.analyze = analyze
+        self.max_age = max_age
+        self.threaded = threaded
+        self.condition = threading.Condition()
+        self.pending: Deque[Snapshot] = deque()
+        self.done: Deque[Analysis] = deque()
+        # iteration of the snapshot the thread is analyzing
+        self.running: Optional[int] = None
+        self.latest_submitted = 0
+        self.closed = False
+        self.submitted = 0
+        self.replaced = 0
+        self.completed = 0
+        self.waits = 0
+        self.errors = 0
+        self.ages: Counter = Counter()
+        self.thread: Optional[threading.Thread] = None
+        if threaded:
+            self.thread = threading.Thread(target=self._work, name="analysis", daemon=True)
+            self.thread.start()
+
+    def submit(self, snapshot: Snapshot):
+        with self.condition:
+            self.pending.append(snapshot)
+            self.latest_submitted = snapshot.iteration
+            self.submitted += 1
+            self.condition.notify_all()
+
+    def _take(self) -> Snapshot:
+        # a snapshot is never asked for once a newer one is old enough for every later step
+        while len(self.pending) > 1 and self.pending[1].iteration <= self.latest_submitted - self.max_age:
+            self.pending.popleft()
+            self.replaced += 1
+        return self.pending.popleft()
+
+    def _run(self, s: Snapshot) -> Analysis:
+        try:
+            return self.analyze(s)
+        except Exception:
+            self.errors += 1
+            if not self.done:
+                raise
+            # this step goes on with the previous analysis
+            logger.exception("analysis of iteration %s failed", s.iteration)
+            return self.done[-1]._replace(iteration=s.iteration, game_loop=s.game_loop)
+
+    def _complete(self, a: Analysis):
+        self.done.append(a)
+        self.completed += 1
+
+    def _work(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                s = self._take()
+                self.running = s.iteration
+            try:
+                a = self.analyze(s)
+            except Exception:
+                logger.exception("analysis thread failed, analyzing inline from now on")
+                with self.condition:
+                    self.errors += 1
+                    self.threaded = False
+                    self.running = None
+                    self.pending.appendleft(s)
+                    self.condition.notify_all()
+                return
+            with self.condition:
+                self.running = None
+                self._complete(a)
+                self.condition.notify_all()
+
+    def _target(self, iteration: int) -> int:
+        # the iteration of the snapshot `result` returns the analysis of
+        old = [a.iteration for a in self.done] + [s.iteration for s in self.pending]
+        if self.running is not None:
+            old.append(self.running)
+        ready = [i for i in old if i <= iteration - self.max_age]
+        return max(ready) if ready else min(old)
+
+    def result(self, iteration: int) -> Analysis:
+        with self.condition:
+            target = self._target(iteration)
+            if not self.done or self.done[-1].iteration < target:
+                self.waits += 1
+            while not self.done or self.done[-1].iteration < target:
+                if not self.threaded:
+                    self._complete(self._run(self._take()))
+                else:
+                    self.condition.wait()
+            while self.done[0].iteration < target:
+                self.done.popleft()
+            a = self.done[0]
+            self.ages[iteration - a.iteration] += 1
+            return a
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+
+    def stats(self) -> Dict:
+        return {
+            "submitted": self.submitted,
+            "replaced": self.replaced,
+            "completed": self.completed,
+            "waits": self.waits,
+            "errors": self.errors,
+            "age_frames": dict(sorted(self.ages.items())),
+        }
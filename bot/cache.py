@@ -0,0 +1,82 @@
+from collections import Counter
+from functools import wraps
+from typing import Dict, Iterable, Set, Tuple
+
+# game loops per game second on faster speed
+LOOPS_PER_SECOND = 22.4
+
+
+class TriggerCache:
+    """Values of `property_cache_ttl` properties, with the triggers that invalidate them.
+
+    A trigger is a named generation counter; `fire` bumps it and `watch` bumps it whenever
+    the watched set of tags changes. A cached value is stale once it is older than its TTL
+    or once one of its triggers fired after it was computed. `hits` counts the frames a
+    value was reused on instead of recomputed.
+    """
+
+    def __init__(self):
+        self.values: Dict[str, Tuple[object, int, Tuple[int, ...]]] = {}
+        self.generations: Counter = Counter()
+        self.watched: Dict[str, Set[int]] = {}
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self.invalidations: Counter = Counter()
+
+    def fire(self, trigger: str):
+        self.generations[trigger] += 1
+        self.invalidations[trigger] += 1
+
+    def watch(self, trigger: str, tags: Iterable[int]):
+        tags = set(tags)
+        if self.watched.get(trigger) != tags:
+            if trigger in self.watched:
+                self.fire(trigger)
+            self.watched[trigger] = tags
+
+    def stats(self) -> Dict:
+        hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "by_property": {name: {"hits": self.hits[name], "misses": self.misses[name]}
+                            for name in sorted(set(self.hits) | set(self.misses))},
+            "invalidations": dict(self.invalidations),
+        }
+
+
+def property_cache_ttl(seconds: float = None, frames: int = None, on: Iterable[str] = ()):
+    """ Caches the property for `seconds` game seconds or `frames` game loops, whichever
+    is given, or until one of the triggers in `on` fires.
+    Only works on properties of the bot object, because it requires
+    access to self.state.game_loop and self.property_cache """
+    ttl = frames if frames is not None else int(seconds * LOOPS_PER_SECOND)
+    triggers = tuple(on)
+
+    def decorator(f):
+        name = f.__name__
+
+        @wraps(f)
+        def inner(self):
+            cache: TriggerCache = self.property_cache
+            game_loop = self.state.game_loop
+            generations = tuple(cache.generations[t] for t in triggers)
+            entry = cache.values.get(name)
+            if entry is not None and game_loop - entry[1] < ttl and entry[2] == generations:
+                # only reuse on a later frame counts, the per-frame cache would get the rest too
+                if entry[1] != game_loop:
+                    cache.hits[name] += 1
+                value = entry[0]
+            else:
+                cache.misses[name] += 1
+                value = f(self)
+                cache.values[name] = (value, game_loop, generations)
+            should_copy = type(value).__name__ == "Units" or isinstance(value, (list, set, dict, Counter))
+            if should_copy:
+                return value.copy()
+            return value
+
+        return property(inner)
+
+    return decorator
@@ -0,0 +1,25 @@
+import functools
+import json
+from pathlib import Path
+from typing import Callable, Dict
+
+BOTINFO_PATH = Path(__file__).parent / "../botinfo.json"
+
+
+@functools.lru_cache(maxsize=None)
+def bot_info() -> Dict:
+    with open(BOTINFO_PATH) as f:
+        return json.load(f)
+
+
+class BotInfo:
+    """Class attribute read from botinfo.json on first access, so importing the bot reads no files."""
+
+    def __init__(self, key: str, default=None, convert: Callable = None):
+        self.key = key
+        self.default = default
+        self.convert = convert
+
+    def __get__(self, obj, owner):
+        value = bot_info().get(self.key, self.default)
+        return self.convert(value) if self.convert is not None else value
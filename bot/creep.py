@@ -0,0 +1,127 @@
+import copy
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from sc2.pixel_map import PixelMap
+from sc2.position import Point2
+from sc2.units import Units
+
+# a tumor can spread creep this far
+TUMOR_RANGE = 10
+# no tumor closer than this to another one
+TUMOR_SPACING = 8
+# keep expansions free of creep tumors
+EXPANSION_CLEARANCE = 5
+
+
+def disc(radius: float) -> Tuple[np.ndarray, np.ndarray]:
+    # offsets of the cells within `radius` of a cell
+    r = int(np.ceil(radius))
+    dy, dx = np.mgrid[-r:r + 1, -r:r + 1]
+    inside = dx ** 2 + dy ** 2 <= radius * radius
+    return dx[inside], dy[inside]
+
+
+class CreepMap:
+    """Creep, creep frontier and the cells tumors may not be placed on, as (y, x) arrays.
+
+    `update` is called once per frame; the frontier is only recomputed around cells whose
+    creep changed and the tumor exclusion is only touched for tumors that appeared or died.
+    """
+
+    def __init__(self, placement_grid: PixelMap, expansions: Iterable[Point2]):
+        self.placeable: np.ndarray = placement_grid.data_numpy != 0
+        self.height, self.width = self.placeable.shape
+        self.creep: np.ndarray = np.zeros_like(self.placeable)
+        self.frontier: np.ndarray = np.zeros_like(self.placeable)
+        self.expansion_mask: np.ndarray = np.zeros_like(self.placeable)
+        for p in expansions:
+            self._stamp(self.expansion_mask, p, EXPANSION_CLEARANCE, True)
+        # number of tumors within TUMOR_SPACING of each cell
+        self.tumor_count: np.ndarray = np.zeros(self.placeable.shape, dtype=np.int16)
+        self.tumors: Dict[int, Point2] = {}
+        self.spread_offsets = disc(TUMOR_RANGE)
+
+    def _window(self, p: Point2, radius: float) -> Tuple[int, int, int, int]:
+        x0, x1 = max(int(p.x - radius), 0), min(int(p.x + radius) + 1, self.width)
+        y0, y1 = max(int(p.y - radius), 0), min(int(p.y + radius) + 1, self.height)
+        return x0, x1, y0, y1
+
+    def _stamp(self, grid: np.ndarray, p: Point2, radius: float, value):
+        x0, x1, y0, y1 = self._window(p, radius)
+        if x0 >= x1 or y0 >= y1:
+            return
+        ys, xs = np.ogrid[y0:y1, x0:x1]
+        inside = (xs + 0.5 - p.x) ** 2 + (ys + 0.5 - p.y) ** 2 < radius * radius
+        if grid.dtype == bool:
+            grid[y0:y1, x0:x1] |= inside
+        else:
+            grid[y0:y1, x0:x1] += inside * value
+
+    def _update_frontier(self, y0: int, y1: int, x0: int, x1: int):
+        # frontier: creep cells with a placeable neighbour that has no creep.
+        # cells next to a change may flip too, and reading their neighbours needs one more ring
+        wy0, wx0, wy1, wx1 = max(y0 - 1, 0), max(x0 - 1, 0), min(y1 + 1, self.height), min(x1 + 1, self.width)
+        ry0, rx0, ry1, rx1 = max(wy0 - 1, 0), max(wx0 - 1, 0), min(wy1 + 1, self.height), min(wx1 + 1, self.width)
+        c = self.creep[ry0:ry1, rx0:rx1]
+        open_cells = np.pad(~c & self.placeable[ry0:ry1, rx0:rx1], 1, mode="constant")
+        near_open = open_cells[:-2, 1:-1] | open_cells[2:, 1:-1] | open_cells[1:-1, :-2] | open_cells[1:-1, 2:]
+        frontier = c & near_open
+        self.frontier[wy0:wy1, wx0:wx1] = frontier[wy0 - ry0:wy1 - ry0, wx0 - rx0:wx1 - rx0]
+
+    def update(self, creep: PixelMap, tumors: Units):
+        current = creep.data_numpy != 0
+        changed = current != self.creep
+        if changed.any():
+            self.creep = current
+            rows = np.flatnonzero(changed.any(axis=1))
+            cols = np.flatnonzero(changed.any(axis=0))
+            self._update_frontier(rows[0], rows[-1] + 1, cols[0], cols[-1] + 1)
+
+        tags = tumors.tags
+        for tag in list(self.tumors):
+            if tag not in tags:
+                self._stamp(self.tumor_count, self.tumors.pop(tag), TUMOR_SPACING, -1)
+        for t in tumors:
+            if t.tag not in self.tumors:
+                self.tumors[t.tag] = t.position
+                self._stamp(self.tumor_count, t.position, TUMOR_SPACING, 1)
+
+    def snapshot(self) -> "CreepMap":
+        # a copy `update` does not touch; the creep array is replaced on change, not written to
+        c = copy.copy(self)
+        c.frontier = self.frontier.copy()
+        c.tumor_count = self.tumor_count.copy()
+        c.tumors = dict(self.tumors)
+        return c
+
+    def has_creep(self, p: Point2) -> bool:
+        x, y = int(p.x), int(p.y)
+        return 0 <= x < self.width and 0 <= y < self.height and bool(self.creep[y, x])
+
+    def can_place_tumor(self, p: Point2) -> bool:
+        x, y = int(p.x), int(p.y)
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        return bool(self.creep[y, x] and self.placeable[y, x] and not self.expansion_mask[y, x] and
+                    self.tumor_count[y, x] == 0)
+
+    def tumor_spot(self, origin: Point2, target: Point2, radius: float = TUMOR_RANGE) -> Optional[Point2]:
+        """Best cell within `radius` of `origin` for a new tumor, or None.
+
+        Prefers frontier cells, so new tumors push the creep edge, then cells closer to `target`.
+        """
+        dx, dy = self.spread_offsets if radius == TUMOR_RANGE else disc(radius)
+        xs = dx + int(origin.x)
+        ys = dy + int(origin.y)
+        on_map = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        xs, ys = xs[on_map], ys[on_map]
+        ok = self.creep[ys, xs] & self.placeable[ys, xs] & ~self.expansion_mask[ys, xs] & \
+             (self.tumor_count[ys, xs] == 0)
+        if not ok.any():
+            return None
+        xs, ys = xs[ok], ys[ok]
+        progress = -np.sqrt((xs + 0.5 - target.x) ** 2 + (ys + 0.5 - target.y) ** 2)
+        score = progress + self.frontier[ys, xs] * (2 * radius)
+        i = int(score.argmax())
+        return Point2((float(xs[i]) + 0.5, float(ys[i]) + 0.5))
@@ -0,0 +1,164 @@
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from sc2.constants import UnitTypeId
+from sc2.unit import Unit
+
+from .cache import LOOPS_PER_SECOND
+from .tag_store import TagStore
+
+WORKERS = {UnitTypeId.DRONE, UnitTypeId.SCV, UnitTypeId.PROBE}
+WORKER_IDS = np.array([t.value for t in WORKERS], dtype=np.int32)
+# enemy units not seen for three minutes are forgotten
+ENEMY_MEMORY = int(LOOPS_PER_SECOND * 180)
+# a velocity is only estimated from two sightings at most this many game loops apart
+VELOCITY_WINDOW = int(LOOPS_PER_SECOND * 2)
+# positions are not extrapolated further than this past the last sighting
+MAX_PREDICTION = int(LOOPS_PER_SECOND * 5)
+
+
+class EnemyTracker:
+    """Enemy units seen so far, one row per tag in the columns of a `TagStore`.
+
+    Every row has the type, position, health and supply of the last sighting, its game
+    loop, and a velocity in cells per game loop estimated from the previous sighting. A
+    frame's sightings are written as whole columns. The totals over the enemy forces among
+    them are kept running: a sighting replaces its row's previous contribution and a
+    removed row subtracts its own, so a frame costs O(units seen) plus the forces still
+    moving along their predicted path, not O(every unit ever seen). Units not seen for
+    `max_unseen` game loops are forgotten. `distance` measures how far an (n, 2) array of
+    positions is from home.
+    """
+
+    def __init__(self, distance: Callable[[np.ndarray], np.ndarray], max_unseen: int = ENEMY_MEMORY):
+        self.distance = distance
+        self.store = TagStore({
+            "type": np.int32,
+            "x": np.float64,
+            "y": np.float64,
+            "vx": np.float64,
+            "vy": np.float64,
+            "health": np.float64,
+            "supply": np.float64,
+            "flying": bool,
+            "force": bool,
+            # distance of the predicted position, as last counted in `distance_sum`
+            "distance": np.float64,
+        }, max_unseen)
+        # tags seen per type; a forgotten tag that shows up again counts twice
+        self.history: Counter = Counter()
+        self.game_loop = 0
+        self.supply: float = 0
+        self.air_supply: float = 0
+        self.stat: Counter = Counter()
+        self.distance_sum: float = 0
+        self.forces = 0
+        # moving forces -> game loop their predicted position stops moving at
+        self.moving: Dict[int, int] = {}
+
+    def column(self, name: str) -> np.ndarray:
+        return self.store.columns[name][:self.store.size]
+
+    def see_all(self, units: Iterable[Unit], game_loop: int):
+        self.game_loop = game_loop
+        seen = [(e.tag, e.type_id, e.position, e.health, e._type_data._proto.food_required, e.is_flying,
+                 e.health > 0 and not e.is_structure) for e in units]
+        written = set()
+        if seen:
+            written = self._write(seen, game_loop)
+        for tag in self.store.expired(game_loop):
+            self.remove(tag)
+        self._predict([t for t in self.moving if t not in written], game_loop)
+
+    def _count(self, rows: np.ndarray, sign: int):
+        # adds or subtracts the contribution of the force rows among `rows`
+        c = self.store.columns
+        rows = rows[c["force"][rows]]
+        supply = c["supply"][rows]
+        self.supply += sign * float(supply.sum())
+        self.air_supply += sign * float(supply[c["flying"][rows]].sum())
+        self.distance_sum += sign * float(c["distance"][rows].sum())
+        self.forces += sign * len(rows)
+        for t in c["type"][rows].tolist():
+            self.stat[UnitTypeId(t)] += sign
+            if self.stat[UnitTypeId(t)] <= 0:
+                del self.stat[UnitTypeId(t)]
+
+    def _write(self, seen, game_loop: int) -> Set[int]:
+        s, c = self.store, self.store.columns
+        tags, type_ids, positions, health, supply, flying, alive = zip(*seen)
+        rows, new = s.rows(tags)
+        for type_id, is_new in zip(type_ids, new.tolist()):
+            if is_new:
+                self.history[type_id] += 1
+        self._count(rows[~new], -1)
+        types = np.array([t.value for t in type_ids], dtype=np.int32)
+        x = np.array([p.x for p in positions])
+        y = np.array([p.y for p in positions])
+
+        # new tags and tags seen again after a while start at rest, same-loop sightings keep theirs
+        elapsed = game_loop - s.last_seen[rows]
+        moving = ~new & (0 < elapsed) & (elapsed <= VELOCITY_WINDOW)
+        kept = ~new & (elapsed == 0)
+        steps = np.maximum(elapsed, 1)
+        c["vx"][rows] = np.where(moving, (x - c["x"][rows]) / steps, np.where(kept, c["vx"][rows], 0))
+        c["vy"][rows] = np.where(moving, (y - c["y"][rows]) / steps, np.where(kept, c["vy"][rows], 0))
+
+        force = np.array(alive) & ~np.isin(types, WORKER_IDS)
+        c["type"][rows] = types
+        c["x"][rows] = x
+        c["y"][rows] = y
+        c["health"][rows] = health
+        c["supply"][rows] = supply
+        c["flying"][rows] = flying
+        c["force"][rows] = force
+        c["distance"][rows] = 0
+        if force.any():
+            c["distance"][rows[force]] = self.distance(np.stack([x[force], y[force]], axis=1))
+        s.last_seen[rows] = game_loop
+        self._count(rows, 1)
+
+        still = (c["vx"][rows] == 0) & (c["vy"][rows] == 0)
+        for tag, is_force, is_still in zip(tags, force.tolist(), still.tolist()):
+            if is_force and not is_still:
+                self.moving[tag] = game_loop + MAX_PREDICTION
+            else:
+                self.moving.pop(tag, None)
+        return set(tags)
+
+    def _predict(self, tags: List[int], game_loop: int):
+        # moves the forces not seen this frame along their predicted path
+        if not tags:
+            return
+        c = self.store.columns
+        rows = np.array([self.store.index[t] for t in tags], dtype=np.int64)
+        steps = np.minimum(game_loop - self.store.last_seen[rows], MAX_PREDICTION)
+        d = self.distance(np.stack([c["x"][rows] + c["vx"][rows] * steps,
+                                    c["y"][rows] + c["vy"][rows] * steps], axis=1))
+        self.distance_sum += float((d - c["distance"][rows]).sum())
+        c["distance"][rows] = d
+        for tag in tags:
+            if self.moving[tag] <= game_loop:
+                del self.moving[tag]
+
+    def remove(self, tag: int) -> bool:
+        if tag not in self.store:
+            return False
+        self._count(np.array([self.store.index[tag]]), -1)
+        was_force = bool(self.store.get(tag, "force"))
+        self.store.discard(tag)
+        self.moving.pop(tag, None)
+        return was_force
+
+    @property
+    def average_distance(self) -> Optional[float]:
+        if not self.forces:
+            return None
+        return self.distance_sum / self.forces
+
+    def count(self, unit_type: UnitTypeId) -> int:
+        return self.stat[unit_type]
+
+    def history_count(self, unit_types: Iterable[UnitTypeId]) -> int:
+        return sum(self.history[unit_type] for unit_type in unit_types)
@@ -0,0 +1,89 @@
+from typing import Dict, Optional, Set, Union
+
+import numpy as np
+from sc2.constants import UnitTypeId
+from sc2.unit import Unit
+from sc2.units import Units
+
+
+class EngagementMatrix:
+    """Distances and weapon reach between own units and visible enemies, built once per frame.
+
+    `in_range[i, j]` is the vectorized form of `enemies[j].target_in_range(own[i])`.
+    """
+
+    def __init__(self, own: Units, enemies: Units):
+        self.own = own
+        self.enemies = enemies
+        self.rows: Dict[int, int] = {u.tag: i for i, u in enumerate(own)}
+
+        own_pos = np.array([u.position for u in own], dtype=np.float64).reshape(-1, 2)
+        own_radius = np.array([u.radius for u in own], dtype=np.float64)
+        # colossus can be hit by anti-air as well
+        own_air = np.array([u.is_flying or u.type_id == UnitTypeId.COLOSSUS for u in own], dtype=bool)
+        own_flying = np.array([u.is_flying for u in own], dtype=bool)
+
+        enemy_pos = np.array([e.position for e in enemies], dtype=np.float64).reshape(-1, 2)
+        enemy_radius = np.array([e.radius for e in enemies], dtype=np.float64)
+        can_ground = np.array([e.can_attack_ground for e in enemies], dtype=bool)
+        can_air = np.array([e.can_attack_air for e in enemies], dtype=bool)
+        ground_range = np.array([e.ground_range for e in enemies], dtype=np.float64)
+        air_range = np.array([e.air_range for e in enemies], dtype=np.float64)
+        self.enemy_types = np.array([e.type_id.value for e in enemies], dtype=np.int32)
+
+        diff = own_pos[:, None, :] - enemy_pos[None, :, :]
+        self.distance: np.ndarray = np.sqrt((diff ** 2).sum(axis=2))
+
+        # same precedence as Unit.target_in_range: ground weapon first, then anti-air
+        use_ground = can_ground[None, :] & ~own_flying[:, None]
+        use_air = ~use_ground & can_air[None, :] & own_air[:, None]
+        self.range: np.ndarray = np.where(
+            use_ground, ground_range[None, :], np.where(use_air, air_range[None, :], -np.inf))
+        reach = own_radius[:, None] + enemy_radius[None, :] + self.range
+        self.in_range: np.ndarray = self.distance <= reach
+
+    def _row(self, u: Unit) -> Optional[int]:
+        return self.rows.get(u.tag)
+
+    def _pick(self, mask: np.ndarray) -> Units:
+        return Units([self.enemies[j] for j in np.flatnonzero(mask)])
+
+    def _closest(self, i: int, mask: np.ndarray) -> Optional[Unit]:
+        if not mask.any():
+            return None
+        d = np.where(mask, self.distance[i], np.inf)
+        return self.enemies[int(d.argmin())]
+
+    def threats(self, u: Unit) -> Units:
+        i = self._row(u)
+        if i is None:
+            return Units([])
+        return self._pick(self.in_range[i])
+
+    def closest_threat(self, u: Unit) -> Optional[Unit]:
+        i = self._row(u)
+        if i is None:
+            return None
+        return self._closest(i, self.in_range[i])
+
+    def closer_than(self, distance: Union[int, float], u: Unit) -> Units:
+        i = self._row(u)
+        if i is None:
+            return Units([])
+        return self._pick(self.distance[i] < distance)
+
+    def count_closer_than(self, distance: Union[int, float], u: Unit, types: Set[UnitTypeId] = None) -> int:
+        i = self._row(u)
+        if i is None:
+            return 0
+        mask = self.distance[i] < distance
+        if types is not None:
+            mask &= np.isin(self.enemy_types, [t.value for t in types])
+        return int(mask.sum())
+
+    def closest_of_type(self, u: Unit, types: Set[UnitTypeId], distance: Union[int, float]) -> Optional[Unit]:
+        i = self._row(u)
+        if i is None:
+            return None
+        mask = (self.distance[i] < distance) & np.isin(self.enemy_types, [t.value for t in types])
+        return self._closest(i, mask)
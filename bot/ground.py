@@ -0,0 +1,176 @@
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from sc2.position import Point2
+from sc2.units import Units
+
+# step costs in half cells, so a diagonal costs 1.5 instead of sqrt(2)
+ORTHOGONAL = 2
+DIAGONAL = 3
+UNREACHABLE = np.iinfo(np.int32).max
+
+
+def unique(a: np.ndarray) -> np.ndarray:
+    # np.unique without its masked-array check, which imports numpy.ma on first use
+    a = np.sort(a)
+    return a[np.concatenate(([True], a[1:] != a[:-1]))] if a.size else a
+
+
+def distance_field(pathable: np.ndarray, sources: Iterable[Point2]) -> np.ndarray:
+    """Ground distance from the nearest source to every cell of a (y, x) pathing array, inf if unreachable.
+
+    Dial's algorithm over the 8-neighbour grid; every level expands its whole frontier with
+    array operations, so the cost is O(cells) plus a few NumPy calls per distance level.
+    """
+    h, w = pathable.shape
+    # a blocked border, so neighbours of real cells never wrap around
+    open_cells = np.zeros((h + 2, w + 2), dtype=bool)
+    open_cells[1:-1, 1:-1] = pathable
+    open_cells = open_cells.ravel()
+    dist = np.full(open_cells.shape, UNREACHABLE, dtype=np.int32)
+    stride = w + 2
+    steps = [(o, ORTHOGONAL) for o in (1, -1, stride, -stride)] + \
+            [(o, DIAGONAL) for o in (stride + 1, stride - 1, -stride + 1, -stride - 1)]
+
+    start = []
+    for p in sources:
+        x, y = int(p.x), int(p.y)
+        if 0 <= x < w and 0 <= y < h:
+            start.append((y + 1) * stride + x + 1)
+    buckets: Dict[int, List[np.ndarray]] = {0: [unique(np.array(start, dtype=np.int64))]}
+    dist[buckets[0][0]] = 0
+    level = 0
+    while buckets:
+        if level not in buckets:
+            level += 1
+            continue
+        cells = unique(np.concatenate(buckets.pop(level)))
+        cells = cells[dist[cells] == level]
+        for offset, cost in steps:
+            n = cells + offset
+            n = n[open_cells[n] & (dist[n] > level + cost)]
+            if n.size:
+                dist[n] = level + cost
+                buckets.setdefault(level + cost, []).append(n)
+        level += 1
+
+    result = dist.reshape(h + 2, w + 2)[1:-1, 1:-1].astype(np.float64) / ORTHOGONAL
+    result[dist.reshape(h + 2, w + 2)[1:-1, 1:-1] == UNREACHABLE] = np.inf
+    return result
+
+
+def open_footprints(pathable: np.ndarray, points: Iterable[Point2], radius: float = 3) -> np.ndarray:
+    # town hall spots are blocked once something is built there, but they are where paths start and end
+    pathable = pathable.copy()
+    h, w = pathable.shape
+    for p in points:
+        x0, x1 = max(int(p.x - radius), 0), min(int(p.x + radius) + 1, w)
+        y0, y1 = max(int(p.y - radius), 0), min(int(p.y + radius) + 1, h)
+        pathable[y0:y1, x0:x1] = True
+    return pathable
+
+
+class ExpansionDistances:
+    """Ground distances between every expansion and both start locations, computed once.
+
+    `points` are the expansions followed by the own and the enemy start location;
+    `distance[i, j]` is the ground distance between `points[i]` and `points[j]` and
+    `fields[i]` the distance field of `points[i]`. `pathable` is the pathing grid with the
+    townhall footprints opened.
+    """
+
+    def __init__(self, pathable: np.ndarray, expansions: Iterable[Point2], start: Point2, enemy_start: Point2,
+                 distance: np.ndarray = None, fields: np.ndarray = None):
+        # `distance` and `fields` of an earlier run on the same map skip the BFS
+        self.expansions: List[Point2] = list(expansions)
+        self.points: List[Point2] = self.expansions + [start, enemy_start]
+        self.start = len(self.expansions)
+        self.enemy_start = self.start + 1
+        self.index: Dict[Point2, int] = {p: i for i, p in enumerate(self.points)}
+        if fields is not None:
+            self.pathable, self.distance, self.fields = pathable, distance, fields
+            return
+        self.pathable = open_footprints(pathable, self.points)
+        n = len(self.points)
+        self.distance = np.zeros((n, n))
+        self.fields = np.zeros((n,) + pathable.shape, dtype=np.float32)
+        cells = [(int(p.y), int(p.x)) for p in self.points]
+        for i, p in enumerate(self.points):
+            field = distance_field(self.pathable, [p])
+            self.distance[i] = [field[c] for c in cells]
+            self.fields[i] = field
+
+    def sorted_from(self, i: int) -> List[Point2]:
+        # expansions by ground distance from points[i]; unreachable ones last, by straight distance
+        order = sorted(range(len(self.expansions)),
+                       key=lambda j: (self.distance[i, j], self.points[i].distance_to(self.expansions[j])))
+        return [self.expansions[j] for j in order]
+
+    def tour(self, first: Point2, among: Iterable[Point2]) -> List[Point2]:
+        """Greedy nearest-neighbour route through `among`, starting at `first`."""
+        left = [self.index[p] for p in among if p != first]
+        route = [first]
+        i = self.index[first]
+        while left:
+            j = min(left, key=lambda k: (self.distance[i, k], self.points[i].distance_to(self.points[k])))
+            left.remove(j)
+            route.append(self.points[j])
+            i = j
+        return route
+
+
+class DistanceFields:
+    """Ground distance from a key location to any position, as one array lookup.
+
+    Sources are "start", "enemy_start", "rally" or an expansion location. The start and
+    expansion fields come from `ExpansionDistances`; the rally point field is computed on
+    first use after the rally point moved to another cell. Positions the ground cannot
+    reach (cliffs, flying units, unreachable islands) get the straight-line distance.
+    """
+
+    def __init__(self, expansions: ExpansionDistances):
+        self.expansions = expansions
+        self.rally: Optional[Point2] = None
+        self.rally_cell: Optional[Tuple[int, int]] = None
+        self.rally_field: Optional[np.ndarray] = None
+        self.rally_fields_computed = 0
+
+    def set_rally(self, p: Point2):
+        cell = int(p.x), int(p.y)
+        if cell != self.rally_cell:
+            self.rally, self.rally_cell, self.rally_field = p, cell, None
+
+    def _source(self, source: Union[str, Point2]) -> Tuple[Point2, np.ndarray]:
+        e = self.expansions
+        if source == "rally":
+            if self.rally_field is None:
+                self.rally_field = distance_field(e.pathable, [self.rally]).astype(np.float32)
+                self.rally_fields_computed += 1
+            return self.rally, self.rally_field
+        i = e.start if source == "start" else e.enemy_start if source == "enemy_start" else e.index[source]
+        return e.points[i], e.fields[i]
+
+    def distance(self, source: Union[str, Point2], p: Point2) -> float:
+        origin, field = self._source(source)
+        x, y = int(p.x), int(p.y)
+        h, w = field.shape
+        if 0 <= x < w and 0 <= y < h and field[y, x] < np.inf:
+            return float(field[y, x])
+        return origin.distance_to_point2(p)
+
+    def distances(self, source: Union[str, Point2], positions: np.ndarray) -> np.ndarray:
+        # `distance` for every row of an (n, 2) array of positions
+        origin, field = self._source(source)
+        h, w = field.shape
+        x, y = positions[:, 0].astype(np.int64), positions[:, 1].astype(np.int64)
+        inside = (0 <= x) & (x < w) & (0 <= y) & (y < h)
+        d = np.full(len(positions), np.inf)
+        d[inside] = field[y[inside], x[inside]]
+        straight = np.hypot(positions[:, 0] - origin.x, positions[:, 1] - origin.y)
+        return np.where(d < np.inf, d, straight)
+
+    def closer_than(self, source: Union[str, Point2], distance: float, units: Units) -> Units:
+        return units.filter(lambda u: self.distance(source, u.position) < distance)
+
+    def further_than(self, source: Union[str, Point2], distance: float, units: Units) -> Units:
+        return units.filter(lambda u: self.distance(source, u.position) > distance)
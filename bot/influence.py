@@ -0,0 +1,186 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sc2.constants import UnitTypeId
+from sc2.pixel_map import PixelMap
+from sc2.position import Point2
+from sc2.unit import Unit
+from sc2.units import Units
+
+# threat reaches this far past weapon range plus unit radius
+THREAT_MARGIN = 1
+# a townhall with a visible enemy this close does not get new workers
+PRESENCE_RADIUS = 10
+# no buildings this close to enemy static defense
+STATIC_DEFENSE_RADIUS = 7
+# enemies this close to a townhall count as attacking it
+HOME_RADIUS = 20
+# directions tried for a retreat
+RETREAT_DIRECTIONS = 16
+
+Splat = Tuple[int, int, float, float, float, float]
+
+
+def stamp(grid: np.ndarray, x: float, y: float, radius: float, value):
+    # adds `value` to every cell whose center is within `radius` of (x, y)
+    h, w = grid.shape
+    x0, x1 = max(int(x - radius), 0), min(int(x + radius) + 1, w)
+    y0, y1 = max(int(y - radius), 0), min(int(y + radius) + 1, h)
+    if x0 >= x1 or y0 >= y1:
+        return
+    ys, xs = np.ogrid[y0:y1, x0:x1]
+    inside = (xs + 0.5 - x) ** 2 + (ys + 0.5 - y) ** 2 < radius * radius
+    grid[y0:y1, x0:x1] += inside * value
+
+
+class InfluenceMap:
+    """Enemy threat and presence on (y, x) grids of pathing resolution.
+
+    `ground`/`air` hold the summed DPS of visible enemies that can hit a unit standing in
+    a cell, `presence` the number of visible enemies within PRESENCE_RADIUS, `static_defense`
+    the known cannons, spines and bunkers within STATIC_DEFENSE_RADIUS and `home` the own
+    townhalls within HOME_RADIUS. `update` runs once per frame and only restamps units that
+    moved to another cell, appeared or disappeared, so every query is a single lookup.
+    """
+
+    def __init__(self, pathing_grid: PixelMap):
+        self.pathable: np.ndarray = pathing_grid.data_numpy != 0
+        self.height, self.width = self.pathable.shape
+        self.ground: np.ndarray = np.zeros(self.pathable.shape)
+        self.air: np.ndarray = np.zeros(self.pathable.shape)
+        self.presence: np.ndarray = np.zeros(self.pathable.shape, dtype=np.int16)
+        self.static_defense: np.ndarray = np.zeros(self.pathable.shape, dtype=np.int16)
+        self.home: np.ndarray = np.zeros(self.pathable.shape, dtype=np.int16)
+        # tag -> (cell x, cell y, ground reach, ground dps, air reach, air dps)
+        self.splats: Dict[int, Splat] = {}
+        self.structures: Dict[int, Point2] = {}
+        self.townhalls: Dict[int, Point2] = {}
+        self.discs: Dict[float, Tuple[np.ndarray, np.ndarray]] = {}
+        self.type_stats: Dict[UnitTypeId, Tuple[float, float, float, float]] = {}
+
+    def _disc(self, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        d = self.discs.get(radius)
+        if d is None:
+            r = int(math.ceil(radius))
+            dy, dx = np.mgrid[-r:r + 1, -r:r + 1]
+            inside = dx ** 2 + dy ** 2 < radius * radius
+            d = self.discs[radius] = (dx[inside], dy[inside])
+        return d
+
+    def _splat(self, s: Splat, sign: int, changes: Dict[str, List]):
+        x, y, ground_reach, ground_dps, air_reach, air_dps = s
+        if ground_dps > 0:
+            changes["ground"].append((x, y, ground_reach, sign * ground_dps))
+        if air_dps > 0:
+            changes["air"].append((x, y, air_reach, sign * air_dps))
+        changes["presence"].append((x, y, PRESENCE_RADIUS, sign))
+
+    def _apply(self, grid: np.ndarray, splats: List[Tuple[int, int, float, float]]):
+        # all splats of one layer in a single bincount, with one broadcast per distinct radius
+        by_radius: Dict[float, List] = {}
+        for x, y, radius, value in splats:
+            by_radius.setdefault(radius, []).append((x, y, value))
+        cells, weights = [], []
+        for radius, group in by_radius.items():
+            dx, dy = self._disc(radius)
+            g = np.array(group)
+            xs = g[:, 0, None].astype(np.int64) + dx
+            ys = g[:, 1, None].astype(np.int64) + dy
+            on_map = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+            cells.append((ys * self.width + xs)[on_map])
+            weights.append(np.broadcast_to(g[:, 2, None], xs.shape)[on_map])
+        delta = np.bincount(np.concatenate(cells), np.concatenate(weights), minlength=grid.size).reshape(grid.shape)
+        if grid.dtype == np.float64:
+            grid += delta
+        else:
+            grid += np.rint(delta).astype(grid.dtype)
+
+    def _of(self, e: Unit) -> Splat:
+        # weapon stats are looked up once per type, range upgrades are not taken into account
+        stats = self.type_stats.get(e.type_id)
+        if stats is None:
+            reach = e.radius + THREAT_MARGIN
+            stats = self.type_stats[e.type_id] = (e.ground_range + reach, e.ground_dps,
+                                                  e.air_range + reach, e.air_dps)
+        p = e.position
+        return (int(p.x), int(p.y)) + stats
+
+    def _sync(self, grid: np.ndarray, known: Dict[int, Point2], units: Units, radius: float):
+        tags = units.tags
+        for tag in [t for t in known if t not in tags]:
+            p = known.pop(tag)
+            stamp(grid, p.x, p.y, radius, -1)
+        for u in units:
+            if u.tag not in known:
+                known[u.tag] = u.position
+                stamp(grid, u.position.x, u.position.y, radius, 1)
+
+    def update(self, enemies: Units, static_defense: Units, townhalls: Units):
+        # every splat that changed is collected first, then applied layer by layer
+        changes: Dict[str, List] = {"ground": [], "air": [], "presence": []}
+        tags = enemies.tags
+        for tag in [t for t in self.splats if t not in tags]:
+            self._splat(self.splats.pop(tag), -1, changes)
+        for e in enemies:
+            s = self._of(e)
+            old = self.splats.get(e.tag)
+            if old == s:
+                continue
+            if old is not None:
+                self._splat(old, -1, changes)
+            self._splat(s, 1, changes)
+            self.splats[e.tag] = s
+        for layer, splats in changes.items():
+            if splats:
+                self._apply(getattr(self, layer), splats)
+        self._sync(self.static_defense, self.structures, static_defense, STATIC_DEFENSE_RADIUS)
+        self._sync(self.home, self.townhalls, townhalls, HOME_RADIUS)
+
+    def _cell(self, p: Point2) -> Optional[Tuple[int, int]]:
+        x, y = int(p.x), int(p.y)
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return y, x
+        return None
+
+    def _at(self, grid: np.ndarray, p: Point2, outside=0):
+        c = self._cell(p)
+        return grid[c] if c is not None else outside
+
+    def threat(self, p: Point2, flying: bool = False) -> float:
+        # incremental updates leave rounding noise where the threat went away
+        v = self._at(self.air if flying else self.ground, p)
+        return float(v) if v > 1e-6 else 0.0
+
+    def enemy_near(self, p: Point2) -> bool:
+        return self._at(self.presence, p) > 0
+
+    def static_defense_near(self, p: Point2) -> bool:
+        return self._at(self.static_defense, p) > 0
+
+    def near_home(self, p: Point2) -> bool:
+        return self._at(self.home, p) > 0
+
+    def retreat(self, p: Point2, distance: float, flying: bool = False,
+                away_from: Optional[Point2] = None) -> Optional[Point2]:
+        """The point `distance` away from `p` with the least threat, or None if nowhere is safer.
+
+        Ties go to the point furthest from `away_from`, so inside a flat threat area the unit
+        still backs off from the enemy it is fighting.
+        """
+        here = self.threat(p, flying)
+        if distance <= 0:
+            return None
+        best, best_score = None, None
+        for i in range(RETREAT_DIRECTIONS):
+            a = 2 * math.pi * i / RETREAT_DIRECTIONS
+            q = Point2((p.x + distance * math.cos(a), p.y + distance * math.sin(a)))
+            c = self._cell(q)
+            if c is None or (not flying and not self.pathable[c]):
+                continue
+            score = (self.threat(q, flying), -q.distance_to_point2(away_from) if away_from is not None else 0)
+            if best_score is None or score < best_score:
+                best, best_score = q, score
+        if best is None or (best_score[0] >= here and away_from is None):
+            return None
+        return best
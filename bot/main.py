@@ -1,53 +1,103 @@
-import json
 import logging
 import math
+import os
 import random
+import time
 from pathlib import Path
-from typing import List, Dict, Set, Union
+from typing import TYPE_CHECKING, List, Dict, Optional, Set, Union
 
+import numpy as np
 import sc2
 from sc2 import Race
-from sc2.cache import property_cache_once_per_frame
-from sc2.constants import *
-from sc2.position import Point2, Rect
+from sc2.cache import property_cache_forever, property_cache_once_per_frame
+from sc2.constants import AbilityId, UnitTypeId, UpgradeId
+from sc2.game_data import AbilityData
+from sc2.position import Point2
 from sc2.unit import Unit, UnitOrder
 from sc2.units import Units
 
+from .abilities import AbilityCache
+from .actions import CommandFilter, CommandGrouper
+from .analysis import Analysis, AnalysisWorker, Snapshot, points
+from .cache import TriggerCache, property_cache_ttl
+from .creep import CreepMap
+from .enemy_tracker import EnemyTracker
+from .config import BotInfo
+from .engagement import EngagementMatrix
+from .ground import DistanceFields, ExpansionDistances
+from .influence import InfluenceMap
+from .map_cache import MapAnalysis, load_map_analysis
+from .placement import PlacementCache
+from .profiler import Profiler, profiled
+from .saturation import MINERAL_WORKERS, SaturationIndex
+from .scheduler import Priority, StepScheduler
+from .spatial import UnitGrid
+from .squads import Squads
+from .strategy import build_order
+from .tag_store import TagStore
+from .telemetry import Telemetry
+
+if TYPE_CHECKING:
+    from .recorder import Recorder
+
 logger = sc2.main.logger
 
 HEALTH_PERCENT = 0.1
+# own units missing from the observation for this many game loops are dead (or stayed in a transport)
+OWN_MEMORY = 224
 
 
 class MyBot(sc2.BotAI):
-    with open(Path(__file__).parent / "../botinfo.json") as f:
-        NAME = json.load(f)["name"]
+    NAME = BotInfo("name")
+    LOG_LEVEL = BotInfo("log_level", "INFO", logging.getLevelName)
 
-    def __init__(self):
+    def __init__(self, record_path: str = None):
         super().__init__()
+        self.recorder: Optional["Recorder"] = None
+        if record_path is not None:
+            # only recording games needs gzip and pickle
+            from .recorder import Recorder
+            self.recorder = Recorder(record_path)
+        self.telemetry = Telemetry(logger, self.LOG_LEVEL)
+        self.property_cache = TriggerCache()
+        # on a single core the worker thread would only compete with the step
+        self.analysis_worker = AnalysisWorker(threaded=(os.cpu_count() or 1) > 1)
+        self.analysis: Analysis = None
+        self.saturation = SaturationIndex()
         self.last_scout_time = 0
-        self.scout_units = set()
-        self.base_trade_units = set()
+        self.unit_state = TagStore({
+            "health": np.float64,
+            "scout": bool,
+            "base_trade": bool,
+            "air_defense": bool,
+        }, OWN_MEMORY)
         self.resource_list: List[List] = None
         self.time_table = {}
         self.value_table = {}
-        self.units_health: Dict[int, Union[int, float]] = {}
         self.units_attacked: Units = None
         self.creep_queen_tag = 0
         self.far_corners: Set[Point2] = set()
         self.hq: Unit = None
         self.all_in = False
-        self.enemy_unit_history: Dict[UnitTypeId, Set[int]] = {}
-        self.enemy_forces: Dict[int, Unit] = {}
+        self.enemy_tracker: EnemyTracker = None
+        self.creep: CreepMap = None
+        self.influence: InfluenceMap = None
+        self.expansion_distances: ExpansionDistances = None
+        self.distance_fields: DistanceFields = None
+        self.map_analysis: MapAnalysis = None
+        self.map_cached = False
+        self.expansion_order: List[Point2] = []
+        self.corner_expansion_order: List[Point2] = []
+        self.scout_tour: List[Point2] = []
+        self.changeling_tour: List[Point2] = []
+        self.enemy_natural: Point2 = None
         self.enemy_forces_supply: float = 0
         self.enemy_air_forces_supply: float = 0
-        self.enemy_forces_stat: Dict[UnitTypeId, int] = 0
         self.enemy_forces_distance: float = -1
-        self.enemy_has_changed = False
         self.first_overlord_tag = 0
         self.second_overlord_tag = 0
         self.iteration = 0
         self.expand_target: Point2 = None
-        self.air_defense = set()
         self.last_extractor_time = 0
 
         # enemy stats
@@ -60,15 +110,66 @@ class MyBot(sc2.BotAI):
         self.forces: Units = None
 
         self.actions = []
+        self.command_filter = CommandFilter()
+        self.command_grouper = CommandGrouper()
+        self.profiler = Profiler()
+        self.ability_cache = AbilityCache()
+        self.placement = PlacementCache()
+        self.time_budget_available: float = None
+        self.scheduler = StepScheduler(self.profiler)
+        self.register_tasks()
 
     def _prepare_first_step(self):
-        sc2.BotAI._prepare_first_step(self)
-        self.expansion_locations.keys()
-        a: Rect = self.game_info.playable_area
-        corners = {Point2((a.x, a.y)), Point2((a.x, a.height)), Point2((a.width, a.y)), Point2((a.width, a.height))}
-        self.my_corner = self.start_location.closest(corners)
-        self.enemy_corner = self.enemy_start_locations[0].closest(corners)
-        self.far_corners = corners - {self.my_corner, self.enemy_corner}
+        # what sc2.BotAI._prepare_first_step does, with the ramps coming from the map cache
+        if self.townhalls:
+            self._game_info.player_start_location = self.townhalls.first.position
+        self.map_analysis, self.map_cached = load_map_analysis(
+            self.game_info, self.start_location, self.enemy_start_locations[0],
+            self.library_expansion_locations)
+        m = self.map_analysis
+        self._game_info.map_ramps, self._game_info.vision_blockers = m.ramps(self.game_info), m.vision_blockers
+        self.my_corner = m.my_corner
+        self.enemy_corner = m.enemy_corner
+        self.far_corners = m.far_corners
+        self.creep = CreepMap(self.game_info.placement_grid, self.expansion_locations.keys())
+        self.influence = InfluenceMap(self.game_info.pathing_grid)
+        self.prepare_expansion_tables()
+        self.enemy_tracker = EnemyTracker(lambda a: self.distance_fields.distances("start", a))
+
+    def prepare_expansion_tables(self):
+        enemy_start = self.enemy_start_locations[0]
+        d = self.map_analysis.distances
+        self.expansion_distances = d
+        self.distance_fields = DistanceFields(d)
+
+        def on_my_side(p: Point2) -> bool:
+            i = d.index[p]
+            return d.distance[i, d.start] <= d.distance[i, d.enemy_start] and d.distance[i, d.start] < math.inf
+
+        # expansion priority, closest by ground first
+        self.expansion_order = [p for p in d.sorted_from(d.start) if on_my_side(p)]
+        fc = self.start_location.closest(self.far_corners)
+        self.corner_expansion_order = [p for p in fc.sort_by_distance(d.expansions) if on_my_side(p)]
+
+        # scouting tours, starting from the expansion furthest from the enemy
+        enemy_order = d.sorted_from(d.enemy_start)
+        self.enemy_natural = enemy_order[1]
+        self.scout_tour = d.tour(enemy_order[-1], enemy_order)
+        enemy_half = [p for p in reversed(enemy_order) if d.distance[d.index[p], d.enemy_start] < self.half_size]
+        self.changeling_tour = d.tour(enemy_half[0], enemy_half) if enemy_half else []
+
+    def library_expansion_locations(self) -> Dict[Point2, List]:
+        # the library caches under the same attribute as the override below, which has to win
+        # on cold and warm map caches alike
+        try:
+            return sc2.BotAI.expansion_locations.fget(self)
+        finally:
+            self.__dict__.pop("_cache_expansion_locations", None)
+
+    @property_cache_forever
+    def expansion_locations(self) -> Dict[Point2, List]:
+        # the library groups every resource on the map; a known map only needs them assigned
+        return self.map_analysis.expansion_resources(self.state.resources)
 
     # ._type_data._proto
     # unit_id: 104
@@ -95,21 +196,83 @@ class MyBot(sc2.BotAI):
     # build_time: 272.0
     # sight_range: 8.0
 
+    async def on_start_async(self):
+        if self.recorder is not None:
+            await self.recorder.start(self)
+
     async def on_unit_destroyed(self, unit_tag):
-        if unit_tag in self.enemy_forces:
-            self.enemy_has_changed = True
-            del self.enemy_forces[unit_tag]
+        self.enemy_tracker.remove(unit_tag)
+        self.unit_state.discard(unit_tag)
+        self.command_filter.forget(unit_tag)
+        self.saturation.forget(unit_tag)
 
     async def on_step(self, iteration):
-
-        if self.time_budget_available and self.time_budget_available < 0.05:
-            return
-
         self.production_order = []
         self.actions = []
+        self.iteration = iteration
+        if self.recorder is not None:
+            self.recorder.frame_start(iteration, self.state, self.game_info.pathing_grid._proto,
+                                      self.time_budget_available)
+        self.profiler.frame_start(iteration, self.state.game_loop, self.time, self.time_budget_available)
+        await self.scheduler.run(iteration, self.time, self.time_budget_available)
+        with self.profiler.section("do_actions"):
+            actions = self.command_grouper.group(self.command_filter.filter(self.actions))
+            await self.do_actions(actions, prevent_double=False)
+        self.profiler.frame_end(len(actions))
+        await self.telemetry.flush(self.time, self.chat_send)
+        if self.recorder is not None:
+            self.recorder.frame_end()
+
+    def on_end(self, game_result):
+        if self.recorder is not None:
+            self.recorder.close()
+        self.telemetry.close()
+        self.analysis_worker.close()
+        self.profiler.write(
+            Path("reports") / f"{self.NAME}-{time.strftime('%Y%m%d-%H%M%S')}.json",
+            map=self.game_info.map_name,
+            result=str(game_result),
+            game_time=self.time,
+            commands={**self.command_filter.stats(), **self.command_grouper.stats()},
+            tag_stores={"own": self.unit_state.stats(), "enemy": self.enemy_tracker.store.stats()},
+            telemetry=self.telemetry.stats(),
+            property_cache=self.property_cache.stats(),
+            analysis=self.analysis_worker.stats(),
+            saturation=self.saturation.stats(),
+        )
+
+    def register_tasks(self):
+        self.scheduler.register("prepare", self.step_prepare, Priority.CRITICAL)
+        self.scheduler.register("supply", self.step_supply, Priority.CRITICAL)
+        self.scheduler.register("combat", self.step_combat, Priority.CRITICAL)
+        # these also run while defending an early rush, which ends the frame
+        self.scheduler.register("changelings", self.step_changelings, Priority.NORMAL)
+        self.scheduler.register("report", self.step_report, Priority.LOW)
+        self.scheduler.register("defend_early_rush", self.defend_early_rush, Priority.CRITICAL)
+        self.scheduler.register("base_trade", self.step_base_trade, Priority.HIGH)
+        self.scheduler.register("static_defense", self.step_static_defense, Priority.HIGH)
+        self.scheduler.register("macro", self.step_macro, Priority.NORMAL, every_frames=4)
+        self.scheduler.register("scouting", self.step_scouting, Priority.LOW, every_seconds=2)
+
+    async def step_prepare(self) -> bool:
         # enemy info
+        self.influence.update(self.visible_enemy_units, self.known_enemy_structures.of_type(
+            {UnitTypeId.PHOTONCANNON, UnitTypeId.SPINECRAWLER, UnitTypeId.BUNKER}), self.townhalls)
         self.calc_enemy_info()
-        self.iteration = iteration
+        # strategic properties cached over several frames are recomputed when these change
+        self.property_cache.watch("enemy_structures", self.known_enemy_structures.tags)
+        self.property_cache.watch("townhalls", self.townhalls.ready.tags)
+        self.placement.update(self.state.game_loop, self.state.units.structure)
+        self.saturation.update(self.townhalls.ready, self.state.mineral_field,
+                               self.units(UnitTypeId.EXTRACTOR).ready, self.workers)
+        self.creep.update(self.state.creep, self.units.of_type({
+            UnitTypeId.CREEPTUMOR,
+            UnitTypeId.CREEPTUMORBURROWED,
+            UnitTypeId.CREEPTUMORQUEEN,
+        }))
+        # strategic analysis runs on the worker thread, this frame uses the one of two frames ago
+        self.analysis_worker.submit(self.snapshot())
+        self.analysis = self.analysis_worker.result(self.iteration)
 
         attack_units = self.units.of_type({
             UnitTypeId.ZERGLING,
@@ -124,34 +287,26 @@ class MyBot(sc2.BotAI):
         for f in attack_units.tags_in(self.base_trade_units):
             f: Unit = f
             if f.is_idle:
-                self.base_trade_units.discard(f.tag)
+                self.unit_state.set(f.tag, base_trade=False)
 
         self.forces = attack_units.tags_not_in(self.scout_units | self.base_trade_units)
 
-        half_size = self.start_location.distance_to(self.game_info.map_center)
-
-        await self.chat_if_changed("enemy_expansions_count", self.enemy_expansions_count)
-        await self.chat_if_changed("enemy_early_aggressive", self.enemy_early_aggressive)
-        await self.chat_if_changed("enemy_early_greedy", self.enemy_early_greedy)
-
         # if i don't even have a townhall
         # this has to be there because sometimes `self.townhalls` returns nothing even though there're clearly townhalls
         if not self.townhalls.exists:
             for unit in self.units(UnitTypeId.DRONE) | self.units(UnitTypeId.QUEEN) | self.forces:
                 self.actions.append(unit.attack(self.enemy_start_locations[0]))
-            await self.do_actions(self.actions)
-            return
+            return True
         else:
             self.hq = self.townhalls.closest_to(self.start_location)
-            if "redshift" in self.game_info.map_name.lower():
-                exps = self.townhalls.sorted_by_distance_to(self.game_info.map_center)
-                if exps[0].position.x < 29 and exps.amount > 1:
-                    self.rally_point: Point2 = exps[1].position.towards(self.game_info.map_center, 4)
-                else:
-                    self.rally_point: Point2 = exps[0].position.towards(self.game_info.map_center, 4)
+            exps = self.townhalls.sorted_by_distance_to(self.game_info.map_center)
+            rally_min_x = self.map_analysis.quirks.get("rally_min_x")
+            if rally_min_x is not None and exps[0].position.x < rally_min_x and exps.amount > 1:
+                base = exps[1]
             else:
-                self.rally_point: Point2 = self.townhalls.closest_to(
-                    self.game_info.map_center).position.towards(self.game_info.map_center, 4)
+                base = exps[0]
+            self.rally_point: Point2 = self.map_analysis.rally_point(base.position, self.game_info.map_center)
+            self.distance_fields.set_rally(self.rally_point)
 
         is_terran = self.enemy_race == Race.Terran or \
                     (self.known_enemy_units.exists and self.known_enemy_units.first.race == Race.Terran)
@@ -159,75 +314,72 @@ class MyBot(sc2.BotAI):
         is_zerg = self.enemy_race == Race.Zerg or \
                   (self.known_enemy_units.exists and self.known_enemy_units.first.race == Race.Zerg)
 
-        is_protoss = self.enemy_race == Race.Protoss or \
-                     (self.known_enemy_units.exists and self.known_enemy_units.first.race == Race.Protoss)
+        self.build_order = build_order(Race.Terran if is_terran else Race.Zerg if is_zerg else Race.Protoss)
 
-        if is_terran:
-            self.build_order = [
-                UnitTypeId.SPAWNINGPOOL,
-                UnitTypeId.BANELINGNEST,
-                UnitTypeId.INFESTATIONPIT,
-                UnitTypeId.EVOLUTIONCHAMBER,
-                UnitTypeId.HYDRALISKDEN,
-            ]
-        elif is_zerg:
-            self.build_order = [
-                UnitTypeId.SPAWNINGPOOL,
-                UnitTypeId.ROACHWARREN,
-                UnitTypeId.INFESTATIONPIT,
-                UnitTypeId.EVOLUTIONCHAMBER,
-                UnitTypeId.HYDRALISKDEN,
-            ]
-        else:
-            self.build_order = [
-                UnitTypeId.SPAWNINGPOOL,
-                UnitTypeId.INFESTATIONPIT,
-                UnitTypeId.EVOLUTIONCHAMBER,
-                UnitTypeId.HYDRALISKDEN,
-            ]
-
-        # supply_cap does not include overload that is being built
-        est_supply_cap = (self.count_unit(UnitTypeId.OVERLORD)) * 8 + self.townhalls.ready.amount * 6
-        est_supply_left = est_supply_cap - self.supply_used
-        if self.units(UnitTypeId.OVERLORD).amount == 1 and \
-                (self.townhalls.amount < 2 or not self.units(UnitTypeId.SPAWNINGPOOL).exists):
-            build_overlord = False
-        elif self.units(UnitTypeId.OVERLORD).amount <= 4:
-            build_overlord = est_supply_left < 3
-        else:
-            build_overlord = est_supply_left < 9
-
-        if build_overlord and est_supply_cap < 200:
-            self.train(UnitTypeId.OVERLORD)
+        await self.prefetch_abilities()
+        await self.prefetch_placements()
+        return False
 
-        # attacks
+    async def prefetch_placements(self):
+        # every idle uprooted crawler looks for a spot around the same point, so ask once for all of them
+        near = self.rally_point.towards(self.game_info.map_center, 3)
+        for uprooted, rooted in ((UnitTypeId.SPINECRAWLERUPROOTED, UnitTypeId.SPINECRAWLER),
+                                 (UnitTypeId.SPORECRAWLERUPROOTED, UnitTypeId.SPORECRAWLER)):
+            if self.units(uprooted).ready.idle.exists:
+                self.placement.prefetch_rings(self.placement_ability(rooted), near, 5, 1)
+        await self.placement.flush(self._client)
+
+    def placement_ability(self, building: Union[AbilityData, AbilityId, UnitTypeId]) -> AbilityData:
+        if isinstance(building, UnitTypeId):
+            return self._game_data.units[building.value].creation_ability
+        if isinstance(building, AbilityId):
+            return self._game_data.abilities[building.value]
+        return building
+
+    async def find_placement(self, building: Union[AbilityId, UnitTypeId], near: Point2, max_distance: int = 20,
+                             random_alternative: bool = True, placement_step: int = 2) -> Point2:
+        return await self.placement.find_placement(self._client, self.placement_ability(building), near,
+                                                   max_distance, random_alternative, placement_step)
+
+    async def can_place(self, building: Union[AbilityData, AbilityId, UnitTypeId], position: Point2) -> bool:
+        return (await self.placement.check(self._client, self.placement_ability(building), [position]))[0]
+
+    async def step_combat(self):
+        await self.attack()
+        self.react_to_attacks()
+
+    @profiled("attacks")
+    async def attack(self):
         if self.enemy_near_townhall.exists:
             if self.forces.amount + self.count_spinecrawler() <= 0:
-                ws = self.workers.closer_than(20, self.enemy_near_townhall.first.position)
+                ws = self.unit_grid.closer_than(20, self.enemy_near_townhall.first.position).of_type(
+                    UnitTypeId.DRONE)
                 n = min(ws.amount, round(self.enemy_near_townhall.amount * 1.5))
                 if ws.filter(lambda w: w.is_attacking).amount < n:
                     self.actions.append(
                         ws.filter(lambda w: not w.is_attacking).random.attack(self.enemy_near_townhall.first.position))
+            # the same for every unit, so decided once
+            ground_attack = self.enemy_near_townhall.not_flying.amount > 0
+            target = self.enemy_near_townhall.first.position
+            sc = self.units(UnitTypeId.SPINECRAWLER)
+            fight_alone = not sc.exists or not ground_attack or \
+                self.enemy_near_townhall.closest_distance_to(self.rally_point) > 10
+            spines_fighting = sc.filter(lambda u: u.is_ready and u.is_attacking).exists or \
+                self.units_attacked.of_type(UnitTypeId.SPINECRAWLER).exists
             for unit in self.forces:
                 unit: Unit = unit
                 if unit.type_id == UnitTypeId.INFESTOR:
                     self.infestor_cast(unit)
                     continue
-                if self.enemy_near_townhall.not_flying.amount <= 0 and not unit.can_attack_air:
-                    self.move_and_attack(unit, self.attack_target)
+                if not ground_attack and not unit.can_attack_air:
+                    self.engage(unit, self.attack_target)
                     continue
                 # fight within spinecrawler
-                sc = self.units(UnitTypeId.SPINECRAWLER)
-                if not sc.exists or self.enemy_near_townhall.not_flying.amount <= 0 or \
-                        self.enemy_near_townhall.closest_distance_to(self.rally_point) > 10:
-                    self.move_and_attack(unit, self.enemy_near_townhall.first.position)
-                    continue
-                if sc.filter(lambda u: u.is_ready and u.is_attacking).exists or \
-                        self.units_attacked.of_type(UnitTypeId.SPINECRAWLER).exists:
-                    self.move_and_attack(unit, self.enemy_near_townhall.first.position)
+                if fight_alone or spines_fighting:
+                    self.engage(unit, target)
                 else:
                     self.actions.append(unit.move(sc.first.position.towards(self.start_location, 7)))
-            if 0 < self.enemy_forces_distance < half_size:
+            if 0 < self.enemy_forces_distance < self.half_size:
                 for unit in self.units(UnitTypeId.SWARMHOSTMP).ready:
                     abilities = (await self.get_available_abilities([unit]))[0]
                     if AbilityId.EFFECT_SPAWNLOCUSTS in abilities:
@@ -247,21 +399,25 @@ class MyBot(sc2.BotAI):
                 elif unit.type_id == UnitTypeId.OVERSEER:
                     self.actions.append(unit.move(self.forces.center))
                 else:
-                    self.move_and_attack(unit, self.attack_target)
+                    self.engage(unit, self.attack_target)
         else:
             for w in self.workers:
                 w: Unit = w
                 if w.is_attacking:
                     self.actions.append(w.stop())
             t = self.expand_target if self.expand_target is not None else self.rally_point
-            for unit in self.forces.further_than(10, t):
+            if t is self.rally_point:
+                far = self.distance_fields.further_than("rally", 10, self.forces)
+            else:
+                far = self.forces.further_than(10, t)
+            for unit in far:
                 if unit.type_id == UnitTypeId.OVERSEER and has_order(unit, AbilityId.SPAWNCHANGELING_SPAWNCHANGELING):
                     continue
                 self.actions.append(unit.move(t))
         swarmhost = self.units(UnitTypeId.SWARMHOSTMP).ready
         for s in swarmhost:
             s: Unit = s
-            e: Units = self.known_enemy_units.closer_than(15, s.position)
+            e: Units = self.known_enemy_grid.closer_than(15, s.position)
             abilities = (await self.get_available_abilities([s]))[0]
             if AbilityId.EFFECT_SPAWNLOCUSTS in abilities:
                 if count_supply(e.not_flying) > 5 or e.structure.exists:
@@ -279,17 +435,18 @@ class MyBot(sc2.BotAI):
                 else:
                     self.actions.append(s.stop())
 
-        # attack reactions
+    @profiled("attack_reactions")
+    def react_to_attacks(self):
         for x in self.units_attacked:
             x: Unit = x
-            workers_nearby = self.workers.closer_than(5, x.position).filter(lambda wk: not wk.is_attacking)
-            enemy_nearby = self.visible_enemy_units.closer_than(10, x.position)
+            enemy_nearby = self.visible_enemy_grid.closer_than(10, x.position)
             if not enemy_nearby.exists:
                 continue
             if x.type_id == UnitTypeId.DRONE:
                 another_townhall = self.townhalls.further_than(25, x.position)
                 if another_townhall.exists:
-                    self.actions.append(x.move(another_townhall.first.position))
+                    safest = min(another_townhall, key=lambda t: self.influence.threat(t.position))
+                    self.actions.append(x.move(safest.position))
             elif x.is_structure:
                 if x.build_progress < 1 and x.health_percentage < min(x.build_progress, HEALTH_PERCENT):
                     self.actions.append(x(AbilityId.CANCEL))
@@ -300,14 +457,20 @@ class MyBot(sc2.BotAI):
             elif x.type_id == UnitTypeId.OVERSEER:
                 self.actions.append(x(AbilityId.SPAWNCHANGELING_SPAWNCHANGELING))
             elif x.tag == self.first_overlord_tag:
-                if self.visible_enemy_units:
-                    t = backwards(x.position, self.visible_enemy_units.closest_to(x).position, 10)
+                if self.visible_enemy_grid.exists:
+                    t = backwards(x.position, self.visible_enemy_grid.closest_to(x).position, 10)
                 else:
                     t = x.position.towards(self.game_info.map_center, 10)
                 self.actions.append(x.move(t))
             elif x.type_id == UnitTypeId.OVERLORD:
                 self.actions.append(x.move(x.position.towards(self.start_location, 10)))
 
+        for q in self.units(UnitTypeId.QUEEN):
+            c = self.engagement.closest_threat(q)
+            if c is not None and self.townhalls.closest_distance_to(q) < 10:
+                self.move_and_attack(q, c.position)
+
+    async def step_changelings(self):
         overseers = self.units(UnitTypeId.OVERSEER)
         if overseers.exists:
             abilities: List[List[AbilityId]] = await self.get_available_abilities(overseers)
@@ -323,17 +486,11 @@ class MyBot(sc2.BotAI):
 
         changelings = self.units(UnitTypeId.CHANGELING).idle
         if changelings.exists:
-            locs = self.enemy_start_locations[0].sort_by_distance(list(self.expansion_locations.keys()))
-            locs.reverse()
-            for i, p in enumerate(locs):
-                if not self.is_visible(p) and p.distance_to(self.enemy_start_locations[0]) < half_size:
+            for i, p in enumerate(self.changeling_tour):
+                if not self.is_visible(p):
                     self.actions.append(changelings.first.move(p, queue=i > 0))
 
-        # counter timing attack
-        if await self.defend_early_rush():
-            await self.do_actions(self.actions)
-            return
-
+    async def step_base_trade(self):
         # base trade
         if self.enemy_expansions.exists:
             p = self.enemy_expansions[0].position.closest(self.far_corners)
@@ -345,7 +502,7 @@ class MyBot(sc2.BotAI):
                 self.units(UnitTypeId.ZERGLING).tags_in(self.base_trade_units).amount < self.forces.amount and \
                 self.already_pending_upgrade(UpgradeId.ZERGLINGMOVEMENTSPEED) == 1:
             z = zs.random
-            self.base_trade_units.add(z.tag)
+            self.unit_state.set(z.tag, self.state.game_loop, base_trade=True)
             self.actions.extend([
                 z.move(p),
                 z.patrol(p.towards(self.game_info.map_center, 10), queue=True),
@@ -363,6 +520,7 @@ class MyBot(sc2.BotAI):
                         f.patrol(p.towards(self.game_info.map_center, 10), queue=True),
                     ])
 
+    async def step_static_defense(self):
         # build spinecrawlers
         if self.count_spinecrawler() < 1 and \
                 self.townhalls.ready.amount > 1 and \
@@ -380,14 +538,16 @@ class MyBot(sc2.BotAI):
                 self.actions.append(s(AbilityId.SPINECRAWLERROOT_SPINECRAWLERROOT, t, queue=True))
 
         for s in self.units(UnitTypeId.SPORECRAWLER):
-            if s.tag not in self.air_defense and s.distance_to(self.rally_point) <= 10:
-                self.air_defense.add(s.tag)
+            air_defense = self.unit_state.get(s.tag, "air_defense", False)
+            if not air_defense and s.distance_to(self.rally_point) <= 10:
+                air_defense = True
+                self.unit_state.set(s.tag, self.state.game_loop, air_defense=True)
             if s.is_idle and s.is_ready and \
-                    s.tag in self.air_defense and s.distance_to(self.rally_point) > 10 and \
+                    air_defense and s.distance_to(self.rally_point) > 10 and \
                     self.has_creep(self.rally_point):
                 self.actions.append(s(AbilityId.SPORECRAWLERUPROOT_SPORECRAWLERUPROOT))
 
-        af = len(self.air_defense) * 4 + self.forces.of_type({UnitTypeId.HYDRALISK}).amount * 2
+        af = self.unit_state.count("air_defense") * 4 + self.forces.of_type({UnitTypeId.HYDRALISK}).amount * 2
         if af < self.enemy_air_forces_supply and self.workers.amount >= 32:
             await self.build(UnitTypeId.SPORECRAWLER,
                              self.rally_point.towards(self.game_info.map_center, 2),
@@ -400,11 +560,22 @@ class MyBot(sc2.BotAI):
             if t is not None:
                 self.actions.append(s(AbilityId.SPORECRAWLERROOT_SPORECRAWLERROOT, t, queue=True))
 
-        for q in self.units(UnitTypeId.QUEEN):
-            es: Units = self.visible_enemy_units.filter(lambda u: u.target_in_range(q))
-            if es.exists and self.townhalls.closest_distance_to(q) < 10:
-                self.move_and_attack(q, es.closest_to(q).position)
+    async def step_supply(self):
+        # supply_cap does not include overload that is being built
+        est_supply_cap = (self.count_unit(UnitTypeId.OVERLORD)) * 8 + self.townhalls.ready.amount * 6
+        est_supply_left = est_supply_cap - self.supply_used
+        if self.units(UnitTypeId.OVERLORD).amount == 1 and \
+                (self.townhalls.amount < 2 or not self.units(UnitTypeId.SPAWNINGPOOL).exists):
+            build_overlord = False
+        elif self.units(UnitTypeId.OVERLORD).amount <= 4:
+            build_overlord = est_supply_left < 3
+        else:
+            build_overlord = est_supply_left < 9
 
+        if build_overlord and est_supply_cap < 200:
+            self.train(UnitTypeId.OVERLORD)
+
+    async def step_macro(self):
         # economy
         for t in self.townhalls.ready:
             t: Unit = t
@@ -414,9 +585,10 @@ class MyBot(sc2.BotAI):
             if self.workers.amount >= 32:
                 if not self.units(UnitTypeId.SPORECRAWLER).closer_than(10, t.position).exists and \
                         self.already_pending(UnitTypeId.SPORECRAWLER) == 0:
-                    await self.build(UnitTypeId.SPORECRAWLER,
-                                     near=self.state.mineral_field.closer_than(10, t.position).center,
-                                     random_alternative=False)
+                    near = self.map_analysis.mineral_line(t.position)
+                    if near is None:
+                        near = self.mineral_grid.closer_than(10, t.position).center
+                    await self.build(UnitTypeId.SPORECRAWLER, near=near, random_alternative=False)
 
         need_workers = self.count_unit(UnitTypeId.DRONE) < self.townhalls.amount * 16 + self.units(
             UnitTypeId.EXTRACTOR).amount * 3
@@ -483,45 +655,26 @@ class MyBot(sc2.BotAI):
                 self.can_afford_or_change_production(UnitTypeId.HIVE):
             self.actions.append(self.hq.build(UnitTypeId.HIVE))
 
-        await self.call_every(self.scout_expansions, 2 * 60)
-        await self.call_every(self.scout_watchtower, 60)
-        await self.call_every(self.heartbeat, 60)
         await self.fill_creep_tumor()
         await self.make_overseer()
 
         # expansion
         if self.should_expand() and self.can_afford_or_change_production(UnitTypeId.HATCHERY):
             if self.townhalls.ready.amount == 3 and random.random() > 0.5:
-                fc = self.start_location.sort_by_distance(self.far_corners)
-                exps = fc[0].sort_by_distance(self.expansion_locations.keys())
+                exps = self.corner_expansion_order
             else:
-                exps = self.start_location.sort_by_distance(self.expansion_locations.keys())
-            for p in exps:
-                if p.distance_to(self.start_location) <= p.distance_to(self.enemy_start_locations[0]) and \
-                        await self.can_place(UnitTypeId.HATCHERY, p):
-                    self.expand_target = p
-                    await self.expand_now(None, 2, p)
-                    return
-
-        # first overlord scout
-        if self.units(UnitTypeId.OVERLORD).amount == 1:
-            o: Unit = self.units(UnitTypeId.OVERLORD).first
-            self.first_overlord_tag = o.tag
-            exps = self.enemy_start_locations[0].sort_by_distance(list(self.expansion_locations.keys()))
-            self.actions.extend([
-                o.move(self.enemy_start_locations[0].towards(self.game_info.map_center, 18)),
-                o.move(exps[1].towards(self.game_info.map_center, 5), queue=True),
-            ])
-
-        # second overlord scout
-        o: Units = self.units.tags_in({self.second_overlord_tag})
-        if not o.exists:
-            o: Units = self.units(UnitTypeId.OVERLORD).tags_not_in({self.first_overlord_tag})
-            if o.exists:
-                self.second_overlord_tag = o.first.tag
-        elif o.first.is_idle and o.first.health_percentage >= HEALTH_PERCENT:
-            self.actions.append(o.first.move(self.rally_point.towards(self.game_info.map_center, 5), queue=True))
-            self.actions.append(o.first.move(self.rally_point.towards(self.game_info.map_center, 25), queue=True))
+                exps = self.expansion_order
+            free = set(self.analysis.free_expansions)
+            exps = [p for p in exps if p in free]
+            if exps:
+                # one placement query for every candidate, at the spot expand_now builds on
+                result = await self.placement.check(
+                    self._client, self.placement_ability(UnitTypeId.HATCHERY), [p.rounded for p in exps])
+                for p, ok in zip(exps, result):
+                    if ok:
+                        self.expand_target = p
+                        await self.expand_now(None, 2, p)
+                        return
 
         # extractor and gas gathering
         if self.should_build_extractor() and self.time - self.last_extractor_time > 5:
@@ -533,20 +686,20 @@ class MyBot(sc2.BotAI):
 
         for a in self.units(UnitTypeId.EXTRACTOR).ready:
             a: Unit = a
+            base = self.saturation.base_of.get(a.tag)
             if self.vespene - self.minerals > 100:
-                w: Units = self.empty_workers.closer_than(2.5, a)
+                w = self.saturation.empty_gatherers(a.tag)[:1]
                 t: Unit = self.townhalls.closest_to(a.position)
-                if t.surplus_harvesters < 0 and t.distance_to(a) < 10 and w.exists and w.first.order_target == a.tag:
-                    self.actions.append(w.first.gather(self.state.mineral_field.closest_to(w.first)))
+                if t.surplus_harvesters < 0 and t.distance_to(a) < 10 and w:
+                    self.gather_minerals(w[0], base)
             elif a.assigned_harvesters < a.ideal_harvesters:
-                w: Units = self.empty_workers.closer_than(20, a)
-                if w.exists:
-                    self.actions.append(w.random.gather(a))
+                w = self.saturation.spare_worker(base)
+                if w is not None:
+                    self.gather(w, a)
                     continue
             elif a.assigned_harvesters > a.ideal_harvesters:
-                for w in self.empty_workers.closer_than(2.5, a):
-                    if w.order_target == a.tag:
-                        self.actions.append(w.gather(self.state.mineral_field.closest_to(w)))
+                for w in self.saturation.empty_gatherers(a.tag):
+                    self.gather_minerals(w, base)
 
         # overlord speed
         if self.units(UnitTypeId.LAIR).ready.exists and \
@@ -565,15 +718,56 @@ class MyBot(sc2.BotAI):
         await self.build_building()
         await self.upgrade_building()
         await self.produce_unit()
-        await self.do_actions(self.actions)
 
+    async def step_scouting(self):
+        await self.call_every(self.scout_expansions, 2 * 60)
+        await self.call_every(self.scout_watchtower, 60)
+
+        # first overlord scout
+        if self.units(UnitTypeId.OVERLORD).amount == 1:
+            o: Unit = self.units(UnitTypeId.OVERLORD).first
+            self.first_overlord_tag = o.tag
+            self.actions.extend([
+                o.move(self.enemy_start_locations[0].towards(self.game_info.map_center, 18)),
+                o.move(self.enemy_natural.towards(self.game_info.map_center, 5), queue=True),
+            ])
+
+        # second overlord scout
+        o: Units = self.units.tags_in({self.second_overlord_tag})
+        if not o.exists:
+            o: Units = self.units(UnitTypeId.OVERLORD).tags_not_in({self.first_overlord_tag})
+            if o.exists:
+                self.second_overlord_tag = o.first.tag
+        elif o.first.is_idle and o.first.health_percentage >= HEALTH_PERCENT:
+            self.actions.append(o.first.move(self.rally_point.towards(self.game_info.map_center, 5), queue=True))
+            self.actions.append(o.first.move(self.rally_point.towards(self.game_info.map_center, 25), queue=True))
+
+    async def step_report(self):
+        self.chat_if_changed("enemy_expansions_count", self.enemy_expansions_count)
+        self.chat_if_changed("enemy_early_aggressive", self.enemy_early_aggressive)
+        self.chat_if_changed("enemy_early_greedy", self.enemy_early_greedy)
+        await self.call_every(self.heartbeat, 60)
+
+    async def get_available_abilities(self, units, ignore_resource_requirements=False):
+        return await self.ability_cache.get(self._client, self.state.game_loop, units, ignore_resource_requirements)
+
+    async def prefetch_abilities(self):
+        # everything checked later in this step, so the whole frame costs at most two queries
+        units = self.units.of_type({UnitTypeId.SWARMHOSTMP, UnitTypeId.OVERSEER, UnitTypeId.SPAWNINGPOOL}).ready
+        buildings = []
+        if "macro" in self.scheduler.due:
+            units = units | self.units(UnitTypeId.CREEPTUMORBURROWED) | self.units(UnitTypeId.QUEEN).idle
+            for b in self.build_order:
+                u = self.units(b).ready.idle
+                if b != UnitTypeId.INFESTATIONPIT and u.exists:
+                    buildings.append(u.first)
+        if units.exists:
+            await self.ability_cache.prefetch(self._client, self.state.game_loop, units)
+        if buildings:
+            await self.ability_cache.prefetch(self._client, self.state.game_loop, buildings, True)
+
+    @profiled()
     async def fill_creep_tumor(self):
-        creep_tumors = self.units.of_type({
-            UnitTypeId.CREEPTUMOR,
-            UnitTypeId.CREEPTUMORBURROWED,
-            UnitTypeId.CREEPTUMORMISSILE,
-            UnitTypeId.CREEPTUMORQUEEN,
-        })
         creep_queen = self.units(UnitTypeId.QUEEN).find_by_tag(self.creep_queen_tag)
         # make creep queen
         if self.units(UnitTypeId.SPAWNINGPOOL).ready.exists and \
@@ -586,12 +780,8 @@ class MyBot(sc2.BotAI):
         if creep_queen is not None and creep_queen.is_idle:
             abilities = await self.get_available_abilities(creep_queen)
             if AbilityId.BUILD_CREEPTUMOR_QUEEN in abilities:
-                t = self.townhalls.ready.furthest_to(self.start_location).position.random_on_distance(10)
-                if creep_tumors.exists:
-                    ct = creep_tumors.furthest_to(self.start_location).position.random_on_distance(10)
-                    if ct.distance2_to(self.start_location) > t.distance2_to(self.start_location):
-                        t = ct
-                if self.has_creep(t) and self.can_place_creep_tumor(t):
+                t = self.analysis.queen_tumor_spot
+                if t is not None:
                     self.actions.append(creep_queen(AbilityId.BUILD_CREEPTUMOR_QUEEN, t))
         available_creep_tumors = self.units(UnitTypeId.CREEPTUMORBURROWED)
         if available_creep_tumors.exists:
@@ -603,7 +793,19 @@ class MyBot(sc2.BotAI):
                     if t is not None:
                         self.actions.append(u(AbilityId.BUILD_CREEPTUMOR_TUMOR, t))
 
-    @property_cache_once_per_frame
+    @property_cache_forever
+    def half_size(self) -> float:
+        # half the ground distance between the start locations
+        d = self.expansion_distances
+        ground = d.distance[d.start, d.enemy_start]
+        if ground == math.inf:
+            ground = self.start_location.distance_to(self.enemy_start_locations[0])
+        return float(ground) / 2
+
+    def in_own_half(self, units: Units) -> Units:
+        return self.distance_fields.closer_than("start", self.half_size, units)
+
+    @property_cache_ttl(seconds=30, on=("enemy_structures",))
     def enemy_expansions_count(self) -> int:
         if self.enemy_expansions.amount == 0:
             return 1
@@ -617,12 +819,11 @@ class MyBot(sc2.BotAI):
         return self.count_unit(UnitTypeId.DRONE) < self.townhalls.ready.amount * 16 + self.units(
             UnitTypeId.EXTRACTOR).ready.amount * 3
 
-    @property_cache_once_per_frame
+    @property_cache_ttl(seconds=1, on=("townhalls",))
     def should_base_trade(self):
-        half_size = self.start_location.distance_to(self.game_info.map_center)
-        if self.enemy_forces_distance < half_size:
+        if self.enemy_forces_distance < self.half_size:
             return True
-        if count_supply(self.enemy_near_townhall) > 5:
+        if self.analysis.home_threat > 5:
             return True
         if self.supply_used > 190:
             return True
@@ -630,26 +831,37 @@ class MyBot(sc2.BotAI):
                 self.known_enemy_units.closest_distance_to(self.forces.center) < 15:
             return True
 
+    def gather(self, worker: Unit, resource: Unit):
+        self.actions.append(worker.gather(resource))
+        self.saturation.assign(worker.tag, resource.tag)
+
+    def gather_minerals(self, worker: Unit, base: int = None):
+        # the least saturated patch of the base, or of all bases with the closest one first
+        m = self.saturation.least_saturated([base] if base is not None else None, near=worker.position)
+        if m is not None:
+            self.gather(worker, m)
+
     def drone_gather(self):
         for d in self.units(UnitTypeId.DRONE).idle:
             d: Unit = d
-            if self.need_worker_mineral is not None:
-                self.actions.append(d.gather(self.need_worker_mineral))
+            m = self.need_worker_mineral
+            if m is not None:
+                self.gather(d, m)
             else:
-                self.actions.append(
-                    d.gather(self.state.mineral_field.closest_to(self.townhalls.closest_to(d.position))))
+                self.gather_minerals(d)
 
     async def dist_workers_and_inject_larva(self, townhall: Unit) -> Units:
-        excess_worker = self.empty_workers.closer_than(10, townhall.position)
-        m = self.need_worker_mineral
-        if townhall.assigned_harvesters > townhall.ideal_harvesters and excess_worker.exists and m is not None:
-            self.actions.append(excess_worker.random.gather(m))
+        if townhall.assigned_harvesters > townhall.ideal_harvesters:
+            w = self.saturation.spare_worker(townhall.tag)
+            m = self.need_worker_mineral
+            if w is not None and m is not None:
+                self.gather(w, m)
         if self.units(UnitTypeId.SPAWNINGPOOL).ready.exists and \
                 townhall.is_ready and townhall.noqueue and \
-                self.units(UnitTypeId.QUEEN).closer_than(10, townhall.position).amount == 0 and \
+                not self.unit_grid.closer_than(10, townhall.position).of_type(UnitTypeId.QUEEN).exists and \
                 self.can_afford_or_change_production(UnitTypeId.QUEEN):
             self.actions.append(townhall.train(UnitTypeId.QUEEN))
-        queen_nearby = self.units(UnitTypeId.QUEEN).idle.closer_than(10, townhall.position)
+        queen_nearby = self.unit_grid.closer_than(10, townhall.position).of_type(UnitTypeId.QUEEN).idle
         if queen_nearby.tags_not_in({self.creep_queen_tag}).amount > 0:
             queen = queen_nearby.tags_not_in({self.creep_queen_tag}).first
             abilities = await self.get_available_abilities(queen)
@@ -669,48 +881,52 @@ class MyBot(sc2.BotAI):
         return self.est_defense_surplus >= 0 or self.really_need_workers
 
     def calc_creep_tumor_position(self, u: Unit):
-        for i in range(0, 5):
-            t = u.position.towards_with_random_angle(self.enemy_start_locations[0], 10, math.pi / 4)
-            if self.can_place_creep_tumor(t):
-                return t
-        for i in range(0, 5):
-            t = u.position.towards_with_random_angle(self.enemy_start_locations[0], 10, math.pi / 2)
-            if self.can_place_creep_tumor(t):
-                return t
-        for i in range(0, 5):
-            t = u.position.towards_with_random_angle(self.enemy_start_locations[0], 10, math.pi)
-            if self.can_place_creep_tumor(t):
-                return t
-        return None
+        if u.tag in self.analysis.tumor_spots:
+            return self.analysis.tumor_spots[u.tag]
+        return self.creep.tumor_spot(u.position, self.enemy_start_locations[0])
+
+    def engage(self, u: Unit, t: Point2):
+        # units out of contact get what move_and_attack would give them, from their squad's context
+        squad = self.squads.of(u)
+        if squad is None or u.tag in squad.contact or (u.type_id == UnitTypeId.ZERGLING and squad.enemy_near):
+            self.move_and_attack(u, t)
+            return
+        if u.type_id == UnitTypeId.ZERGLING:
+            d = self.squads.front_line_distance(t)
+            if d is not None and d + 5 > u.distance_to(t):
+                self.actions.append(u.stop())
+                return
+        self.actions.append(u.attack(t))
 
     def move_and_attack(self, u: Unit, t: Point2):
-        banelings: Units = self.visible_enemy_units.of_type({UnitTypeId.BANELING}).closer_than(4, u.position)
-        if banelings.exists:
-            b = banelings.closest_to(u.position)
+        b = self.engagement.closest_of_type(u, {UnitTypeId.BANELING}, 4)
+        if b is not None:
             self.actions.append(u.move(backwards(u.position, b.position, 4)))
             if u.ground_range > 1:
                 self.actions.append(u.attack(b, queue=True))
             return
         if u.type_id == UnitTypeId.BANELING:
-            ec: Units = self.visible_enemy_units.closer_than(10, u.position)
-            if not ec.exists or ec.of_type({UnitTypeId.MARINE}).amount > 2 or u.distance_to(self.rally_point) < 10:
+            if self.engagement.count_closer_than(10, u) == 0 or \
+                    self.engagement.count_closer_than(10, u, {UnitTypeId.MARINE}) > 2 or \
+                    u.distance_to(self.rally_point) < 10:
                 self.actions.append(u.attack(t))
             else:
                 self.actions.append(u.move(self.rally_point))
             return
         if u.type_id == UnitTypeId.ZERGLING:
             front_line: Units = self.forces.of_type({UnitTypeId.ROACH, UnitTypeId.HYDRALISK, UnitTypeId.BANELING})
-            if not self.known_enemy_units.closer_than(10, u.position).exists and \
+            if not self.known_enemy_grid.closer_than(10, u.position).exists and \
                     front_line.exists and front_line.closest_distance_to(t) + 5 > u.distance_to(t):
                 self.actions.append(u.stop())
             else:
                 self.actions.append(u.attack(t))
             return
-        enemy: Units = self.visible_enemy_units.filter(lambda e: e.target_in_range(u))
-        if enemy.exists and u.weapon_cooldown > 0:
-            c = enemy.closest_to(u.position)
+        c = self.engagement.closest_threat(u)
+        if c is not None and u.weapon_cooldown > 0:
+            d = u.movement_speed * u.weapon_cooldown
+            r = self.influence.retreat(u.position, d, u.is_flying, c.position)
             self.actions.extend([
-                u.move(backwards(u.position, c.position, u.movement_speed * u.weapon_cooldown)),
+                u.move(r if r is not None else backwards(u.position, c.position, d)),
                 u.attack(t, queue=True)
             ])
         else:
@@ -724,8 +940,8 @@ class MyBot(sc2.BotAI):
         return self.workers.filter(has_no_resource)
 
     def infestor_cast(self, unit: Unit):
-        e: Units = self.visible_enemy_units.closer_than(10, unit.position)
-        if unit.energy >= 75 and e.amount > 5 and self.units.closer_than(10, unit.position).amount > 5:
+        e: Units = self.visible_enemy_grid.closer_than(10, unit.position)
+        if unit.energy >= 75 and e.amount > 5 and self.unit_grid.closer_than(10, unit.position).amount > 5:
             self.actions.append(unit(AbilityId.FUNGALGROWTH_FUNGALGROWTH, e.random.position))
         elif unit.energy >= 25 and e.amount > 5:
             self.actions.append(unit(AbilityId.INFESTEDTERRANS_INFESTEDTERRANS, e.random.position))
@@ -733,12 +949,9 @@ class MyBot(sc2.BotAI):
             self.actions.append(unit.move(self.rally_point))
 
     def count_enemy_unit(self, u: UnitTypeId) -> 0:
-        if u in self.enemy_forces_stat:
-            return self.enemy_forces_stat[u]
-        else:
-            return 0
+        return self.enemy_tracker.count(u)
 
-    @property_cache_once_per_frame
+    @property_cache_ttl(seconds=2, on=("townhalls", "enemy_structures"))
     def enemy_early_aggressive(self):
         if self.townhalls.ready.amount == 2 and \
                 self.enemy_expansions_count == 1 and \
@@ -746,22 +959,12 @@ class MyBot(sc2.BotAI):
             return True
         return False
 
-    @property_cache_once_per_frame
+    @property_cache_ttl(seconds=5, on=("townhalls", "enemy_structures"))
     def enemy_early_greedy(self):
         if self.townhalls.ready.amount == 2 and self.enemy_expansions_count > 2:
             return True
         return False
 
-    def can_place_creep_tumor(self, t: Point2) -> bool:
-        creep_tumors = self.units.of_type({
-            UnitTypeId.CREEPTUMOR,
-            UnitTypeId.CREEPTUMORBURROWED,
-            UnitTypeId.CREEPTUMORMISSILE,
-            UnitTypeId.CREEPTUMORQUEEN,
-        })
-        exp_points = list(self.expansion_locations.keys())
-        return not creep_tumors.closer_than(10, t).exists and t.position.distance_to_closest(exp_points) > 5
-
     @property_cache_once_per_frame
     def est_surplus_forces(self):
         forces_supply = self.supply_used - self.count_unit(UnitTypeId.DRONE) - self.count_unit(UnitTypeId.QUEEN) * 2
@@ -774,6 +977,7 @@ class MyBot(sc2.BotAI):
                         self.units.of_type({UnitTypeId.SWARMHOSTMP}).amount * 3
         return forces_supply - self.enemy_forces_supply
 
+    @profiled()
     async def upgrade_building(self):
         for b in self.build_order:
             if b == UnitTypeId.INFESTATIONPIT:
@@ -796,6 +1000,7 @@ class MyBot(sc2.BotAI):
                 if len(abilities) > 0 and self.can_afford_or_change_production(abilities[0]):
                     self.actions.append(u.first(abilities[0]))
 
+    @profiled()
     async def build_building(self):
         if self.townhalls.amount < 2 or self.supply_used < 14:
             return
@@ -822,7 +1027,7 @@ class MyBot(sc2.BotAI):
             await self.build(UnitTypeId.EVOLUTIONCHAMBER, near=self.find_building_location(self.hq.position))
 
     def find_building_location(self, t: Unit) -> Point2:
-        m = self.state.mineral_field.closer_than(10, t.position)
+        m = self.mineral_grid.closer_than(10, t.position)
         if m.exists:
             return backwards(t.position, m.center, 10)
         else:
@@ -835,7 +1040,7 @@ class MyBot(sc2.BotAI):
         factor = 2 if unit_type == UnitTypeId.ZERGLING else 1
         return self.units(unit_type).amount + factor * self.already_pending(unit_type, all_units=True)
 
-    @property_cache_once_per_frame
+    @property_cache_ttl(seconds=5, on=("enemy_structures",))
     def attack_target(self):
         if self.known_enemy_structures.exists:
             target = self.known_enemy_structures.furthest_to(self.enemy_start_locations[0])
@@ -844,13 +1049,8 @@ class MyBot(sc2.BotAI):
 
     @property_cache_once_per_frame
     def enemy_near_townhall(self) -> Units:
-        result = set()
-        for t in self.townhalls:
-            enemy: Units = self.visible_enemy_units.closer_than(20, t.position)
-            for e in enemy:
-                e: Unit = e
-                result.add(e.tag)
-        return self.visible_enemy_units.tags_in(result).sorted_by_distance_to(self.start_location)
+        return self.visible_enemy_units.filter(
+            lambda e: self.influence.near_home(e.position)).sorted_by_distance_to(self.start_location)
 
     @property_cache_once_per_frame
     def visible_enemy_units(self) -> Units:
@@ -859,6 +1059,58 @@ class MyBot(sc2.BotAI):
 
         return self.known_enemy_units.filter(alive_and_can_attack)
 
+    @property_cache_once_per_frame
+    def engagement(self) -> EngagementMatrix:
+        return EngagementMatrix(Units(list(self.forces) + list(self.units(UnitTypeId.QUEEN))),
+                                self.visible_enemy_units)
+
+    @property_cache_once_per_frame
+    def squads(self) -> Squads:
+        return Squads(self.engagement, self.known_enemy_units,
+                      self.forces.of_type({UnitTypeId.ROACH, UnitTypeId.HYDRALISK, UnitTypeId.BANELING}))
+
+    @property_cache_once_per_frame
+    def unit_grid(self) -> UnitGrid:
+        return UnitGrid(self.units)
+
+    @property_cache_once_per_frame
+    def known_enemy_grid(self) -> UnitGrid:
+        return UnitGrid(self.known_enemy_units)
+
+    @property_cache_once_per_frame
+    def visible_enemy_grid(self) -> UnitGrid:
+        return UnitGrid(self.visible_enemy_units)
+
+    @property_cache_once_per_frame
+    def mineral_grid(self) -> UnitGrid:
+        return UnitGrid(self.state.mineral_field)
+
+    def snapshot(self) -> Snapshot:
+        enemies = self.visible_enemy_units
+        tumors = self.units.of_type({
+            UnitTypeId.CREEPTUMOR,
+            UnitTypeId.CREEPTUMORBURROWED,
+            UnitTypeId.CREEPTUMORMISSILE,
+            UnitTypeId.CREEPTUMORQUEEN,
+        })
+        return Snapshot(
+            iteration=self.iteration,
+            game_loop=self.state.game_loop,
+            start=self.start_location,
+            enemy_start=self.enemy_start_locations[0],
+            enemy_types=np.array([e.type_id.value for e in enemies], dtype=np.int32),
+            enemy_positions=points(e.position for e in enemies),
+            enemy_supply=np.array([e._type_data._proto.food_required for e in enemies], dtype=np.float64),
+            townhalls=points(t.position for t in self.townhalls),
+            ready_townhalls=points(t.position for t in self.townhalls.ready),
+            enemy_townhalls=points(t.position for t in self.enemy_expansions),
+            expansions=self.expansion_order + self.corner_expansion_order,
+            creep=self.creep.snapshot(),
+            tumors={t.tag: t.position for t in tumors if t.type_id == UnitTypeId.CREEPTUMORBURROWED},
+            all_tumors=points(t.position for t in tumors),
+        )
+
+    @profiled()
     def calc_enemy_info(self):
 
         if self.expand_target is not None:
@@ -875,54 +1127,35 @@ class MyBot(sc2.BotAI):
             UnitTypeId.PLANETARYFORTRESS
         }).sorted_by_distance_to(self.start_location)
 
-        for e in self.known_enemy_units:
-            e: Unit = e
-            if e.type_id not in self.enemy_unit_history:
-                self.enemy_unit_history[e.type_id] = set()
-            if e.health > 0 and not e.is_structure and e.type_id not in {UnitTypeId.DRONE,
-                                                                         UnitTypeId.SCV,
-                                                                         UnitTypeId.PROBE}:
-                self.enemy_forces[e.tag] = e
-                self.enemy_has_changed = True
-            self.enemy_unit_history[e.type_id].add(e.tag)
-
-        self.enemy_forces_supply = 0
-        self.enemy_air_forces_supply = 0
-        self.enemy_forces_stat = {}
-        distance = 0
-        for k, v in self.enemy_forces.items():
-            self.enemy_forces_supply += v._type_data._proto.food_required
-            if v.is_flying:
-                self.enemy_air_forces_supply += v._type_data._proto.food_required
-            if v.type_id in self.enemy_forces_stat:
-                self.enemy_forces_stat[v.type_id] += 1
-            else:
-                self.enemy_forces_stat[v.type_id] = 1
-            if self.enemy_has_changed:
-                distance += v.distance_to(self.start_location)
-        if distance > 0 and len(self.enemy_forces) > 0:
-            self.enemy_forces_distance = distance / len(self.enemy_forces)
-
-        self.enemy_has_changed = False
+        self.enemy_tracker.see_all(self.known_enemy_units, self.state.game_loop)
+        self.enemy_forces_supply = self.enemy_tracker.supply
+        self.enemy_air_forces_supply = self.enemy_tracker.air_supply
+        if self.enemy_tracker.average_distance is not None:
+            self.enemy_forces_distance = self.enemy_tracker.average_distance
 
         def not_full_health(u: Unit) -> bool:
             return u.health < u.health_max
 
+        self.unit_state.touch(self.units.tags, self.state.game_loop)
+        self.unit_state.evict(self.state.game_loop)
         units_attacked = set()
         for w in self.units.filter(not_full_health):
             w: Unit = w
-            if (w.tag in self.units_health and w.health < self.units_health[w.tag]) or w.tag not in self.units_health:
+            health = self.unit_state.get(w.tag, "health")
+            if health is None or w.health < health:
                 units_attacked.add(w.tag)
-            self.units_health[w.tag] = w.health
+            self.unit_state.set(w.tag, self.state.game_loop, health=w.health)
 
         self.units_attacked = self.units.tags_in(units_attacked)
-        logger.info(
-            "surplus=%s est_surplus=%s dist=%s",
-            self.surplus_forces,
-            self.est_surplus_forces,
-            self.enemy_forces_distance
+        self.telemetry.log(
+            logging.INFO, "forces",
+            surplus=lambda: self.surplus_forces,
+            est_surplus=lambda: self.est_surplus_forces,
+            dist=self.enemy_forces_distance,
+            composition=lambda: {t.name: n for t, n in self.analysis.composition.items()} if self.analysis else None,
         )
 
+    @profiled()
     async def produce_unit(self):
         if self.supply_left == 0:
             return
@@ -931,7 +1164,7 @@ class MyBot(sc2.BotAI):
                 z = self.forces.of_type({UnitTypeId.ZERGLING})
                 if z.exists:
                     t = z.closest_to(self.start_location)
-                    if not self.visible_enemy_units.closer_than(10, t.position).exists:
+                    if not self.visible_enemy_grid.closer_than(10, t.position).exists:
                         self.actions.append(t(AbilityId.MORPHZERGLINGTOBANELING_BANELING))
             else:
                 self.train(u)
@@ -947,14 +1180,14 @@ class MyBot(sc2.BotAI):
         if self.time - self.time_table[func.__name__] >= seconds:
             await func()
 
-    async def chat_if_changed(self, key, value, additional=None):
+    def chat_if_changed(self, key, value, additional=None):
         if key not in self.value_table:
-            await self.chat_send(f"{self.time_formatted} {key}: None -> {value}")
+            self.telemetry.chat(f"{self.time_formatted} {key}: None -> {value}")
             if additional:
                 additional(key, "None", value)
             self.value_table[key] = value
         elif self.value_table[key] != value:
-            await self.chat_send(f"{self.time_formatted} {key}: {self.value_table[key]} -> {value}")
+            self.telemetry.chat(f"{self.time_formatted} {key}: {self.value_table[key]} -> {value}")
             if additional:
                 additional(key, self.value_table[key], value)
             self.value_table[key] = value
@@ -979,6 +1212,14 @@ class MyBot(sc2.BotAI):
             remove_if_exists(self.production_order, UnitTypeId.SWARMHOSTMP)
         return can_afford
 
+    @property
+    def scout_units(self) -> Set[int]:
+        return self.unit_state.tags_where("scout")
+
+    @property
+    def base_trade_units(self) -> Set[int]:
+        return self.unit_state.tags_where("base_trade")
+
     def potential_scout_units(self):
         if self.supply_used > 190 and self.already_pending(UpgradeId.OVERLORDSPEED) == 1:
             scouts = self.units(UnitTypeId.OVERLORD).tags_not_in(self.scout_units)
@@ -988,7 +1229,7 @@ class MyBot(sc2.BotAI):
 
     async def heartbeat(self):
         s = self.state.score
-        await self.chat_send(
+        self.telemetry.chat(
             f"{self.time_formatted} "
             f"M:{s.killed_minerals_army + s.killed_minerals_economy - s.lost_minerals_army - s.lost_minerals_economy} "
             f"V:{s.killed_vespene_army + s.killed_vespene_economy - s.lost_vespene_army - s.lost_vespene_economy} "
@@ -1006,10 +1247,8 @@ class MyBot(sc2.BotAI):
         s = self.potential_scout_units()
         if s.exists:
             scout = s.random
-            self.scout_units.add(scout.tag)
-            locs = self.enemy_start_locations[0].sort_by_distance(list(self.expansion_locations.keys()))
-            locs.reverse()
-            for i, p in enumerate(locs):
+            self.unit_state.set(scout.tag, self.state.game_loop, scout=True)
+            for i, p in enumerate(self.scout_tour):
                 if not self.is_visible(p):
                     self.actions.append(scout.move(p, queue=i > 0))
             self.time_table["scout_expansions"] = self.time
@@ -1024,7 +1263,7 @@ class MyBot(sc2.BotAI):
                 scouts = self.units.of_type({UnitTypeId.ZERGLING, UnitTypeId.OVERLORD})
                 if scouts.exists and scouts.closest_distance_to(x.position) > 2 and s.exists:
                     scout = s.random
-                    self.scout_units.add(scout.tag)
+                    self.unit_state.set(scout.tag, self.state.game_loop, scout=True)
                     self.actions.extend([
                         scout.move(x.position),
                         scout.hold_position(queue=True)
@@ -1044,17 +1283,11 @@ class MyBot(sc2.BotAI):
         if os.exists:
             self.actions.append(os.first(AbilityId.MORPH_OVERSEER))
 
-    @property_cache_once_per_frame
+    @property
     def need_worker_mineral(self):
-        def need_worker_townhall(a: Unit):
-            return a.assigned_harvesters < a.ideal_harvesters and \
-                   self.visible_enemy_units.closer_than(10, a.position).amount == 0
-
-        t = self.townhalls.ready.filter(need_worker_townhall)
-        if t.exists:
-            return self.state.mineral_field.closest_to(t.random.position)
-        else:
-            return None
+        # a patch with less than its ideal workers at a base without enemies near
+        bases = [t.tag for t in self.townhalls.ready if not self.influence.enemy_near(t.position)]
+        return self.saturation.least_saturated(bases, below=MINERAL_WORKERS)
 
     def should_build_extractor(self):
         if self.vespene - self.minerals > 100:
@@ -1103,31 +1336,25 @@ class MyBot(sc2.BotAI):
         return full_workers and total_ideal_harvesters < 16 * 4
 
     def enemy_unit_history_count(self, unit_types: List[UnitTypeId]) -> int:
-        count = 0
-        for unit_type in unit_types:
-            if unit_type in self.enemy_unit_history:
-                count += len(self.enemy_unit_history[unit_type])
-        return count
+        return self.enemy_tracker.history_count(unit_types)
 
     def is_location_safe(self, p: Point2):
-        return not self.known_enemy_structures.of_type(
-            {UnitTypeId.PHOTONCANNON, UnitTypeId.SPINECRAWLER, UnitTypeId.BUNKER}).closer_than(7, p).exists
+        return not self.influence.static_defense_near(p)
 
-    @property_cache_once_per_frame
+    @property_cache_ttl(seconds=1)
     def est_defense_surplus(self):
         return max(self.est_surplus_forces, self.surplus_forces + self.count_spinecrawler() * 2)
 
     def count_spinecrawler(self):
         return self.count_unit(UnitTypeId.SPINECRAWLER) + self.count_unit(UnitTypeId.SPINECRAWLERUPROOTED)
 
+    @profiled()
     async def defend_early_rush(self) -> bool:
-        half_size = self.start_location.distance_to(self.game_info.map_center)
-        proxy_barracks = self.known_enemy_structures. \
-            of_type({UnitTypeId.BARRACKS}).closer_than(half_size, self.start_location)
-        enemy_units = self.visible_enemy_units.exclude_type(
-            {UnitTypeId.DRONE, UnitTypeId.SCV, UnitTypeId.PROBE}).closer_than(half_size, self.start_location)
-        enemy_drones = self.visible_enemy_units.of_type(
-            {UnitTypeId.DRONE, UnitTypeId.SCV, UnitTypeId.PROBE}).closer_than(half_size, self.start_location)
+        proxy_barracks = self.in_own_half(self.known_enemy_structures.of_type({UnitTypeId.BARRACKS}))
+        enemy_units = self.in_own_half(self.visible_enemy_units.exclude_type(
+            {UnitTypeId.DRONE, UnitTypeId.SCV, UnitTypeId.PROBE}))
+        enemy_drones = self.in_own_half(self.visible_enemy_units.of_type(
+            {UnitTypeId.DRONE, UnitTypeId.SCV, UnitTypeId.PROBE}))
         townhall_to_defend = self.townhalls.ready.furthest_to(self.start_location)
         # build spinecrawlers
         t = max(self.enemy_forces_supply / 3,
@@ -1171,21 +1398,19 @@ class MyBot(sc2.BotAI):
         return False
 
     def early_attack(self):
-        half_size = self.start_location.distance_to(self.game_info.map_center)
-        proxy_barracks = self.known_enemy_structures. \
-            of_type({UnitTypeId.BARRACKS}).closer_than(half_size, self.start_location)
+        proxy_barracks = self.in_own_half(self.known_enemy_structures.of_type({UnitTypeId.BARRACKS}))
 
         if self.already_pending(UpgradeId.ZERGLINGMOVEMENTSPEED) > 0 or self.vespene > 100:
             for a in self.units(UnitTypeId.EXTRACTOR).ready:
-                for w in self.empty_workers.closer_than(2.5, a):
-                    self.actions.append(w.gather(self.state.mineral_field.closest_to(w)))
+                for w in self.saturation.empty_gatherers(a.tag):
+                    self.gather_minerals(w, self.saturation.base_of.get(a.tag))
 
         self.drone_gather()
 
         if self.forces.idle.amount > 20 and len(self.base_trade_units) == 0:
             for f in self.forces.idle.random_group_of(10):
                 f: Unit = f
-                self.base_trade_units.add(f.tag)
+                self.unit_state.set(f.tag, self.state.game_loop, base_trade=True)
                 if proxy_barracks.exists:
                     self.actions.append(
                         f.move(self.start_location.closest(self.far_corners), queue=True))
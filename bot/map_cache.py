@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import sc2
+from sc2.game_info import GameInfo, Ramp
+from sc2.position import Point2
+from sc2.units import Units
+
+from .ground import ExpansionDistances
+
+logger = sc2.main.logger
+
+CACHE_DIR = Path(__file__).parent / "../data/maps"
+QUIRKS_PATH = Path(__file__).parent / "maps.json"
+# bump when the cached analysis changes, old entries are then ignored
+VERSION = 1
+# the rally point is this far from its townhall, towards the map center
+RALLY_DISTANCE = 4
+# minerals this close to an expansion form its mineral line
+MINERAL_LINE_RADIUS = 10
+
+
+def map_key(game_info: GameInfo, start: Point2, enemy_start: Point2) -> str:
+    # the grids identify the map version, the start locations the spawn
+    h = hashlib.sha1()
+    for grid in (game_info.pathing_grid, game_info.placement_grid, game_info.terrain_height):
+        h.update(grid.data_numpy.tobytes())
+    a = game_info.playable_area
+    h.update(repr((VERSION, a.x, a.y, a.width, a.height, tuple(start), tuple(enemy_start))).encode())
+    return h.hexdigest()[:20]
+
+
+def map_quirks(map_name: str) -> Dict:
+    # per-map adjustments from maps.json, keyed by a lowercase part of the map name
+    with open(QUIRKS_PATH) as f:
+        quirks = json.load(f)
+    name = map_name.lower()
+    return next((q for key, q in quirks.items() if key in name), {})
+
+
+def _mapped(path: Path) -> np.ndarray:
+    # a plain ndarray over the memory map; indexing a np.memmap costs several times more
+    return np.asarray(np.load(path, mmap_mode="r"))
+
+
+def _points(a, cast=float) -> List[Point2]:
+    # ramps and vision blockers are cells and index the grids, so they stay integers
+    return [Point2((cast(x), cast(y))) for x, y in np.asarray(a).reshape(-1, 2).tolist()]
+
+
+class MapAnalysis:
+    """Everything about a map and spawn that does not change during a game.
+
+    Holds the expansion locations, the playable area corners, ramps and vision blockers,
+    the ground distances of `ExpansionDistances` and the per-base rally point and mineral
+    line. `save` writes it as .npy arrays plus a small JSON file; `load` maps the arrays
+    into memory instead of reading them.
+    """
+
+    def __init__(self, expansions: List[Point2], distances: ExpansionDistances, corners: Dict[str, List[Point2]],
+                 ramps: List[Set[Point2]], vision_blockers: Set[Point2], rally: List[Point2],
+                 mineral_lines: List[Optional[Point2]], quirks: Dict):
+        self.expansions = expansions
+        self.distances = distances
+        self.my_corner = corners["my"][0]
+        self.enemy_corner = corners["enemy"][0]
+        self.far_corners = set(corners["far"])
+        self.ramp_points = ramps
+        self.vision_blockers = vision_blockers
+        self.rally = dict(zip(expansions, rally))
+        self.mineral_lines = {p: m for p, m in zip(expansions, mineral_lines) if m is not None}
+        self.quirks = quirks
+
+    @classmethod
+    def build(cls, game_info: GameInfo, expansion_locations: Dict[Point2, List], start: Point2,
+              enemy_start: Point2) -> "MapAnalysis":
+        expansions = list(expansion_locations.keys())
+        a = game_info.playable_area
+        corners = {Point2((a.x, a.y)), Point2((a.x, a.height)), Point2((a.width, a.y)), Point2((a.width, a.height))}
+        my_corner, enemy_corner = start.closest(corners), enemy_start.closest(corners)
+        ramps, vision_blockers = game_info._find_ramps_and_vision_blockers()
+        distances = ExpansionDistances(game_info.pathing_grid.data_numpy != 0, expansions, start, enemy_start)
+        mineral_lines = []
+        for p, resources in expansion_locations.items():
+            minerals = Units(resources).mineral_field.closer_than(MINERAL_LINE_RADIUS, p)
+            mineral_lines.append(minerals.center if minerals.exists else None)
+        return cls(
+            expansions, distances,
+            {"my": [my_corner], "enemy": [enemy_corner], "far": list(corners - {my_corner, enemy_corner})},
+            [set(r.points) for r in ramps], vision_blockers,
+            [p.towards(game_info.map_center, RALLY_DISTANCE) for p in expansions], mineral_lines,
+            map_quirks(game_info.map_name),
+        )
+
+    def save(self, directory: Path):
+        # written next to the target and renamed, so parallel games never read half an entry
+        tmp = directory.with_name(f"{directory.name}.tmp-{os.getpid()}")
+        tmp.mkdir(parents=True, exist_ok=True)
+        d = self.distances
+        np.save(tmp / "pathable.npy", d.pathable)
+        np.save(tmp / "distance.npy", d.distance)
+        np.save(tmp / "fields.npy", d.fields)
+        ramp_points = [(p.x, p.y, i) for i, r in enumerate(self.ramp_points) for p in r]
+        np.save(tmp / "ramps.npy", np.array(ramp_points, dtype=np.int32).reshape(-1, 3))
+        np.save(tmp / "vision_blockers.npy", np.array(list(self.vision_blockers), dtype=np.int32).reshape(-1, 2))
+        with open(tmp / "map.json", "w") as f:
+            json.dump({
+                "version": VERSION,
+                "expansions": [tuple(p) for p in self.expansions],
+                "start": tuple(d.points[d.start]),
+                "enemy_start": tuple(d.points[d.enemy_start]),
+                "corners": {"my": [tuple(self.my_corner)], "enemy": [tuple(self.enemy_corner)],
+                            "far": [tuple(p) for p in self.far_corners]},
+                "rally": [tuple(self.rally[p]) for p in self.expansions],
+                "mineral_lines": [tuple(self.mineral_lines[p]) if p in self.mineral_lines else None
+                                  for p in self.expansions],
+            }, f)
+        try:
+            tmp.rename(directory)
+        except OSError:
+            # another game saved the same map first
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: Path, map_name: str) -> "MapAnalysis":
+        with open(directory / "map.json") as f:
+            meta = json.load(f)
+        if meta["version"] != VERSION:
+            raise ValueError(f"map cache version {meta['version']}")
+        expansions = _points(meta["expansions"])
+        distances = ExpansionDistances(
+            _mapped(directory / "pathable.npy"), expansions, Point2(meta["start"]), Point2(meta["enemy_start"]),
+            _mapped(directory / "distance.npy"), _mapped(directory / "fields.npy"))
+        ramps: Dict[int, Set[Point2]] = {}
+        for x, y, i in np.load(directory / "ramps.npy").tolist():
+            ramps.setdefault(i, set()).add(Point2((x, y)))
+        return cls(
+            expansions, distances, {k: _points(v) for k, v in meta["corners"].items()},
+            list(ramps.values()), set(_points(np.load(directory / "vision_blockers.npy"), int)),
+            _points(meta["rally"]), [Point2(m) if m is not None else None for m in meta["mineral_lines"]],
+            map_quirks(map_name),
+        )
+
+    def ramps(self, game_info: GameInfo) -> List[Ramp]:
+        return [Ramp(points, game_info) for points in self.ramp_points]
+
+    def expansion_resources(self, resources: Units) -> Dict[Point2, List]:
+        # every resource goes to the closest expansion, as `BotAI.expansion_locations` groups them
+        groups: Dict[Point2, List] = {p: [] for p in self.expansions}
+        for r in resources:
+            groups[r.position.closest(self.expansions)].append(r)
+        return groups
+
+    def rally_point(self, townhall: Point2, map_center: Point2) -> Point2:
+        p = self.rally.get(townhall)
+        return p if p is not None else townhall.towards(map_center, RALLY_DISTANCE)
+
+    def mineral_line(self, townhall: Point2) -> Optional[Point2]:
+        return self.mineral_lines.get(townhall)
+
+
+def load_map_analysis(game_info: GameInfo, start: Point2, enemy_start: Point2,
+                      expansion_locations: Callable[[], Dict[Point2, List]],
+                      cache_dir: Path = None) -> Tuple[MapAnalysis, bool]:
+    """The cached analysis of this map and spawn, built and saved first if there is none.
+
+    Returns the analysis and whether it came from the cache.
+    """
+    directory = (cache_dir or CACHE_DIR) / map_key(game_info, start, enemy_start)
+    if directory.exists():
+        try:
+            return MapAnalysis.load(directory, game_info.map_name), True
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("ignoring map cache %s: %s", directory, e)
+    analysis = MapAnalysis.build(game_info, expansion_locations(), start, enemy_start)
+    try:
+        analysis.save(directory)
+    except OSError as e:
+        logger.warning("could not save map cache %s: %s", directory, e)
+    return analysis, False
@@ -0,0 +1,149 @@
+import random
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sc2.data import ActionResult
+from sc2.game_data import AbilityData
+from sc2.position import Point2
+from sc2.units import Units
+
+# a new or dead structure can change placement this far from its center
+INVALIDATION_RADIUS = 6
+# creep spreads and recedes, so nothing is trusted for longer than this many game loops
+MAX_AGE = 224
+CELL_SIZE = 8
+
+Key = Tuple[int, float, float]
+
+
+def ring_positions(near: Point2, max_distance: int, placement_step: int) -> List[List[Point2]]:
+    # the candidates BotAI.find_placement tries, ring by ring, starting with `near` itself
+    rings = [[near]]
+    for distance in range(placement_step, max_distance, placement_step):
+        rings.append([
+            Point2(p).offset(near).to2
+            for p in (
+                [(dx, -distance) for dx in range(-distance, distance + 1, placement_step)]
+                + [(dx, distance) for dx in range(-distance, distance + 1, placement_step)]
+                + [(-distance, dy) for dy in range(-distance, distance + 1, placement_step)]
+                + [(distance, dy) for dy in range(-distance, distance + 1, placement_step)]
+            )
+        ])
+    return rings
+
+
+class PlacementCache:
+    """Building placement results keyed by (ability, position), shared across frames.
+
+    Positions are collected with `prefetch` and resolved with one query per building type
+    on `flush`; `find_placement` answers from the cache and queries its missing rings in
+    batches of 1, 2, 4, ... rings until one has a valid spot. Entries near a structure that
+    appeared or died are dropped in `update`.
+    """
+
+    def __init__(self):
+        self.results: Dict[Key, Tuple[bool, int]] = {}
+        self.cells: Dict[Tuple[int, int], Set[Key]] = {}
+        self.pending: Dict[int, Tuple[AbilityData, Dict[Key, Point2]]] = {}
+        self.structures: Dict[int, Point2] = {}
+        self.game_loop = 0
+        self.queries = 0
+        self.positions_queried = 0
+        self.hits = 0
+
+    @staticmethod
+    def _key(ability: AbilityData, p: Point2) -> Key:
+        return ability.id.value, round(p.x, 2), round(p.y, 2)
+
+    @staticmethod
+    def _cell(x: float, y: float) -> Tuple[int, int]:
+        return int(x // CELL_SIZE), int(y // CELL_SIZE)
+
+    def _store(self, key: Key, ok: bool):
+        self.results[key] = (ok, self.game_loop)
+        self.cells.setdefault(self._cell(key[1], key[2]), set()).add(key)
+
+    def _invalidate_near(self, p: Point2):
+        r = INVALIDATION_RADIUS
+        x0, y0 = self._cell(p.x - r, p.y - r)
+        x1, y1 = self._cell(p.x + r, p.y + r)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                keys = self.cells.get((cx, cy))
+                if not keys:
+                    continue
+                for key in [k for k in keys if (k[1] - p.x) ** 2 + (k[2] - p.y) ** 2 <= r * r]:
+                    keys.discard(key)
+                    self.results.pop(key, None)
+
+    def update(self, game_loop: int, structures: Units):
+        self.game_loop = game_loop
+        self.pending = {}
+        current = {s.tag: s.position for s in structures}
+        for tag, p in self.structures.items():
+            if tag not in current:
+                self._invalidate_near(p)
+        for tag, p in current.items():
+            if tag not in self.structures:
+                self._invalidate_near(p)
+        self.structures = current
+
+    def get(self, ability: AbilityData, p: Point2) -> Optional[bool]:
+        r = self.results.get(self._key(ability, p))
+        if r is None or self.game_loop - r[1] > MAX_AGE:
+            return None
+        return r[0]
+
+    def prefetch(self, ability: AbilityData, positions: Iterable[Point2]):
+        for p in positions:
+            key = self._key(ability, p)
+            if self.get(ability, p) is None:
+                self.pending.setdefault(ability.id.value, (ability, {}))[1][key] = p
+
+    def prefetch_rings(self, ability: AbilityData, near: Point2, max_distance: int, placement_step: int):
+        for ring in ring_positions(near, max_distance, placement_step):
+            self.prefetch(ability, ring)
+
+    async def flush(self, client):
+        pending, self.pending = self.pending, {}
+        for ability, positions in pending.values():
+            keys = list(positions)
+            result = await client.query_building_placement(ability, [positions[k] for k in keys])
+            self.queries += 1
+            self.positions_queried += len(keys)
+            for key, r in zip(keys, result):
+                self._store(key, r == ActionResult.Success)
+
+    async def check(self, client, ability: AbilityData, positions: List[Point2]) -> List[bool]:
+        self.prefetch(ability, positions)
+        if self.pending:
+            await self.flush(client)
+        else:
+            self.hits += 1
+        return [self.get(ability, p) for p in positions]
+
+    async def find_placement(self, client, ability: AbilityData, near: Point2, max_distance: int = 20,
+                             random_alternative: bool = True, placement_step: int = 2) -> Optional[Point2]:
+        # same answer as BotAI.find_placement; the missing rings are queried in batches that double
+        # in size, so a close spot costs the server no more than the library's ring-by-ring search
+        # and a far one takes a few round trips instead of one per ring
+        rings = ring_positions(near, max_distance, placement_step)
+        queried = False
+        i, batch = 0, 1
+        while i < len(rings):
+            self.prefetch(ability, [p for ring in rings[i:i + batch] for p in ring])
+            if self.pending:
+                await self.flush(client)
+                queried = True
+            for ring in rings[i:i + batch]:
+                possible = [p for p in ring if self.get(ability, p)]
+                if not possible:
+                    continue
+                if not queried:
+                    self.hits += 1
+                if random_alternative and len(ring) > 1:
+                    return random.choice(possible)
+                return min(possible, key=lambda p: p.distance_to_point2(near))
+            i, batch = i + batch, batch * 2
+        if not queried:
+            self.hits += 1
+        return None
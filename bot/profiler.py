@@ -0,0 +1,190 @@
+import functools
+import inspect
+import json
+import math
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+# the limit run_locally.py plays with, see sc2.main._play_game_ai
+STEP_TIME_LIMIT = {"time_limit": 5, "window_size": 10, "penalty": 10}
+# game seconds per histogram bucket
+BUCKET_SECONDS = 60
+# histogram bins per doubling of microseconds, so a bin is at most ~9% wide
+BINS_PER_OCTAVE = 8
+
+
+def _bin(seconds: float) -> int:
+    return int(BINS_PER_OCTAVE * math.log2(seconds * 1e6 + 1))
+
+
+def _bin_ms(b: int) -> float:
+    # middle of the bin, in milliseconds
+    return (2 ** ((b + 0.5) / BINS_PER_OCTAVE) - 1) / 1000
+
+
+class Histogram:
+    def __init__(self):
+        self.bins = Counter()
+        self.count = 0
+        self.total: float = 0
+        self.max: float = 0
+
+    def add(self, seconds: float):
+        self.bins[_bin(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: "Histogram"):
+        self.bins.update(other.bins)
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        if self.count == 0:
+            return 0
+        rank = q / 100 * self.count
+        seen = 0
+        for b in sorted(self.bins):
+            seen += self.bins[b]
+            if seen >= rank:
+                return min(_bin_ms(b), self.max * 1000)
+        return self.max * 1000
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total * 1000 / self.count if self.count else 0,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max * 1000,
+        }
+
+
+class Section:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    """Per-section step timings, kept as log-scale histograms per game-time bucket.
+
+    `frame_start`/`frame_end` wrap a whole `on_step`; frames that would have gone over the
+    `step_time_limit` sliding window are listed individually in the report.
+    """
+
+    def __init__(self, step_time_limit: Dict = None):
+        self.step_time_limit = STEP_TIME_LIMIT if step_time_limit is None else step_time_limit
+        self.enabled = True
+        self.sections: Dict[str, Dict[int, Histogram]] = {}
+        self.actions = Counter()
+        self.window: List[float] = []
+        self.over_budget: List[Dict] = []
+        self.bucket = 0
+        self.frame_info: Dict = {}
+        self.frame_budget: float = None
+        self.frame_start_time: float = 0
+
+    def section(self, name: str) -> Section:
+        return Section(self, name)
+
+    def record(self, name: str, seconds: float):
+        if not self.enabled:
+            return
+        buckets = self.sections.get(name)
+        if buckets is None:
+            buckets = self.sections[name] = {}
+        h = buckets.get(self.bucket)
+        if h is None:
+            h = buckets[self.bucket] = Histogram()
+        h.add(seconds)
+
+    def frame_start(self, iteration: int, game_loop: int, game_time: float, budget: Optional[float] = None):
+        self.bucket = int(game_time // BUCKET_SECONDS)
+        self.frame_info = {"iteration": iteration, "game_loop": game_loop, "time": round(game_time, 2)}
+        self.frame_budget = budget
+        self.frame_start_time = time.perf_counter()
+
+    def frame_end(self, actions: int):
+        elapsed = time.perf_counter() - self.frame_start_time
+        self.record("step", elapsed)
+        self.actions[actions] += 1
+        # same rule as sc2.main: a step may use what the previous window_size - 1 steps left over
+        budget = self.frame_budget
+        if budget is None:
+            budget = self.step_time_limit["time_limit"] - sum(self.window[1:])
+        self.window = (self.window + [elapsed])[-self.step_time_limit["window_size"]:]
+        if elapsed > budget:
+            self.over_budget.append({**self.frame_info, "budget_ms": budget * 1000, "step_ms": elapsed * 1000})
+
+    def report(self) -> Dict:
+        sections = {}
+        for name, buckets in self.sections.items():
+            total = Histogram()
+            for h in buckets.values():
+                total.merge(h)
+            sections[name] = total.summary()
+            sections[name]["buckets"] = {
+                f"{b * BUCKET_SECONDS}s": buckets[b].summary() for b in sorted(buckets)
+            }
+        frames = sum(self.actions.values())
+        issued = sum(n * c for n, c in self.actions.items())
+        action_counts = sorted(self.actions.elements())
+        return {
+            "step_time_limit": self.step_time_limit,
+            "bucket_seconds": BUCKET_SECONDS,
+            "frames": frames,
+            "sections": sections,
+            "actions_per_frame": {
+                "total": issued,
+                "mean": issued / frames if frames else 0,
+                "p50": action_counts[len(action_counts) // 2] if action_counts else 0,
+                "p99": action_counts[min(len(action_counts) - 1, int(len(action_counts) * 0.99))]
+                if action_counts else 0,
+                "max": max(self.actions) if self.actions else 0,
+            },
+            "over_budget_frames": self.over_budget,
+        }
+
+    def write(self, path: Union[str, Path], **extra):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({**extra, **self.report()}, f, indent=2)
+
+
+def profiled(name: str = None):
+    """Times a bot method into `self.profiler` under `name`, defaulting to the method name."""
+
+    def decorator(func):
+        section_name = name or func.__name__
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(self, *args, **kwargs):
+                with self.profiler.section(section_name):
+                    return await func(self, *args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(self, *args, **kwargs):
+                with self.profiler.section(section_name):
+                    return func(self, *args, **kwargs)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,176 @@
+import gzip
+import pickle
+import random
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from s2clientprotocol import sc2api_pb2 as sc_pb
+from sc2.position import Point2, Point3
+from sc2.unit import Unit
+from sc2.unit_command import UnitCommand
+
+FORMAT_VERSION = 1
+
+
+def position_key(p: Union[Unit, Point2, Point3]) -> Tuple[float, float]:
+    if isinstance(p, Unit):
+        p = p.position
+    return round(p.x, 4), round(p.y, 4)
+
+
+def abilities_key(units, ignore_resource_requirements: bool) -> Tuple:
+    if isinstance(units, Unit):
+        return (units.tag,), ignore_resource_requirements, True
+    return tuple(u.tag for u in units), ignore_resource_requirements, False
+
+
+def placement_key(ability, positions) -> Tuple:
+    return ability.id.value, tuple(position_key(p) for p in positions)
+
+
+def pathing_key(start, end) -> Tuple:
+    return position_key(start), position_key(end)
+
+
+def format_action(a: UnitCommand) -> str:
+    if isinstance(a.target, Unit):
+        target = a.target.tag
+    elif a.target is not None:
+        target = "%.2f,%.2f" % (a.target.x, a.target.y)
+    else:
+        target = "-"
+    return f"{a.ability.name} {a.unit.tag} {target}{' queue' if a.queue else ''}"
+
+
+class Recorder:
+    """Writes everything `on_step` reads from the game to a gzip-compressed pickle stream.
+
+    The first record is a header with the game data, game info, player id and random seed;
+    every following record is one frame: the raw observation, the pathing grid when it changed,
+    the responses to every client query in call order and the actions that were sent.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.file = None
+        self.frame: Dict = None
+        self.last_pathing: bytes = None
+        self.frames = 0
+
+    async def start(self, bot, seed: int = None):
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        random.seed(seed)
+        data = await bot._client._execute(
+            data=sc_pb.RequestData(ability_id=True, unit_type_id=True, upgrade_id=True, buff_id=True, effect_id=True)
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = gzip.open(self.path, "wb", compresslevel=6)
+        self._write({
+            "version": FORMAT_VERSION,
+            "player_id": bot.player_id,
+            "seed": seed,
+            "game_data": data.data.SerializeToString(),
+            "game_info": bot.game_info._proto.SerializeToString(),
+        })
+        bot._client = RecordingClient(bot._client, self)
+
+    def _write(self, record: Dict):
+        pickle.dump(record, self.file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def frame_start(self, iteration: int, state, pathing_proto, budget: Optional[float]):
+        if self.file is None:
+            return
+        pathing = pathing_proto.SerializeToString()
+        self.frame = {
+            "iteration": iteration,
+            "budget": budget,
+            "observation": state.response_observation.SerializeToString(),
+            "pathing": pathing if pathing != self.last_pathing else None,
+            "calls": [],
+            "actions": [],
+        }
+        self.last_pathing = pathing
+
+    def call(self, method: str, key, result):
+        if self.frame is not None:
+            self.frame["calls"].append((method, key, result))
+
+    def frame_end(self):
+        if self.frame is None:
+            return
+        self._write(self.frame)
+        self.frames += 1
+        self.frame = None
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class RecordingClient:
+    """Forwards to the real client and hands each query response to the recorder."""
+
+    def __init__(self, client, recorder: Recorder):
+        self._client = client
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    async def query_available_abilities(self, units, ignore_resource_requirements: bool = False):
+        result = await self._client.query_available_abilities(units, ignore_resource_requirements)
+        if isinstance(units, Unit):
+            recorded = [a.value for a in result]
+        else:
+            recorded = [[a.value for a in r] for r in result]
+        self._recorder.call("query_available_abilities", abilities_key(units, ignore_resource_requirements),
+                            recorded)
+        return result
+
+    async def query_building_placement(self, ability, positions, ignore_resources: bool = True):
+        result = await self._client.query_building_placement(ability, positions, ignore_resources)
+        self._recorder.call("query_building_placement", placement_key(ability, positions), [r.value for r in result])
+        return result
+
+    async def query_pathing(self, start, end):
+        result = await self._client.query_pathing(start, end)
+        self._recorder.call("query_pathing", pathing_key(start, end), result)
+        return result
+
+    async def query_pathings(self, zipped_list):
+        zipped_list = list(zipped_list)
+        result = await self._client.query_pathings(zipped_list)
+        self._recorder.call("query_pathings", tuple(pathing_key(s, e) for s, e in zipped_list), result)
+        return result
+
+    async def actions(self, actions, return_successes=False):
+        if self._recorder.frame is not None and actions:
+            self._recorder.frame["actions"].extend(
+                format_action(a) for a in (actions if isinstance(actions, list) else [actions]))
+        return await self._client.actions(actions, return_successes)
+
+    async def chat_send(self, message: str, team_only: bool):
+        self._recorder.call("chat_send", team_only, message)
+        return await self._client.chat_send(message, team_only)
+
+
+def read_recording(path: Union[str, Path]) -> Tuple[Dict, Iterator[Dict]]:
+    f = gzip.open(path, "rb")
+    header = pickle.load(f)
+    assert header["version"] == FORMAT_VERSION, f"unsupported recording version {header['version']}"
+
+    def frames():
+        with f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    return header, frames()
+
+
+def action_lines(iteration: int, actions: List[str]) -> List[str]:
+    return [f"{iteration} {a}" for a in actions]
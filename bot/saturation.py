@@ -0,0 +1,155 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set
+
+from sc2.constants import AbilityId
+from sc2.position import Point2
+from sc2.unit import Unit
+from sc2.units import Units
+
+# ideal workers per resource, as the game counts them
+MINERAL_WORKERS = 2
+GAS_WORKERS = 3
+# resources this close to a ready townhall belong to its base
+BASE_RADIUS = 10
+# patches with this many workers or more share the last bucket
+MAX_BUCKET = MINERAL_WORKERS + 1
+
+GATHER = {AbilityId.HARVEST_GATHER, AbilityId.HARVEST_GATHER_DRONE}
+RETURN = {AbilityId.HARVEST_RETURN, AbilityId.HARVEST_RETURN_DRONE}
+
+
+class SaturationIndex:
+    """Which worker gathers from which mineral patch or extractor.
+
+    `update` reads every worker's current order and only moves the workers whose gather
+    target changed; a returning worker keeps its patch and a worker inside an extractor is
+    not visible, so it keeps its extractor until `forget`. The mineral patches of every base
+    are kept in buckets by their worker count, so the least saturated patch is found without
+    looking at the patches. Commands given through `assign` count right away, before the
+    worker has the order.
+    """
+
+    def __init__(self):
+        self.layout = None
+        self.base_of: Dict[int, int] = {}
+        self.gas: Set[int] = set()
+        self.bases: Dict[int, Point2] = {}
+        # base -> mineral tags by worker count, capped at MAX_BUCKET
+        self.buckets: Dict[int, List[Set[int]]] = {}
+        self.resources: Dict[int, Unit] = {}
+        self.workers: Dict[int, Unit] = {}
+        self.assigned: Dict[int, int] = {}
+        self.gatherers: Dict[int, Set[int]] = {}
+        self.moves = 0
+        self.rebuilds = 0
+        self.lookups: Counter = Counter()
+
+    def update(self, townhalls: Units, minerals: Units, extractors: Units, workers: Units):
+        layout = (frozenset(townhalls.tags), frozenset(minerals.tags), frozenset(extractors.tags))
+        if layout != self.layout:
+            self.layout = layout
+            self._rebuild(townhalls, minerals, extractors)
+        self.resources = {r.tag: r for r in minerals}
+        self.resources.update((r.tag, r) for r in extractors)
+        self.workers = {w.tag: w for w in workers}
+        for w in workers:
+            orders = w.orders
+            if orders and orders[0].ability.id in RETURN:
+                continue
+            target = orders[0].target if orders and orders[0].ability.id in GATHER else None
+            if target not in self.base_of:
+                target = None
+            if target != self.assigned.get(w.tag):
+                self.assign(w.tag, target)
+
+    def _rebuild(self, townhalls: Units, minerals: Units, extractors: Units):
+        # the bases only change when a townhall, patch or extractor comes or goes
+        self.rebuilds += 1
+        self.bases = {t.tag: t.position for t in townhalls}
+        self.base_of = {}
+        self.gas = set(extractors.tags)
+        if townhalls:
+            for r in minerals | extractors:
+                t = townhalls.closest_to(r)
+                if t.distance_to(r) < BASE_RADIUS:
+                    self.base_of[r.tag] = t.tag
+        self.assigned = {w: r for w, r in self.assigned.items() if r in self.base_of}
+        self.gatherers = {r: self.gatherers.get(r, set()) for r in self.base_of}
+        self.buckets = {t: [set() for _ in range(MAX_BUCKET + 1)] for t in self.bases}
+        for r, base in self.base_of.items():
+            if r not in self.gas:
+                self.buckets[base][min(len(self.gatherers[r]), MAX_BUCKET)].add(r)
+
+    def _move(self, resource: int, change: int):
+        gatherers = self.gatherers[resource]
+        if resource not in self.gas:
+            buckets = self.buckets[self.base_of[resource]]
+            buckets[min(len(gatherers), MAX_BUCKET)].discard(resource)
+            buckets[min(len(gatherers) + change, MAX_BUCKET)].add(resource)
+
+    def _unassign(self, worker: int):
+        r = self.assigned.pop(worker, None)
+        if r is not None and r in self.gatherers:
+            self._move(r, -1)
+            self.gatherers[r].discard(worker)
+
+    def assign(self, worker: int, resource: Optional[int]):
+        self._unassign(worker)
+        if resource is not None and resource in self.base_of:
+            self._move(resource, 1)
+            self.gatherers[resource].add(worker)
+            self.assigned[worker] = resource
+        self.moves += 1
+
+    def forget(self, tag: int):
+        self._unassign(tag)
+
+    def count(self, resource: int) -> int:
+        return len(self.gatherers.get(resource, ()))
+
+    def least_saturated(self, bases: Iterable[int] = None, near: Point2 = None,
+                        below: int = MAX_BUCKET + 1) -> Optional[Unit]:
+        """The mineral patch with the fewest workers of the given bases, or of all of them.
+
+        Between bases with equally saturated patches the one closest to `near` wins. Only
+        patches with fewer than `below` workers are considered.
+        """
+        self.lookups["least_saturated"] += 1
+        best, best_count, best_distance = None, below - 1, None
+        for base in (self.bases if bases is None else bases):
+            buckets = self.buckets.get(base)
+            if buckets is None:
+                continue
+            count = next((i for i, b in enumerate(buckets) if b), None)
+            if count is None or count > best_count:
+                continue
+            distance = near._distance_squared(self.bases[base]) if near is not None else 0
+            if count < best_count or best_distance is None or distance < best_distance:
+                best, best_count, best_distance = base, count, distance
+        if best is None:
+            return None
+        return self.resources.get(next(iter(self.buckets[best][best_count])))
+
+    def empty_gatherers(self, resource: int) -> List[Unit]:
+        # visible workers of the resource that are not carrying anything
+        self.lookups["empty_gatherers"] += 1
+        workers = (self.workers.get(tag) for tag in self.gatherers.get(resource, ()))
+        return [w for w in workers if w is not None and not w.is_carrying_minerals and not w.is_carrying_vespene]
+
+    def spare_worker(self, base: int) -> Optional[Unit]:
+        # an empty mineral worker of the base, from its most saturated patch
+        self.lookups["spare_worker"] += 1
+        for bucket in reversed(self.buckets.get(base, [])[1:]):
+            for r in bucket:
+                workers = self.empty_gatherers(r)
+                if workers:
+                    return workers[0]
+        return None
+
+    def stats(self) -> Dict:
+        return {
+            "workers": len(self.assigned),
+            "moves": self.moves,
+            "rebuilds": self.rebuilds,
+            "lookups": dict(self.lookups),
+        }
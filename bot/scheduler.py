@@ -0,0 +1,100 @@
+import time
+from collections import Counter
+from enum import IntEnum
+from typing import Awaitable, Callable, List, Optional, Set, Union
+
+import sc2
+
+from .profiler import Profiler
+
+logger = sc2.main.logger
+
+# same headroom on_step used to keep before skipping a whole frame
+SAFETY_MARGIN = 0.05
+# weight of the newest sample in a task's running cost estimate
+COST_SMOOTHING = 0.2
+
+
+class Priority(IntEnum):
+    CRITICAL = 0
+    HIGH = 1
+    NORMAL = 2
+    LOW = 3
+
+
+class Task:
+    def __init__(self, name: str, func: Callable[[], Awaitable[Optional[bool]]], priority: Priority,
+                 every_frames: int = 1, every_seconds: Union[int, float] = None):
+        self.name = name
+        self.func = func
+        self.priority = priority
+        self.every_frames = every_frames
+        self.every_seconds = every_seconds
+        self.last_iteration: int = None
+        self.last_time: float = None
+        self.cost: float = 0
+
+    def is_due(self, iteration: int, game_time: float) -> bool:
+        if self.last_iteration is None:
+            return True
+        if self.every_seconds is not None:
+            return game_time - self.last_time >= self.every_seconds
+        return iteration - self.last_iteration >= self.every_frames
+
+    def record(self, iteration: int, game_time: float, elapsed: float):
+        self.last_iteration = iteration
+        self.last_time = game_time
+        if self.cost == 0:
+            self.cost = elapsed
+        else:
+            self.cost += COST_SMOOTHING * (elapsed - self.cost)
+
+
+class StepScheduler:
+    """Runs the registered step tasks in registration order, within the step time budget.
+
+    A non-critical task only runs if, after reserving the estimated cost of the
+    higher-priority tasks still due this frame, the remaining budget covers its own
+    estimated cost. Skipped tasks stay due and are retried on the next frame.
+    A task may return True to end the frame early, like `defend_early_rush` does.
+    """
+
+    def __init__(self, profiler: Profiler = None):
+        self.profiler = profiler
+        self.tasks: List[Task] = []
+        self.due: Set[str] = set()
+        self.ran: List[str] = []
+        self.deferred: List[str] = []
+        self.deferred_total = Counter()
+
+    def register(self, name: str, func: Callable[[], Awaitable[Optional[bool]]], priority: Priority,
+                 every_frames: int = 1, every_seconds: Union[int, float] = None) -> Task:
+        task = Task(name, func, priority, every_frames, every_seconds)
+        self.tasks.append(task)
+        return task
+
+    async def run(self, iteration: int, game_time: float, budget: Optional[float]):
+        start = time.monotonic()
+        self.ran = []
+        self.deferred = []
+        due = [t for t in self.tasks if t.is_due(iteration, game_time)]
+        self.due = {t.name for t in due}
+        for i, task in enumerate(due):
+            if budget is not None and task.priority != Priority.CRITICAL:
+                remaining = budget - (time.monotonic() - start)
+                reserve = sum(t.cost for t in due[i + 1:] if t.priority < task.priority)
+                if remaining - reserve - SAFETY_MARGIN < task.cost:
+                    self.deferred.append(task.name)
+                    self.deferred_total[task.name] += 1
+                    continue
+            task_start = time.monotonic()
+            stop = await task.func()
+            elapsed = time.monotonic() - task_start
+            task.record(iteration, game_time, elapsed)
+            if self.profiler is not None:
+                self.profiler.record("task." + task.name, elapsed)
+            self.ran.append(task.name)
+            if stop:
+                break
+        if self.deferred:
+            logger.debug("deferred=%s budget=%s", self.deferred, budget)
@@ -0,0 +1,87 @@
+import math
+from typing import Dict, List, Optional, Tuple, Union
+
+from sc2.position import Point2, Point3
+from sc2.unit import Unit
+from sc2.units import Units
+
+CELL_SIZE = 8
+
+
+class UnitGrid:
+    """Uniform grid over a `Units` collection, built once per frame.
+
+    Queries return the same results as the linear `Units` scans they replace,
+    in the same order, but only look at the cells the query radius touches.
+    """
+
+    def __init__(self, units: Units, cell_size: Union[int, float] = CELL_SIZE):
+        self.cell_size = cell_size
+        self.amount = len(units)
+        self.cells: Dict[Tuple[int, int], List[Tuple[int, float, float, Unit]]] = {}
+        for i, u in enumerate(units):
+            p = u.position
+            key = (int(p[0] // cell_size), int(p[1] // cell_size))
+            if key in self.cells:
+                self.cells[key].append((i, p[0], p[1], u))
+            else:
+                self.cells[key] = [(i, p[0], p[1], u)]
+
+    @property
+    def exists(self) -> bool:
+        return self.amount > 0
+
+    def closer_than(self, distance: Union[int, float], position: Union[Unit, Point2, Point3]) -> Units:
+        p = position.position
+        x, y = p[0], p[1]
+        d2 = distance * distance
+        c = self.cell_size
+        found = []
+        for cx in range(int((x - distance) // c), int((x + distance) // c) + 1):
+            for cy in range(int((y - distance) // c), int((y + distance) // c) + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is None:
+                    continue
+                for e in cell:
+                    if (e[1] - x) ** 2 + (e[2] - y) ** 2 < d2:
+                        found.append(e)
+        found.sort(key=lambda e: e[0])
+        return Units([e[3] for e in found])
+
+    def _closest(self, position: Union[Unit, Point2, Point3]) -> Tuple[Optional[Unit], float]:
+        p = position.position
+        x, y = p[0], p[1]
+        c = self.cell_size
+        kx, ky = int(x // c), int(y // c)
+        best: Optional[Tuple[int, float, float, Unit]] = None
+        best_d2 = math.inf
+        ring = 0
+        searched = 0
+        while searched < len(self.cells):
+            for cx in range(kx - ring, kx + ring + 1):
+                for cy in range(ky - ring, ky + ring + 1):
+                    if ring > 0 and kx - ring < cx < kx + ring and ky - ring < cy < ky + ring:
+                        continue
+                    cell = self.cells.get((cx, cy))
+                    if cell is None:
+                        continue
+                    searched += 1
+                    for e in cell:
+                        d2 = (e[1] - x) ** 2 + (e[2] - y) ** 2
+                        if d2 < best_d2 or (d2 == best_d2 and e[0] < best[0]):
+                            best, best_d2 = e, d2
+            # anything outside this ring is at least `ring * c` away
+            if best is not None and best_d2 <= (ring * c) ** 2:
+                break
+            ring += 1
+        if best is None:
+            return None, math.inf
+        return best[3], math.sqrt(best_d2)
+
+    def closest_to(self, position: Union[Unit, Point2, Point3]) -> Unit:
+        assert self.exists
+        return self._closest(position)[0]
+
+    def closest_distance_to(self, position: Union[Unit, Point2, Point3]) -> Union[int, float]:
+        assert self.exists
+        return self._closest(position)[1]
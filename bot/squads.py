@@ -0,0 +1,94 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+from sc2.position import Point2
+from sc2.unit import Unit
+from sc2.units import Units
+
+from .engagement import EngagementMatrix
+
+# units this close to each other (directly or through others) form one squad
+SQUAD_LINK = 5
+# a unit with an enemy this close, or one that can already shoot it, is in contact
+CONTACT_RANGE = 10
+
+
+def components(positions: np.ndarray, link: float) -> np.ndarray:
+    """Connected-component label of every point, where points closer than `link` are connected."""
+    n = len(positions)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    diff = positions[:, None, :] - positions[None, :, :]
+    adjacent = (diff ** 2).sum(axis=2) < link * link
+    labels = np.arange(n)
+    while True:
+        # take the smallest label among the neighbours, then follow labels to their own label
+        new = np.where(adjacent, labels[None, :], n).min(axis=1)
+        new = new[new]
+        if np.array_equal(new, labels):
+            return labels
+        labels = new
+
+
+class Squad:
+    __slots__ = ("units", "center", "radius", "contact", "enemy_near")
+
+    def __init__(self, units: Units, center: Point2, radius: float, contact: set, enemy_near: bool):
+        self.units = units
+        self.center = center
+        self.radius = radius
+        # tags of the units that need per-unit micro
+        self.contact = contact
+        # a known enemy, structures and snapshots included, within CONTACT_RANGE of the squad
+        self.enemy_near = enemy_near
+
+
+class Squads:
+    """Own army units clustered by position, with the engagement context of each squad.
+
+    Built once per frame from the engagement matrix; only units in contact with an enemy
+    need the per-unit checks of `move_and_attack`, the others act on squad-level facts.
+    """
+
+    def __init__(self, engagement: EngagementMatrix, known_enemies: Units, front_line: Units):
+        own = engagement.own
+        positions = np.array([u.position for u in own], dtype=np.float64).reshape(-1, 2)
+        labels = components(positions, SQUAD_LINK)
+        contact = (engagement.distance < CONTACT_RANGE).any(axis=1) | engagement.in_range.any(axis=1)
+        known = np.array([e.position for e in known_enemies], dtype=np.float64).reshape(-1, 2)
+        self.front_line = np.array([u.position for u in front_line], dtype=np.float64).reshape(-1, 2)
+        self.front_line_distances: Dict[Point2, float] = {}
+
+        self.squads: List[Squad] = []
+        self.by_tag: Dict[int, Squad] = {}
+        # every label is the index of its component's first point
+        for label in np.flatnonzero(labels == np.arange(len(labels))):
+            rows = np.flatnonzero(labels == label)
+            center = positions[rows].mean(axis=0)
+            radius = float(np.sqrt(((positions[rows] - center) ** 2).sum(axis=1)).max())
+            enemy_near = bool(known.size) and \
+                bool((((known - center) ** 2).sum(axis=1) < (radius + CONTACT_RANGE) ** 2).any())
+            squad = Squad(Units([own[i] for i in rows]), Point2((float(center[0]), float(center[1]))), radius,
+                          {own[i].tag for i in rows if contact[i]}, enemy_near)
+            self.squads.append(squad)
+            for i in rows:
+                self.by_tag[own[i].tag] = squad
+
+    def __iter__(self):
+        return iter(self.squads)
+
+    def __len__(self) -> int:
+        return len(self.squads)
+
+    def of(self, u: Unit) -> Optional[Squad]:
+        return self.by_tag.get(u.tag)
+
+    def front_line_distance(self, t: Point2) -> Optional[float]:
+        # distance from `t` to the closest front line unit, None without a front line
+        if not len(self.front_line):
+            return None
+        d = self.front_line_distances.get(t)
+        if d is None:
+            d = self.front_line_distances[t] = float(
+                np.sqrt(((self.front_line - np.array(t)) ** 2).sum(axis=1)).min())
+        return d
@@ -0,0 +1,38 @@
+import functools
+from typing import Dict, List, Tuple
+
+from sc2 import Race
+from sc2.constants import UnitTypeId
+
+
+@functools.lru_cache(maxsize=None)
+def build_orders() -> Dict[Race, Tuple[UnitTypeId, ...]]:
+    # tech buildings by enemy race, in the order they are built; built on first use
+    return {
+        Race.Terran: (
+            UnitTypeId.SPAWNINGPOOL,
+            UnitTypeId.BANELINGNEST,
+            UnitTypeId.INFESTATIONPIT,
+            UnitTypeId.EVOLUTIONCHAMBER,
+            UnitTypeId.HYDRALISKDEN,
+        ),
+        Race.Zerg: (
+            UnitTypeId.SPAWNINGPOOL,
+            UnitTypeId.ROACHWARREN,
+            UnitTypeId.INFESTATIONPIT,
+            UnitTypeId.EVOLUTIONCHAMBER,
+            UnitTypeId.HYDRALISKDEN,
+        ),
+        Race.Protoss: (
+            UnitTypeId.SPAWNINGPOOL,
+            UnitTypeId.INFESTATIONPIT,
+            UnitTypeId.EVOLUTIONCHAMBER,
+            UnitTypeId.HYDRALISKDEN,
+        ),
+    }
+
+
+def build_order(race: Race) -> List[UnitTypeId]:
+    # random and unknown races get the protoss order
+    orders = build_orders()
+    return list(orders.get(race, orders[Race.Protoss]))
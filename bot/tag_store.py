@@ -0,0 +1,116 @@
+import sys
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+
+
+class TagStore:
+    """Per-tag state in typed NumPy columns, one row per live tag.
+
+    Rows are kept packed at the front of the arrays (a removed row is replaced by the last
+    one), so scans only ever touch live tags. Every row remembers the game loop it was last
+    seen on; `expired` lists the tags that have not been seen for `max_unseen` game loops.
+    """
+
+    def __init__(self, columns: Dict[str, type], max_unseen: int, capacity: int = 64):
+        self.max_unseen = max_unseen
+        self.size = 0
+        self.index: Dict[int, int] = {}
+        self.tags = np.zeros(capacity, dtype=np.int64)
+        self.last_seen = np.zeros(capacity, dtype=np.int64)
+        self.columns: Dict[str, np.ndarray] = {name: np.zeros(capacity, dtype=dtype)
+                                               for name, dtype in columns.items()}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, tag: int) -> bool:
+        return tag in self.index
+
+    def _grow(self):
+        capacity = len(self.tags) * 2
+        self.tags = np.resize(self.tags, capacity)
+        self.last_seen = np.resize(self.last_seen, capacity)
+        for name, array in self.columns.items():
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self.columns[name] = grown
+
+    def _row(self, tag: int, game_loop: int = None) -> int:
+        row = self.index.get(tag)
+        if row is None:
+            if self.size == len(self.tags):
+                self._grow()
+            row = self.index[tag] = self.size
+            self.size += 1
+            self.tags[row] = tag
+            self.last_seen[row] = game_loop if game_loop is not None else 0
+            for array in self.columns.values():
+                array[row] = 0
+        elif game_loop is not None:
+            self.last_seen[row] = game_loop
+        return row
+
+    def set(self, tag: int, game_loop: int = None, **values):
+        # adds the tag if it is new; `game_loop` also marks it as seen
+        row = self._row(tag, game_loop)
+        for name, value in values.items():
+            self.columns[name][row] = value
+
+    def rows(self, tags: Iterable[int]) -> Tuple[np.ndarray, np.ndarray]:
+        # the row of every tag, adding the new ones, and which of them are new
+        before = self.size
+        rows = np.array([self._row(tag) for tag in tags], dtype=np.int64)
+        return rows, rows >= before
+
+    def get(self, tag: int, column: str, default=None):
+        row = self.index.get(tag)
+        if row is None:
+            return default
+        return self.columns[column][row].item()
+
+    def row(self, tag: int) -> Dict:
+        row = self.index[tag]
+        return {name: array[row].item() for name, array in self.columns.items()}
+
+    def discard(self, tag: int):
+        row = self.index.pop(tag, None)
+        if row is None:
+            return
+        last = self.size - 1
+        if row != last:
+            moved = int(self.tags[last])
+            self.tags[row] = moved
+            self.last_seen[row] = self.last_seen[last]
+            for array in self.columns.values():
+                array[row] = array[last]
+            self.index[moved] = row
+        self.size = last
+
+    def touch(self, tags: Iterable[int], game_loop: int):
+        rows = [self.index[t] for t in tags if t in self.index]
+        if rows:
+            self.last_seen[rows] = game_loop
+
+    def expired(self, game_loop: int) -> List[int]:
+        old = np.flatnonzero(self.last_seen[:self.size] < game_loop - self.max_unseen)
+        return self.tags[old].tolist()
+
+    def evict(self, game_loop: int) -> List[int]:
+        tags = self.expired(game_loop)
+        for tag in tags:
+            self.discard(tag)
+        return tags
+
+    def tags_where(self, column: str) -> Set[int]:
+        return set(self.tags[:self.size][self.columns[column][:self.size] != 0].tolist())
+
+    def count(self, column: str) -> int:
+        return int(np.count_nonzero(self.columns[column][:self.size]))
+
+    def nbytes(self) -> int:
+        arrays = self.tags.nbytes + self.last_seen.nbytes + sum(a.nbytes for a in self.columns.values())
+        return arrays + sys.getsizeof(self.index)
+
+    def stats(self) -> Dict:
+        return {"tags": self.size, "capacity": len(self.tags), "bytes": self.nbytes()}
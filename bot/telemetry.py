@@ -0,0 +1,98 @@
+import json
+import logging
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Tuple
+
+# pending chat messages go out together at most this often, in game seconds
+CHAT_INTERVAL = 5
+# chat messages and log records kept before the oldest are dropped
+CAPACITY = 256
+# sc2 chat drops longer messages
+CHAT_MAX_LENGTH = 512
+
+
+class Telemetry:
+    """Chat and log output kept off the step.
+
+    Chat messages are buffered and sent as one message every CHAT_INTERVAL game seconds
+    instead of one protocol round-trip each. Log records are buffered as well and formatted
+    and written by a background thread. Fields given as callables are only evaluated when
+    `level` lets the record through, so a filtered record costs one comparison.
+    """
+
+    def __init__(self, logger: logging.Logger, level: int = logging.INFO, capacity: int = CAPACITY,
+                 chat_interval: float = CHAT_INTERVAL):
+        self.logger = logger
+        self.level = level
+        self.chat_interval = chat_interval
+        self.last_chat = 0.0
+        self.chats: Deque[str] = deque(maxlen=capacity)
+        self.records: Deque[Tuple[int, str, Dict]] = deque(maxlen=capacity)
+        self.chat_messages = 0
+        self.chat_sends = 0
+        self.logged = 0
+        self.filtered = 0
+        self.dropped = 0
+        self.wake = threading.Event()
+        self.closed = False
+        self.thread = threading.Thread(target=self._write, name="telemetry", daemon=True)
+        self.thread.start()
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.level and self.logger.isEnabledFor(level)
+
+    def chat(self, message: str):
+        if len(self.chats) == self.chats.maxlen:
+            self.dropped += 1
+        self.chats.append(message)
+        self.chat_messages += 1
+
+    def log(self, level: int, event: str, **fields):
+        if not self.enabled(level):
+            self.filtered += 1
+            return
+        # callables read bot state, so they are evaluated here and not on the writer thread
+        fields = {k: v() if callable(v) else v for k, v in fields.items()}
+        if len(self.records) == self.records.maxlen:
+            self.dropped += 1
+        self.records.append((level, event, fields))
+        self.wake.set()
+
+    async def flush(self, time: float, chat_send: Callable[[str], Awaitable]):
+        if not self.chats or time - self.last_chat < self.chat_interval:
+            return
+        message = ""
+        while self.chats and len(message) + len(self.chats[0]) < CHAT_MAX_LENGTH:
+            message += ("\n" if message else "") + self.chats.popleft()
+        if not message:
+            # a single message over the limit goes out cut
+            message = self.chats.popleft()[:CHAT_MAX_LENGTH]
+        self.last_chat = time
+        self.chat_sends += 1
+        await chat_send(message)
+
+    def _write(self):
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            while self.records:
+                level, event, fields = self.records.popleft()
+                self.logger.log(level, "%s %s", event, json.dumps(fields, default=str))
+                self.logged += 1
+            if self.closed:
+                return
+
+    def close(self):
+        self.closed = True
+        self.wake.set()
+        self.thread.join(timeout=1)
+
+    def stats(self) -> Dict:
+        return {
+            "chat_messages": self.chat_messages,
+            "chat_sends": self.chat_sends,
+            "logged": self.logged,
+            "filtered": self.filtered,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,28 @@
+import argparse
+import json
+import logging
+import warnings
+
+import sc2
+
+from bench import run_replay
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run MyBot.on_step offline against a recorded game")
+    parser.add_argument("recording", help="file written by MyBot(record_path=...), e.g. run_locally.py --record")
+    parser.add_argument("--actions-out", metavar="PATH", help="write the action stream, one command per line")
+    parser.add_argument("--recorded-budget", action="store_true",
+                        help="give every step the time budget it had in the recorded game")
+    parser.add_argument("--trace-memory", action="store_true", help="also report tracemalloc peak (slower)")
+    args = parser.parse_args()
+
+    sc2.main.logger.setLevel(logging.WARNING)
+    warnings.simplefilter("ignore", DeprecationWarning)
+    report = run_replay(args.recording, actions_out=args.actions_out, use_recorded_budget=args.recorded_budget,
+                        trace_memory=args.trace_memory)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
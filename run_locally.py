@@ -1,13 +1,21 @@
+import argparse
 import json
+import time
 
 import sc2
 from sc2 import run_game, maps, Race, Difficulty
 from sc2.player import Bot, Computer
 from bot import MyBot
+from bot.profiler import STEP_TIME_LIMIT
 from examples.zerg.zerg_rush import ZergRushBot
 
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--record", action="store_true", help="record observations for replay.py")
+    args = parser.parse_args()
+    record_path = f"recordings/{time.strftime('%Y%m%d-%H%M%S')}.rec.gz" if args.record else None
+
     sc2.paths.BASEDIR["Windows"] = "D:/Program Files (x86)/StarCraft II"
 
     with open("botinfo.json") as f:
@@ -15,10 +23,10 @@ def main():
 
     race = Race[info["race"]]
     run_game(maps.get("(2)DreamcatcherLE"), [
-        Bot(race, MyBot()),
+        Bot(race, MyBot(record_path)),
         # Bot(Race.Zerg, WorkerRushBot()),
         Computer(Race.Random, Difficulty.VeryHard),
-    ], realtime=False, step_time_limit={"time_limit": 5, "window_size": 10, "penalty": 10}, game_time_limit=(60 * 30),
+    ], realtime=False, step_time_limit=STEP_TIME_LIMIT, game_time_limit=(60 * 30),
              save_replay_as="test.SC2Replay")
 
 
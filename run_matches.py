@@ -0,0 +1,54 @@
+import argparse
+import functools
+import json
+import sys
+import time
+from pathlib import Path
+
+from sc2 import Difficulty, Race
+
+from bench import match_matrix, play_sc2, play_synthetic, run_matches
+
+
+def print_progress(total: int, outcome):
+    print_progress.done = getattr(print_progress, "done", 0) + 1
+    m = outcome["match"]
+    print(f"[{print_progress.done}/{total}] {m['map_name']} {m['race']} {m['difficulty']} #{m['repeat']}: "
+          f"{outcome['result']} after {outcome['game_time']:.0f}s, "
+          f"{outcome['over_budget_frames']} frames over budget", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a matrix of games in parallel and aggregate the results")
+    parser.add_argument("--maps", nargs="+", default=["(2)DreamcatcherLE"])
+    parser.add_argument("--races", nargs="+", default=["Random"], choices=[r.name for r in Race if r != Race.NoRace])
+    parser.add_argument("--difficulties", nargs="+", default=["VeryHard"], choices=[d.name for d in Difficulty])
+    parser.add_argument("--repeats", type=int, default=1, help="games per map, race and difficulty")
+    parser.add_argument("--workers", type=int, default=2, help="games (SC2 instances) running at once")
+    parser.add_argument("--game-time-limit", type=int, default=60 * 30)
+    parser.add_argument("--replays", metavar="DIR", help="save a replay of every game to DIR")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="play synthetic games instead of SC2, to try the pipeline without the game")
+    parser.add_argument("--iterations", type=int, default=500, help="steps per synthetic game")
+    parser.add_argument("--out", metavar="PATH", help="report file, default reports/matches-<time>.json")
+    args = parser.parse_args()
+
+    matches = match_matrix(args.maps, args.races, args.difficulties, args.repeats)
+    if args.synthetic:
+        play, kwargs = play_synthetic, {"iterations": args.iterations}
+    else:
+        if args.replays is not None:
+            Path(args.replays).mkdir(parents=True, exist_ok=True)
+        play, kwargs = play_sc2, {"game_time_limit": args.game_time_limit, "replay_dir": args.replays}
+    report = run_matches(matches, play, workers=args.workers,
+                         progress=functools.partial(print_progress, len(matches)), **kwargs)
+
+    out = Path(args.out or f"reports/matches-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({"report": str(out), **report["total"]}, indent=2))
+
+
+if __name__ == '__main__':
+    main()